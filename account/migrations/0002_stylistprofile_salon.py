@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+        ('salon', '0006_salonspecialday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stylistprofile',
+            name='salon',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stylists', to='salon.salon', verbose_name='salon'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_stylistprofile_salon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stylistprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='rating sum'),
+        ),
+    ]
@@ -66,6 +66,7 @@ class StylistProfile(models.Model):
     ]
 
     user = models.OneToOneField(User, on_delete=models.CASCADE , verbose_name='user' , related_name='stylist_profile')
+    salon = models.ForeignKey('salon.Salon', on_delete=models.SET_NULL , related_name='stylists' , verbose_name='salon' , null=True, blank=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES , default='other' , verbose_name='gender')
 
     #resume
@@ -82,6 +83,7 @@ class StylistProfile(models.Model):
     #rate and comment
     rating_average = models.DecimalField(max_digits=3 , decimal_places=2 , default=0,verbose_name='rating average' , null=True, blank=True)
     rating_count = models.PositiveIntegerField(verbose_name='rating count' , null=True, blank=True , default=0)
+    rating_sum = models.PositiveIntegerField(verbose_name='rating sum' , default=0)
 
     class Meta:
         verbose_name = 'stylist profile'
@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import MinValueValidator , MaxValueValidator
 from account.models import User , CustomerProfile
 from shop.models import Product , ProductVariation , Discount
+from salon_reservation.reference_numbers import generate_reference
 
 # Create your models here.
 
@@ -83,7 +84,7 @@ class Order(models.Model):
         ('returned', 'مرجوع شده'),
     ]
 
-    order_number = models.CharField(max_length=10, unique=True)
+    order_number = models.CharField(max_length=20, unique=True)
     customer = models.ForeignKey(CustomerProfile, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     subtotal = models.DecimalField(max_digits=10, decimal_places=0 , validators=[MinValueValidator(0)])
@@ -122,13 +123,7 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         # تولید شماره سفارش اگر وجود نداشته باشد
         if not self.order_number:
-            import random
-            import string
-            while True:
-                number = 'ORD' + ''.join(random.choices(string.digits, k=10))
-                if not Order.objects.filter(order_number=number).exists():
-                    self.order_number = number
-                    break
+            self.order_number = generate_reference('ORD')
 
         # محاسبه مبلغ نهایی
         self.total = self.subtotal - self.discount_amount + self.shipping_cost + self.tax_amount
@@ -3,7 +3,9 @@ from django.core.validators import MinValueValidator
 from django.utils import timezone
 from account.models import User
 from cart.models import Order
-from reservation.models import Reservation
+from reservation.models import InvalidTransition, Reservation
+from reservation.reminders import schedule_reminders
+from salon_reservation.reference_numbers import generate_reference
 
 
 class PaymentGateway(models.Model):
@@ -220,13 +222,7 @@ class Payment(models.Model):
     def save(self, *args, **kwargs):
         # تولید شماره پرداخت اگر وجود نداشته باشد
         if not self.payment_number:
-            import random
-            import string
-            while True:
-                number = 'PAY' + ''.join(random.choices(string.digits, k=10))
-                if not Payment.objects.filter(payment_number=number).exists():
-                    self.payment_number = number
-                    break
+            self.payment_number = generate_reference('PAY')
 
         # ثبت زمان پرداخت موفق
         if self.status == 'success' and not self.paid_at:
@@ -249,9 +245,34 @@ class Payment(models.Model):
             self.order.save()
 
         if self.reservation:
-            self.reservation.status = 'confirmed'
-            self.reservation.confirmed_at = timezone.now()
-            self.reservation.save()
+            self._settle_reservation(self.reservation)
+
+    def _settle_reservation(self, reservation):
+        """
+        تایید رزرو پرداخت شده
+
+        A reservation that is already confirmed (e.g. a repeated gateway
+        callback) is left as is. One that was cancelled, rejected or marked
+        no-show before the payment arrived cannot be confirmed any more; a
+        pending refund of the payment is opened instead.
+        """
+        if reservation.status == 'pending':
+            try:
+                reservation.transition_to('confirmed', changed_by=self.user)
+            except InvalidTransition:
+                # وضعیت رزرو هم‌زمان تغییر کرده است
+                reservation.refresh_from_db(fields=['status'])
+
+        if reservation.status == 'confirmed':
+            schedule_reminders([reservation])
+        elif reservation.status in ('cancelled', 'rejected', 'no_show'):
+            if not self.refunds.filter(reason='order_cancelled').exists():
+                Refund.objects.create(
+                    payment=self,
+                    amount=self.amount,
+                    reason='order_cancelled',
+                    description=f'reservation {reservation.reservation_number} is {reservation.status}',
+                )
 
     def mark_as_failed(self, error_message=None, error_code=None):
         """تغییر وضعیت به ناموفق"""
@@ -358,13 +379,7 @@ class Refund(models.Model):
     def save(self, *args, **kwargs):
         # تولید شماره بازگشت وجه
         if not self.refund_number:
-            import random
-            import string
-            while True:
-                number = 'REF' + ''.join(random.choices(string.digits, k=10))
-                if not Refund.objects.filter(refund_number=number).exists():
-                    self.refund_number = number
-                    break
+            self.refund_number = generate_reference('REF')
 
         super().save(*args, **kwargs)
 
@@ -482,13 +497,7 @@ class Transaction(models.Model):
     def save(self, *args, **kwargs):
         # تولید شماره تراکنش
         if not self.transaction_number:
-            import random
-            import string
-            while True:
-                number = 'TXN' + ''.join(random.choices(string.digits, k=10))
-                if not Transaction.objects.filter(transaction_number=number).exists():
-                    self.transaction_number = number
-                    break
+            self.transaction_number = generate_reference('TXN')
 
         super().save(*args, **kwargs)
 
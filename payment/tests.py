@@ -1,3 +1,53 @@
+from datetime import date, time
+
 from django.test import TestCase
 
-# Create your tests here.
+from account.models import User, CustomerProfile, StylistProfile, SalonOwnerProfile
+from reservation.models import Reservation
+from salon.models import Salon
+from .models import Payment, Refund
+
+
+class ReservationPaymentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+
+    def pay(self, status):
+        reservation = Reservation.objects.create(
+            customer=self.customer, salon=self.salon, stylist=self.stylist, date=date(2030, 1, 5),
+            start_time=time(10), end_time=time(11), total_price=200, status=status)
+        payment = Payment.objects.create(
+            user=self.customer.user, payment_type='reservation', reservation=reservation, amount=200)
+        payment.mark_as_success('REF1')
+        reservation.refresh_from_db()
+        return payment, reservation
+
+    def test_pending_reservation_is_confirmed(self):
+        payment, reservation = self.pay('pending')
+        self.assertEqual(reservation.status, 'confirmed')
+        self.assertEqual(reservation.status_logs.get().changed_by, self.customer.user)
+        self.assertFalse(payment.refunds.exists())
+
+    def test_repeated_callback_keeps_confirmed_reservation(self):
+        payment, reservation = self.pay('pending')
+        payment.mark_as_success('REF1')
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'confirmed')
+        self.assertEqual(reservation.status_logs.count(), 1)
+
+    def test_cancelled_reservation_gets_a_refund(self):
+        payment, reservation = self.pay('cancelled')
+        self.assertEqual(reservation.status, 'cancelled')
+        payment.mark_as_success('REF1')
+        refund = Refund.objects.get()
+        self.assertEqual((refund.payment, refund.amount, refund.reason, refund.status),
+                         (payment, 200, 'order_cancelled', 'pending'))
@@ -0,0 +1,50 @@
+"""
+Batched wallet crediting for completed reservations.
+
+Earnings are summed per salon owner in the database, so a batch costs one
+aggregate query, one locked read of the wallets, one ``UPDATE`` per owner
+and one bulk insert of ``Transaction`` rows, however many reservations it
+contains.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from reservation.models import Reservation
+from salon_reservation.reference_numbers import generate_reference
+from .models import Transaction, Wallet
+
+
+def credit_completed_reservations(reservation_ids):
+    """Credit each salon owner's wallet with the final price of the given reservations."""
+    earnings = list(
+        Reservation.objects.filter(pk__in=reservation_ids, status='completed')
+        .values('salon__owner__user_id')
+        .annotate(amount=Sum('final_price'), count=Count('pk'))
+        .order_by('salon__owner__user_id')
+    )
+    earnings = [row for row in earnings if row['amount']]
+    if not earnings:
+        return 0
+
+    with transaction.atomic():
+        user_ids = [row['salon__owner__user_id'] for row in earnings]
+        Wallet.objects.bulk_create([Wallet(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        balances = dict(
+            Wallet.objects.select_for_update().filter(user_id__in=user_ids).values_list('user_id', 'balance')
+        )
+        transactions = []
+        for row in earnings:
+            user_id, amount = row['salon__owner__user_id'], row['amount']
+            Wallet.objects.filter(user_id=user_id).update(
+                balance=F('balance') + amount, total_earned=F('total_earned') + amount)
+            transactions.append(Transaction(
+                transaction_number=generate_reference('TXN'),
+                transaction_type='settlement',
+                user_id=user_id,
+                amount=amount,
+                balance_before=balances[user_id],
+                balance_after=balances[user_id] + amount,
+                description=f'درآمد {row["count"]} رزرو انجام شده',
+            ))
+        Transaction.objects.bulk_create(transactions)
+    return len(transactions)
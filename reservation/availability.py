@@ -0,0 +1,279 @@
+"""
+Stylist availability engine.
+
+Builds one in-memory interval set per stylist per date from a fixed number of
+bulk queries (stylists, schedules, working hours, special days, blocked time
+slots and active reservations), independent of how many stylists or days are
+requested. Times are handled as minutes from midnight. Days that already passed
+in the salon's local time zone are dropped and today's free time starts at the
+current local minute, so past starts are never offered.
+"""
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from account.models import StylistProfile
+from salon.models import StylistSchedule, WorkingHours, SalonSpecialDay
+from salon.pricing import get_price_table
+from salon_reservation.timezones import default_time_zone, get_zone
+from .models import TimeSlot, Reservation
+
+MINUTES_PER_DAY = 24 * 60
+
+# وضعیت‌هایی که صندلی آرایشگر را اشغال می‌کنند
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def to_minutes(value):
+    """Convert a ``time`` to minutes from midnight."""
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    """Convert minutes from midnight back to a ``time`` (end of day maps to 23:59)."""
+    if minutes >= MINUTES_PER_DAY:
+        return time(23, 59)
+    return time(minutes // 60, minutes % 60)
+
+
+def _span(start, end):
+    """Interval for a pair of times; ``None`` when empty or incomplete."""
+    if start is None or end is None:
+        return None
+    start, end = to_minutes(start), to_minutes(end)
+    if end == 0:
+        end = MINUTES_PER_DAY
+    if end <= start:
+        return None
+    return start, end
+
+
+def merge(intervals):
+    """Sort and merge overlapping or touching intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def intersect(left, right):
+    """Intersection of two merged interval lists."""
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        end = min(left[i][1], right[j][1])
+        if start < end:
+            result.append((start, end))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract(intervals, busy):
+    """Remove the merged ``busy`` intervals from the merged ``intervals``."""
+    result = []
+    j = 0
+    for start, end in intervals:
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > start:
+                result.append((start, busy[k][0]))
+            start = max(start, busy[k][1])
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def _daterange(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+class AvailabilityEngine:
+    """
+    Free time of a group of stylists over an inclusive date range.
+
+    Everything is loaded up front, so lookups never touch the database.
+    With ``subtract_busy=False`` only working time is computed (schedules
+    clipped to salon hours), without blocked slots and reservations.
+    ``now`` (default: the current time) decides which times already passed;
+    with ``clip_today=False`` only past days are dropped and today is kept whole::
+
+        engine = AvailabilityEngine(stylists, today, today + timedelta(days=6))
+        engine.free_windows(stylist.pk, day, duration=service.duration)
+    """
+
+    def __init__(self, stylists, start_date, end_date, subtract_busy=True, now=None, clip_today=True):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.subtract_busy = subtract_busy
+        self.clip_today = clip_today
+        self.now = now or timezone.now()
+        stylist_ids = [getattr(s, 'pk', s) for s in stylists]
+        self._free = {}
+        self._load(stylist_ids)
+
+    def _load(self, stylist_ids):
+        salon_of = {}
+        zone_of = {}
+        for stylist_id, salon_id, zone in StylistProfile.objects.filter(pk__in=stylist_ids).values_list(
+                'pk', 'salon_id', 'salon__timezone'):
+            salon_of[stylist_id] = salon_id
+            zone_of[stylist_id] = zone or default_time_zone()
+        salon_ids = {salon_id for salon_id in salon_of.values() if salon_id}
+
+        schedules = defaultdict(list)
+        for stylist_id, weekday, start, end in StylistSchedule.objects.filter(
+                stylist_id__in=salon_of).values_list('stylist_id', 'weekday', 'start_time', 'end_time'):
+            span = _span(start, end)
+            if span and weekday is not None:
+                schedules[stylist_id, weekday].append(span)
+
+        # ساعات کاری سالن؛ لیست خالی یعنی سالن آن روز تعطیل است
+        opening = {}
+        salons_with_hours = set()
+        for salon_id, weekday, start, end, is_closed in WorkingHours.objects.filter(
+                salon_id__in=salon_ids).values_list('salon_id', 'weekday', 'opening_time', 'closing_time', 'is_closed'):
+            salons_with_hours.add(salon_id)
+            span = None if is_closed else _span(start, end)
+            opening.setdefault((salon_id, weekday), [])
+            if span:
+                opening[salon_id, weekday].append(span)
+
+        special = {}
+        for salon_id, day, start, end, is_closed in SalonSpecialDay.objects.filter(
+                salon_id__in=salon_ids, date__range=(self.start_date, self.end_date)).values_list(
+                'salon_id', 'date', 'opening_time', 'closing_time', 'is_closed'):
+            span = None if is_closed else _span(start, end)
+            special[salon_id, day] = [span] if span else []
+
+        busy = self._load_busy(list(salon_of)) if self.subtract_busy else {}
+
+        for stylist_id, salon_id in salon_of.items():
+            local_now = self.now.astimezone(get_zone(zone_of[stylist_id]))
+            today = local_now.date()
+            # دقیقه جاری رو به بالا؛ شروع‌های گذشته امروز پیشنهاد نشوند
+            now_minute = local_now.hour * 60 + local_now.minute + bool(local_now.second or local_now.microsecond)
+            days = {}
+            for day in _daterange(max(self.start_date, today), self.end_date):
+                weekday = day.weekday()
+                free = merge(schedules.get((stylist_id, weekday), ()))
+                if day == today and self.clip_today:
+                    free = intersect(free, [(now_minute, MINUTES_PER_DAY)])
+                if not free:
+                    continue
+                if (salon_id, day) in special:
+                    free = intersect(free, merge(special[salon_id, day]))
+                elif salon_id in salons_with_hours:
+                    free = intersect(free, merge(opening.get((salon_id, weekday), ())))
+                if (stylist_id, day) in busy:
+                    free = subtract(free, merge(busy[stylist_id, day]))
+                if free:
+                    days[day] = free
+            self._free[stylist_id] = days
+
+    def _load_busy(self, stylist_ids):
+        busy = defaultdict(list)
+        for stylist_id, day, start, end in TimeSlot.objects.filter(
+                stylist_id__in=stylist_ids, date__range=(self.start_date, self.end_date),
+                is_available=False).values_list('stylist_id', 'date', 'start_time', 'end_time'):
+            span = _span(start, end)
+            if span:
+                busy[stylist_id, day].append(span)
+        for stylist_id, day, start, end in Reservation.objects.filter(
+                stylist_id__in=stylist_ids, date__range=(self.start_date, self.end_date),
+                status__in=ACTIVE_STATUSES).values_list('stylist_id', 'date', 'start_time', 'end_time'):
+            span = _span(start, end)
+            if span:
+                busy[stylist_id, day].append(span)
+        return busy
+
+    @property
+    def stylist_ids(self):
+        return list(self._free)
+
+    def intervals(self, stylist_id, day):
+        """Free intervals of a stylist on a day, in minutes from midnight."""
+        return self._free.get(stylist_id, {}).get(day, [])
+
+    def free_windows(self, stylist_id, day, duration=0):
+        """Free ``(start, end)`` time windows on ``day`` at least ``duration`` minutes long."""
+        duration = duration or 0
+        return [
+            (to_time(start), to_time(end))
+            for start, end in self.intervals(stylist_id, day)
+            if end - start >= duration
+        ]
+
+    def available_starts(self, stylist_id, duration, step=15):
+        """
+        Every ``(date, start_time, end_time)`` on the grid of ``step`` minutes
+        where a service of ``duration`` minutes fits without interruption.
+        """
+        starts = []
+        for day, intervals in sorted(self._free.get(stylist_id, {}).items()):
+            for start, end in intervals:
+                first = -(-start // step) * step
+                for minute in range(first, end - duration + 1, step):
+                    starts.append((day, to_time(minute), to_time(minute + duration)))
+        return starts
+
+    def first_available(self, stylist_id, duration):
+        """Earliest ``(date, start_time, end_time)`` that fits ``duration`` minutes, or ``None``."""
+        for day, intervals in sorted(self._free.get(stylist_id, {}).items()):
+            for start, end in intervals:
+                if end - start >= duration:
+                    return day, to_time(start), to_time(start + duration)
+        return None
+
+
+def get_free_windows(stylists, service, start_date, days=7):
+    """
+    Free windows that fit ``service.duration`` for each stylist over ``days`` days,
+    as ``{stylist_id: {date: [(start, end), ...]}}``.
+    """
+    end_date = start_date + timedelta(days=days - 1)
+    engine = AvailabilityEngine(stylists, start_date, end_date)
+    duration = service.duration or 0
+    result = {}
+    for stylist_id in engine.stylist_ids:
+        days = {}
+        for day in _daterange(start_date, end_date):
+            windows = engine.free_windows(stylist_id, day, duration)
+            if windows:
+                days[day] = windows
+        result[stylist_id] = days
+    return result
+
+
+def get_priced_starts(stylists, service, start_date, days=7, step=15):
+    """
+    Bookable starts for ``service`` with their price, as
+    ``{stylist_id: [(date, start_time, end_time, price), ...]}``.
+
+    Prices come from the salon's compiled ``PriceTable``, one lookup per slot.
+    """
+    end_date = start_date + timedelta(days=days - 1)
+    engine = AvailabilityEngine(stylists, start_date, end_date)
+    table = get_price_table(service.salon_id)
+    duration = service.duration or 0
+    return {
+        stylist_id: [
+            (day, start, end, table.price(service.pk, day.weekday(), start.hour))
+            for day, start, end in engine.available_starts(stylist_id, duration, step)
+        ]
+        for stylist_id in engine.stylist_ids
+    }
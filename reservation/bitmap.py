@@ -0,0 +1,216 @@
+"""
+Bitmap-backed day calendars for stylist occupancy.
+
+A day is split into ticks of ``TICK_MINUTES`` minutes and each tick is one bit
+of a Python ``int`` (bit set = free). A whole day at 5-minute ticks is 288 bits,
+so a month for a 30-stylist salon is roughly 30 * 30 * 36 bytes of payload and
+every query is a handful of big-int operations instead of a ``TimeSlot`` scan.
+"""
+from datetime import time
+
+from .models import TimeSlot, Reservation
+
+TICK_MINUTES = 5
+TICKS_PER_DAY = 24 * 60 // TICK_MINUTES
+FULL_DAY = (1 << TICKS_PER_DAY) - 1
+
+
+def ticks(minutes):
+    """Number of ticks needed to cover ``minutes`` (rounded up)."""
+    return -(-minutes // TICK_MINUTES)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def tick_time(tick):
+    """Start ``time`` of ``tick``; the end of the day is 00:00, as everywhere else."""
+    minutes = tick * TICK_MINUTES
+    if minutes >= 24 * 60:
+        return time(0)
+    return time(minutes // 60, minutes % 60)
+
+
+def _range_mask(start_tick, end_tick):
+    if end_tick <= start_tick:
+        return 0
+    return ((1 << (end_tick - start_tick)) - 1) << start_tick
+
+
+class DayCalendar:
+    """Free/occupied ticks of one stylist-day."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits & FULL_DAY
+
+    @classmethod
+    def from_times(cls, spans):
+        """Calendar with every ``(start_time, end_time)`` span marked free."""
+        calendar = cls()
+        for start, end in spans:
+            calendar.mark_free(start, end)
+        return calendar
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        """Calendar from ``(start, end)`` minutes-from-midnight intervals."""
+        bits = 0
+        for start, end in intervals:
+            bits |= _range_mask(ticks(start), end // TICK_MINUTES)
+        return cls(bits)
+
+    def __repr__(self):
+        return f'<DayCalendar free={self.count_free()} ticks>'
+
+    def __eq__(self, other):
+        return isinstance(other, DayCalendar) and self.bits == other.bits
+
+    def __and__(self, other):
+        return DayCalendar(self.bits & other.bits)
+
+    def __or__(self, other):
+        return DayCalendar(self.bits | other.bits)
+
+    def __sub__(self, other):
+        return DayCalendar(self.bits & ~other.bits)
+
+    def _span_mask(self, start, end, inner=False):
+        """
+        Ticks touched by ``[start, end)``; with ``inner`` only the ticks entirely inside it.
+
+        Busy time covers every tick it touches, free time only whole ticks.
+        """
+        start_minutes = _minutes(start)
+        end_minutes = 24 * 60 if end == time(0) else _minutes(end)
+        if inner:
+            return _range_mask(ticks(start_minutes), end_minutes // TICK_MINUTES)
+        return _range_mask(start_minutes // TICK_MINUTES, ticks(end_minutes))
+
+    def mark_free(self, start, end):
+        self.bits |= self._span_mask(start, end, inner=True)
+
+    def mark_busy(self, start, end):
+        self.bits &= ~self._span_mask(start, end)
+
+    def intersection(self, *others):
+        """Ticks free in this calendar and in every one of ``others``."""
+        bits = self.bits
+        for other in others:
+            bits &= other.bits
+        return DayCalendar(bits)
+
+    def count_free(self):
+        """Number of free ticks."""
+        return self.bits.bit_count()
+
+    def free_minutes(self):
+        return self.count_free() * TICK_MINUTES
+
+    def fit_mask(self, minutes):
+        """Bitmask of every tick where a run of ``minutes`` free minutes starts."""
+        needed = ticks(minutes)
+        if needed <= 0:
+            return self.bits
+        mask = self.bits
+        covered = 1
+        # دو برابر کردن طول اجرا در هر مرحله؛ O(log n) عملیات
+        while covered < needed:
+            step = min(covered, needed - covered)
+            mask &= mask >> step
+            covered += step
+        return mask
+
+    def first_fit(self, minutes, not_before=None):
+        """Earliest start ``time`` of a free run of ``minutes``, or ``None``."""
+        mask = self.fit_mask(minutes)
+        if not_before is not None:
+            # رو به بالا؛ شروع هیچ‌وقت قبل از not_before نیست
+            mask &= ~((1 << ticks(_minutes(not_before))) - 1)
+        if not mask:
+            return None
+        return tick_time((mask & -mask).bit_length() - 1)
+
+    def fits(self, start, minutes):
+        """Whether ``minutes`` starting at ``start`` are entirely free."""
+        end_minutes = _minutes(start) + minutes
+        if end_minutes > 24 * 60:
+            return False
+        needed = _range_mask(_minutes(start) // TICK_MINUTES, ticks(end_minutes))
+        return self.bits & needed == needed
+
+    def windows(self):
+        """Maximal free ``(start, end)`` time windows."""
+        result = []
+        bits = self.bits
+        while bits:
+            start = (bits & -bits).bit_length() - 1
+            run = ~(bits >> start)
+            length = (run & -run).bit_length() - 1
+            result.append((tick_time(start), tick_time(start + length)))
+            bits &= ~_range_mask(start, start + length)
+        return result
+
+
+class OccupancyCalendar:
+    """
+    ``DayCalendar`` per ``(stylist_id, date)``, loaded with two queries.
+
+    Free time comes from available ``TimeSlot`` rows; unavailable slots and
+    confirmed reservations are then cut out. Once loaded, lookups never touch
+    the database.
+    """
+
+    def __init__(self, stylists, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self._days = {}
+        self._load([getattr(s, 'pk', s) for s in stylists])
+
+    def _load(self, stylist_ids):
+        busy = []
+        for stylist_id, day, start, end, is_available in TimeSlot.objects.filter(
+                stylist_id__in=stylist_ids, date__range=(self.start_date, self.end_date)).values_list(
+                'stylist_id', 'date', 'start_time', 'end_time', 'is_available'):
+            if is_available:
+                self._days.setdefault(stylist_id, {}).setdefault(day, DayCalendar()).mark_free(start, end)
+            else:
+                busy.append((stylist_id, day, start, end))
+        busy.extend(Reservation.objects.filter(
+            stylist_id__in=stylist_ids, date__range=(self.start_date, self.end_date),
+            status='confirmed').values_list('stylist_id', 'date', 'start_time', 'end_time'))
+        for stylist_id, day, start, end in busy:
+            calendar = self._days.get(stylist_id, {}).get(day)
+            if calendar is not None:
+                calendar.mark_busy(start, end)
+
+    def day(self, stylist_id, day):
+        """Calendar of one stylist-day (empty when nothing is free)."""
+        calendar = self._days.get(stylist_id, {}).get(day)
+        return calendar if calendar is not None else DayCalendar()
+
+    def common(self, stylist_ids, day):
+        """Ticks on ``day`` when all of ``stylist_ids`` are free."""
+        calendars = [self.day(stylist_id, day) for stylist_id in stylist_ids]
+        if not calendars:
+            return DayCalendar()
+        return calendars[0].intersection(*calendars[1:])
+
+    def first_fit(self, stylist_id, minutes):
+        """Earliest ``(date, start_time)`` for ``minutes`` for a stylist, or ``None``."""
+        for day, calendar in sorted(self._days.get(stylist_id, {}).items()):
+            start = calendar.first_fit(minutes)
+            if start is not None:
+                return day, start
+        return None
+
+    def count_free(self, stylist_id=None):
+        """Free ticks across the range, for one stylist or all of them."""
+        stylist_ids = self._days if stylist_id is None else [stylist_id]
+        return sum(
+            calendar.count_free()
+            for sid in stylist_ids
+            for calendar in self._days.get(sid, {}).values()
+        )
@@ -0,0 +1,87 @@
+"""
+Salon day view: every stylist of a salon with their time slots and
+reservations for one date, plus the salon's hours for that day.
+
+The whole view is loaded with a fixed number of queries regardless of how
+many stylists or reservations there are (see ``DAY_VIEW_QUERIES``).
+"""
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+
+from account.models import StylistProfile
+from salon.models import Salon, WorkingHours, SalonSpecialDay
+from .models import TimeSlot, Reservation
+
+# salon, stylists (+user), slots, reservations (+customer), services, working hours, special days
+DAY_VIEW_QUERIES = 7
+
+
+def get_salon_day(salon_id, day):
+    """Salon with ``day_hours``, ``day_special`` and stylists carrying ``day_slots``/``day_reservations``."""
+    reservations = (
+        Reservation.objects.filter(date=day, salon_id=salon_id)
+        .select_related('customer__user')
+        .prefetch_related('service')
+        .order_by('start_time')
+    )
+    stylists = (
+        StylistProfile.objects.select_related('user')
+        .prefetch_related(
+            Prefetch('timeslot_set', queryset=TimeSlot.objects.filter(date=day).order_by('start_time'), to_attr='day_slots'),
+            Prefetch('reservation_set', queryset=reservations, to_attr='day_reservations'),
+        )
+        .order_by('pk')
+    )
+    queryset = Salon.objects.select_related('owner').prefetch_related(
+        Prefetch('stylists', queryset=stylists),
+        Prefetch('working_hours', queryset=WorkingHours.objects.filter(weekday=day.weekday()), to_attr='day_hours'),
+        Prefetch('special_days', queryset=SalonSpecialDay.objects.filter(date=day), to_attr='day_special'),
+    )
+    return get_object_or_404(queryset, pk=salon_id)
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else None
+
+
+def serialize_salon_day(salon, day):
+    """JSON-ready dict of a salon loaded by ``get_salon_day``; runs no queries."""
+    special = salon.day_special[0] if salon.day_special else None
+    return {
+        'salon': {'id': salon.pk, 'name': salon.name, 'slug': salon.slug},
+        'date': day.isoformat(),
+        'working_hours': [
+            {'opening_time': _time(hours.opening_time), 'closing_time': _time(hours.closing_time), 'is_closed': bool(hours.is_closed)}
+            for hours in salon.day_hours
+        ],
+        'special_day': special and {
+            'is_closed': bool(special.is_closed),
+            'opening_time': _time(special.opening_time),
+            'closing_time': _time(special.closing_time),
+            'reason': special.reason,
+        },
+        'stylists': [
+            {
+                'id': stylist.pk,
+                'name': stylist.user.get_full_name() or stylist.user.username,
+                'time_slots': [
+                    {'start_time': _time(slot.start_time), 'end_time': _time(slot.end_time), 'is_available': slot.is_available}
+                    for slot in stylist.day_slots
+                ],
+                'reservations': [
+                    {
+                        'id': reservation.pk,
+                        'reservation_number': reservation.reservation_number,
+                        'status': reservation.status,
+                        'start_time': _time(reservation.start_time),
+                        'end_time': _time(reservation.end_time),
+                        'final_price': str(reservation.final_price),
+                        'customer': reservation.customer.user.get_full_name() or reservation.customer.user.username,
+                        'services': [service.name for service in reservation.service.all()],
+                    }
+                    for reservation in stylist.day_reservations
+                ],
+            }
+            for stylist in salon.stylists.all()
+        ],
+    }
@@ -0,0 +1,212 @@
+"""
+Capacity forecasting from historical reservations.
+
+Booked minutes are binned per stylist, weekday (0 = Monday) and hour of the
+day. Rows are read with ``values_list`` in chunks, one query per group of
+salons, and accumulated into NumPy arrays with ``bincount``. No model instances
+are created and memory does not grow with the history length. Every booking is
+weighted by ``0.5 ** (age / half_life_days)``, so recent weeks count more than
+old ones. Dividing by the total weight of each weekday in the window gives the
+expected booked minutes of every stylist-weekday-hour cell.
+
+Utilization is then forecast per ``StylistSchedule`` block: expected booked
+minutes inside the block divided by its length. "Today" is the salon's local
+date. Results are cached per salon under a key that includes that date, so
+they expire daily. The cache is the ``CAPACITY_FORECAST_CACHE`` alias; it must
+be shared by all processes (the project uses a file-based cache), since the
+``forecast_capacity`` command fills it for the web processes. Schedule blocks
+with a weekday outside 0-6 are skipped.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from account.models import StylistProfile
+from salon.models import Salon, StylistSchedule
+from salon_reservation.timezones import local_today
+from .models import Reservation
+
+HOURS = 24
+CELLS = 7 * HOURS
+HISTORY_DAYS = 730
+HALF_LIFE_DAYS = 56
+CACHE_TIMEOUT = 60 * 60 * 24
+# رزروهایی که ظرفیت آرایشگر را اشغال کرده‌اند
+BOOKED_STATUSES = ('confirmed', 'completed', 'no_show')
+
+BlockForecast = namedtuple('BlockForecast', ['schedule_id', 'stylist_id', 'weekday', 'start_time', 'end_time', 'utilization'])
+
+
+def get_forecast_cache():
+    return caches[getattr(settings, 'CAPACITY_FORECAST_CACHE', 'default')]
+
+
+def _minutes(times):
+    return np.fromiter((t.hour * 60 + t.minute for t in times), dtype=np.int64, count=len(times))
+
+
+def _end_minutes(times):
+    """Like ``_minutes``, with an end of 00:00 read as midnight at the end of the day."""
+    minutes = _minutes(times)
+    return np.where(minutes == 0, HOURS * 60, minutes)
+
+
+def _day_number(day):
+    return np.datetime64(day, 'D').astype(np.int64)
+
+
+def _day_weights(start, end, today, half_life_days):
+    """Total recency weight of each weekday between ``start`` and ``end`` (exclusive)."""
+    days = np.arange(_day_number(start), _day_number(end))
+    weights = 0.5 ** ((_day_number(today) - days) / half_life_days)
+    # 1970-01-01 پنجشنبه است (weekday=3)
+    return np.bincount((days + 3) % 7, weights=weights, minlength=7)
+
+
+def booked_minutes(salon_ids, stylist_ids, today=None, history_days=HISTORY_DAYS,
+                   half_life_days=HALF_LIFE_DAYS, chunk_size=20000):
+    """
+    Expected booked minutes per ``(stylist, weekday, hour)``.
+
+    Returns an array of shape ``(len(stylist_ids), 7, 24)`` whose first axis
+    follows the sorted ``stylist_ids``.
+    """
+    today = today or local_today()
+    start = today - timedelta(days=history_days)
+    stylist_ids = np.array(sorted(stylist_ids), dtype=np.int64)
+    totals = np.zeros(len(stylist_ids) * CELLS)
+    if not len(stylist_ids):
+        return totals.reshape(0, 7, HOURS)
+
+    rows = (
+        Reservation.objects.filter(salon_id__in=salon_ids, status__in=BOOKED_STATUSES, date__gte=start, date__lt=today)
+        .order_by()
+        .values_list('stylist_id', 'date', 'start_time', 'end_time')
+        .iterator(chunk_size=chunk_size)
+    )
+    hour_starts = np.arange(HOURS) * 60
+    today_number = _day_number(today)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        stylist, days, begin, end = zip(*chunk)
+        stylist = np.array(stylist, dtype=np.int64)
+        position = np.searchsorted(stylist_ids, stylist).clip(max=len(stylist_ids) - 1)
+        known = stylist_ids[position] == stylist
+        days = np.array(days, dtype='datetime64[D]').astype(np.int64)[known]
+        begin = _minutes(begin)[known, None]
+        end = _end_minutes(end)[known, None]
+        # دقیقه‌های هر رزرو در هر ساعت روز: آرایه (رزرو × ۲۴)
+        overlap = (np.minimum(end, hour_starts + 60) - np.maximum(begin, hour_starts)).clip(min=0)
+        weight = 0.5 ** ((today_number - days) / half_life_days)
+        cell = (position[known] * 7 + (days + 3) % 7) * HOURS
+        totals += np.bincount(
+            (cell[:, None] + np.arange(HOURS)).ravel(),
+            weights=(overlap * weight[:, None]).ravel(),
+            minlength=totals.size,
+        )
+
+    day_weights = _day_weights(start, today, today, half_life_days)
+    return totals.reshape(len(stylist_ids), 7, HOURS) / np.where(day_weights, day_weights, 1)[None, :, None]
+
+
+def occupancy(minutes):
+    """Share of every hour that is booked, from ``booked_minutes``."""
+    return (minutes / 60).clip(0, 1)
+
+
+def block_utilization(hourly, start_minute, end_minute):
+    """Expected share of a ``[start_minute, end_minute)`` block that is booked."""
+    if end_minute <= start_minute:
+        return 0.0
+    hour_starts = np.arange(HOURS) * 60
+    inside = (np.minimum(end_minute, hour_starts + 60) - np.maximum(start_minute, hour_starts)).clip(min=0) / 60
+    return float(min((hourly * inside).sum() / (end_minute - start_minute), 1.0))
+
+
+def forecast_salons(salon_ids, today=None, **options):
+    """
+    Forecast every salon in ``salon_ids`` with one reservation query.
+
+    Returns ``{salon_id: forecast}``; see ``salon_forecast`` for the layout.
+    Without ``today``, salons are grouped by their local date (one query per
+    group).
+    """
+    if today is None:
+        forecasts = {}
+        for day, group in _group_by_local_today(salon_ids).items():
+            forecasts.update(forecast_salons(group, day, **options))
+        return forecasts
+    stylists = dict(StylistProfile.objects.filter(salon_id__in=salon_ids).values_list('pk', 'salon_id'))
+    stylist_ids = sorted(stylists)
+    minutes = booked_minutes(salon_ids, stylist_ids, today, **options)
+    index = {stylist_id: i for i, stylist_id in enumerate(stylist_ids)}
+
+    forecasts = {
+        salon_id: {'date': today.isoformat(), 'occupancy': {}, 'blocks': []}
+        for salon_id in salon_ids
+    }
+    for stylist_id, i in index.items():
+        forecasts[stylists[stylist_id]]['occupancy'][stylist_id] = occupancy(minutes[i]).round(3).tolist()
+
+    blocks = StylistSchedule.objects.filter(
+        stylist_id__in=stylist_ids, weekday__range=(0, 6), start_time__isnull=False, end_time__isnull=False,
+    ).values_list('pk', 'stylist_id', 'weekday', 'start_time', 'end_time')
+    for pk, stylist_id, weekday, start_time, end_time in blocks:
+        utilization = block_utilization(
+            minutes[index[stylist_id], weekday],
+            start_time.hour * 60 + start_time.minute,
+            end_time.hour * 60 + end_time.minute,
+        )
+        forecasts[stylists[stylist_id]]['blocks'].append(
+            BlockForecast(pk, stylist_id, weekday, start_time, end_time, round(utilization, 3)))
+    return forecasts
+
+
+def _group_by_local_today(salon_ids):
+    groups = {}
+    for salon_id, zone_name in Salon.objects.filter(pk__in=salon_ids).values_list('pk', 'timezone'):
+        groups.setdefault(local_today(zone_name), []).append(salon_id)
+    return groups
+
+
+def cache_key(salon_id, today):
+    return f'capacity-forecast:{salon_id}:{today.isoformat()}'
+
+
+def salon_forecast(salon_id, today=None, **options):
+    """
+    Cached capacity forecast of one salon.
+
+    ``occupancy`` maps stylist id to a 7 × 24 matrix of booked shares per
+    weekday and hour; ``blocks`` lists a ``BlockForecast`` per schedule block.
+    """
+    if today is None:
+        today = local_today(Salon.objects.filter(pk=salon_id).values_list('timezone', flat=True).first())
+    cache = get_forecast_cache()
+    key = cache_key(salon_id, today)
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = forecast_salons([salon_id], today, **options)[salon_id]
+        cache.set(key, forecast, CACHE_TIMEOUT)
+    return forecast
+
+
+def refresh_forecasts(salon_ids, today=None, salons_per_query=100, **options):
+    """Recompute and cache forecasts for many salons; returns the number cached."""
+    cache = get_forecast_cache()
+    salon_ids = list(salon_ids)
+    for i in range(0, len(salon_ids), salons_per_query):
+        group = salon_ids[i:i + salons_per_query]
+        cache.set_many(
+            {
+                cache_key(salon_id, date.fromisoformat(forecast['date'])): forecast
+                for salon_id, forecast in forecast_salons(group, today, **options).items()
+            },
+            CACHE_TIMEOUT,
+        )
+    return len(salon_ids)
@@ -0,0 +1,168 @@
+"""
+Customer booking history read model.
+
+``CustomerHistoryEntry`` is a flat copy of each reservation with the salon name,
+stylist name, service names and price already joined in. The "my bookings" page
+reads only that table, walking the ``(customer, date, start_time, reservation)``
+index with keyset pagination, so every page is one index range scan however
+long the customer's history is.
+
+Rows are rebuilt with ``project`` in one upsert per batch. Reservation saves and
+service changes project the reservation when their transaction commits (see
+``reservation.signals``); all reservations touched in one transaction are
+collected in a per-thread registry and projected together by the first on-commit
+callback. Bulk imports project each batch. Status transitions update the rows
+directly, salon and stylist renames are pushed with one ``UPDATE`` each, and
+service renames re-project the reservations that include the service.
+"""
+import base64
+import threading
+from datetime import date, time
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CustomerHistoryEntry, Reservation
+
+SERVICE_SEPARATOR = '، '
+UPDATE_FIELDS = [
+    'customer', 'reservation_number', 'date', 'start_time', 'end_time', 'status', 'salon',
+    'salon_name', 'stylist', 'stylist_name', 'service_names', 'final_price', 'updated_at',
+]
+
+
+def display_name(user):
+    return user.get_full_name() or user.get_username()
+
+
+def project(reservation_ids, batch_size=500):
+    """Create or refresh the history rows of ``reservation_ids``; returns the count."""
+    reservation_ids = list(reservation_ids)
+    now = timezone.now()
+    count = 0
+    for i in range(0, len(reservation_ids), batch_size):
+        reservations = (
+            Reservation.objects.filter(pk__in=reservation_ids[i:i + batch_size])
+            .select_related('salon', 'stylist__user')
+            .prefetch_related('service')
+        )
+        entries = [
+            CustomerHistoryEntry(
+                reservation_id=reservation.pk,
+                customer_id=reservation.customer_id,
+                reservation_number=reservation.reservation_number,
+                date=reservation.date,
+                start_time=reservation.start_time,
+                end_time=reservation.end_time,
+                status=reservation.status,
+                salon_id=reservation.salon_id,
+                salon_name=reservation.salon.name or '',
+                stylist_id=reservation.stylist_id,
+                stylist_name=display_name(reservation.stylist.user),
+                service_names=SERVICE_SEPARATOR.join(service.name or '' for service in reservation.service.all()),
+                final_price=reservation.final_price,
+                updated_at=now,
+            )
+            for reservation in reservations
+        ]
+        CustomerHistoryEntry.objects.bulk_create(
+            entries, update_conflicts=True, unique_fields=['reservation'], update_fields=UPDATE_FIELDS)
+        count += len(entries)
+    return count
+
+
+class _Projection:
+    """On-commit callback projecting every reservation queued in one transaction."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.reservation_ids = set()
+        self.done = False
+
+    def __call__(self):
+        if self.done:
+            return
+        self.done = True
+        if _pending.projections.get(self.alias) is self:
+            del _pending.projections[self.alias]
+        project(sorted(self.reservation_ids))
+
+
+class _Pending(threading.local):
+    def __init__(self):
+        self.projections = {}
+
+
+# اتصال‌های Django برای هر thread جدا هستند، پس ثبت هم برای هر thread جداست
+_pending = _Pending()
+
+
+def project_on_commit(*reservation_ids):
+    """Project reservations once the current transaction commits."""
+    if not reservation_ids:
+        return
+    alias = transaction.get_connection().alias
+    projection = _pending.projections.get(alias)
+    if projection is None:
+        projection = _pending.projections[alias] = _Projection(alias)
+    projection.reservation_ids.update(reservation_ids)
+    # هر بار ثبت می‌شود تا rollback یک تراکنش شناسه‌ها را گم نکند؛ فقط اولین callback کار می‌کند
+    transaction.on_commit(projection)
+
+
+def rename_salon(salon):
+    CustomerHistoryEntry.objects.filter(salon_id=salon.pk).exclude(salon_name=salon.name or '').update(
+        salon_name=salon.name or '')
+
+
+def rename_stylist(stylist_id, user):
+    name = display_name(user)
+    CustomerHistoryEntry.objects.filter(stylist_id=stylist_id).exclude(stylist_name=name).update(stylist_name=name)
+
+
+def encode_cursor(entry):
+    raw = f'{entry.date.isoformat()}|{entry.start_time.isoformat()}|{entry.reservation_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``(date, start_time, reservation_id)`` of a cursor; raises ``ValueError`` if malformed."""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    day, start, pk = raw.split('|')
+    return date.fromisoformat(day), time.fromisoformat(start), int(pk)
+
+
+def history_page(customer_id, cursor=None, limit=20):
+    """
+    One page of a customer's history, newest first.
+
+    Returns ``(entries, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    queryset = CustomerHistoryEntry.objects.filter(customer_id=customer_id)
+    if cursor:
+        day, start, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__lt=day)
+            | Q(date=day, start_time__lt=start)
+            | Q(date=day, start_time=start, reservation_id__lt=pk)
+        )
+    entries = list(queryset.order_by('-date', '-start_time', '-reservation_id')[:limit + 1])
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def serialize_entry(entry):
+    return {
+        'reservation_number': entry.reservation_number,
+        'date': entry.date.isoformat(),
+        'start_time': entry.start_time.strftime('%H:%M'),
+        'end_time': entry.end_time.strftime('%H:%M'),
+        'status': entry.status,
+        'salon_id': entry.salon_id,
+        'salon_name': entry.salon_name,
+        'stylist_id': entry.stylist_id,
+        'stylist_name': entry.stylist_name,
+        'services': entry.service_names.split(SERVICE_SEPARATOR) if entry.service_names else [],
+        'final_price': int(entry.final_price),
+    }
@@ -0,0 +1,147 @@
+"""
+iCalendar (.ics) feeds of a stylist's or a customer's reservations.
+
+Reservations are streamed from the database with ``iterator()`` and written one
+event at a time, so a feed never holds more than one chunk of rows in memory.
+Calendar clients poll feeds every few minutes; ``feed_state`` answers those polls
+with an aggregate query (latest ``updated_at`` and row count) and one query for
+the salon and customer details the events show (salon name and address,
+customer names), plus the calendar name. The ETag is built from all of them, so
+renaming a salon or a customer changes it. An unchanged feed costs a few
+small queries and a 304.
+
+Feeds are fetched by calendar apps that carry no session, so each feed URL holds
+a token: an HMAC of the feed's kind and profile id (see ``feed_token``).
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from salon_reservation.timezones import salon_today_range
+from .models import Reservation
+
+# رزروهای قدیمی‌تر از این تعداد روز در فید نمی‌آیند
+FEED_PAST_DAYS = 90
+FEED_KINDS = ('stylist', 'customer')
+PRODID = '-//salon-reservation//calendar//FA'
+
+EVENT_STATUS = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'rejected': 'CANCELLED',
+    'no_show': 'CANCELLED',
+}
+
+
+def feed_token(kind, pk):
+    return salted_hmac('reservation.calendar', f'{kind}:{pk}').hexdigest()[:32]
+
+
+def check_feed_token(kind, pk, token):
+    return constant_time_compare(feed_token(kind, pk), token)
+
+
+def feed_url(kind, pk):
+    return reverse('reservation:calendar_feed', kwargs={'kind': kind, 'pk': pk, 'token': feed_token(kind, pk)})
+
+
+def feed_reservations(kind, pk, today=None):
+    """Reservations shown in a stylist's or customer's feed."""
+    if kind not in FEED_KINDS:
+        raise ValueError(f'unknown feed kind {kind!r}')
+    # مرز تقریبی است؛ زودترین «امروز» در میان مناطق زمانی سالن‌ها
+    today = today or salon_today_range()[0]
+    return Reservation.objects.filter(
+        **{f'{kind}_id': pk}, date__gte=today - timedelta(days=FEED_PAST_DAYS))
+
+
+def feed_state(queryset, name=''):
+    """
+    ``(etag, last_modified)`` of a feed with calendar name ``name``.
+
+    ``last_modified`` also covers the salons' ``updated_at``; customer name
+    changes only show in the ETag.
+    """
+    state = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'), salon_modified=Max('salon__updated_at'), count=Count('pk'))
+    details = sorted(
+        queryset.order_by().values_list(
+            'salon__name', 'salon__address',
+            'customer__user__first_name', 'customer__user__last_name', 'customer__user__username',
+        ).distinct(),
+        key=repr,
+    )
+    last_modified = max(filter(None, (state['last_modified'], state['salon_modified'])), default=None)
+    # تعداد هم در ETag است تا حذف یک رزرو هم دیده شود
+    digest = hashlib.sha1(f'{last_modified.timestamp() if last_modified else 0}:{state["count"]}'.encode())
+    digest.update(repr((name, details)).encode())
+    return '"%s"' % digest.hexdigest(), last_modified
+
+
+def _escape(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Fold a content line at 75 octets without splitting UTF-8 characters."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current, size, limit = [], 0, 75
+    for char in line:
+        width = len(char.encode())
+        if size + width > limit:
+            parts.append(''.join(current))
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(reservation, kind):
+    salon = reservation.salon
+    if kind == 'stylist':
+        summary = reservation.customer.user.get_full_name() or reservation.customer.user.get_username()
+    else:
+        summary = salon.name
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{reservation.reservation_number}@salon-reservation',
+        f'DTSTAMP:{_utc(reservation.updated_at)}',
+        f'LAST-MODIFIED:{_utc(reservation.updated_at)}',
+        f'DTSTART:{_utc(reservation.start_datetime)}',
+        f'DTEND:{_utc(reservation.end_datetime)}',
+        f'SUMMARY:{_escape(summary)}',
+        f'LOCATION:{_escape(salon.address)}',
+        f'STATUS:{EVENT_STATUS.get(reservation.status, "CONFIRMED")}',
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def iter_calendar(queryset, kind, name='', chunk_size=500):
+    """Yield the feed as text chunks: header, one chunk per event, footer."""
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH', f'X-WR-CALNAME:{_escape(name)}',
+    ))
+    reservations = (
+        queryset.select_related('salon', 'customer__user')
+        .order_by('date', 'start_time')
+        .iterator(chunk_size=chunk_size)
+    )
+    for reservation in reservations:
+        yield _event(reservation, kind)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from account.models import User, CustomerProfile, StylistProfile, SalonOwnerProfile
+from salon.models import Salon
+from reservation.models import Reservation
+from reservation.services import book, SlotUnavailable
+from salon_reservation.timezones import local_today
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent booking attempts at a single slot on a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=32)
+
+    def handle(self, *args, **options):
+        attempts = options['attempts']
+        workers = options['workers']
+
+        # پایگاه داده موقت؛ برای SQLite فایل لازم است تا هر نخ اتصال جدا داشته باشد
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.gettempdir(), f'benchmark_booking_{os.getpid()}.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            salon, stylist, customers = self._seed(attempts)
+            day = local_today(salon.timezone) + timedelta(days=1)
+
+            def attempt(customer):
+                try:
+                    book(customer, salon, stylist, day, time(10), time(11))
+                    return 'booked'
+                except SlotUnavailable:
+                    return 'conflict'
+                except DatabaseError:
+                    return 'error'
+                finally:
+                    connections.close_all()
+
+            started = timer.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(attempt, customers))
+            elapsed = timer.perf_counter() - started
+
+            booked = Reservation.objects.filter(stylist=stylist, date=day).count()
+            self.stdout.write(
+                f'attempts={attempts} workers={workers} booked={results.count("booked")} '
+                f'conflicts={results.count("conflict")} errors={results.count("error")} '
+                f'elapsed={elapsed:.3f}s throughput={attempts / elapsed:.1f}/s'
+            )
+            if booked != 1:
+                raise CommandError(f'expected exactly one reservation, found {booked}')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _seed(self, count):
+        owner_user = User.objects.create(username='bench-owner', email='bench-owner@example.com', mobile='09000000000')
+        salon = Salon.objects.create(owner=SalonOwnerProfile.objects.create(user=owner_user), name='bench')
+        stylist_user = User.objects.create(username='bench-stylist', email='bench-stylist@example.com', mobile='09000000001')
+        stylist = StylistProfile.objects.create(user=stylist_user, salon=salon)
+        users = User.objects.bulk_create(
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com', mobile=f'091{i:08d}')
+            for i in range(count)
+        )
+        customers = CustomerProfile.objects.bulk_create(CustomerProfile(user=user) for user in users)
+        return salon, stylist, customers
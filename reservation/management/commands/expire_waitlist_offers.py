@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reservation.waitlist import expire_offers
+
+
+class Command(BaseCommand):
+    help = 'Expire unanswered waitlist offers and offer their time to the next customer in line'
+
+    def handle(self, *args, **options):
+        expired, reoffered = expire_offers()
+        self.stdout.write(self.style.SUCCESS(f'expired {expired} offers, re-offered {reoffered}'))
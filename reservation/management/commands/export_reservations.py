@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from reservation.models import Reservation
+from reservation.transfer import export_rows, write_csv, write_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Stream reservations with their services to a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="output file, or '-' for stdout")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--salon', help='only reservations of the salon with this slug')
+        parser.add_argument('--since', help='only reservations on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='only reservations on or before this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        queryset = Reservation.objects.all()
+        if options['salon']:
+            queryset = queryset.filter(salon__slug=options['salon'])
+        if options['since']:
+            queryset = queryset.filter(date__gte=options['since'])
+        if options['until']:
+            queryset = queryset.filter(date__lte=options['until'])
+
+        writer = write_csv if options['format'] == 'csv' else write_jsonl
+        rows = export_rows(queryset, chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            count = writer(rows, sys.stdout)
+        else:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+                count = writer(rows, stream)
+        self.stderr.write(f'exported {count} reservations')
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation.forecast import HALF_LIFE_DAYS, HISTORY_DAYS, refresh_forecasts
+from salon.models import Salon
+
+
+class Command(BaseCommand):
+    help = 'Recompute and cache capacity forecasts of every active salon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salon', type=int, action='append', dest='salons', help='only this salon id (repeatable)')
+        parser.add_argument('--history-days', type=int, default=HISTORY_DAYS)
+        parser.add_argument('--half-life-days', type=float, default=HALF_LIFE_DAYS)
+        parser.add_argument('--salons-per-query', type=int, default=100)
+        parser.add_argument('--chunk-size', type=int, default=20000, help='reservation rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        salon_ids = options['salons'] or Salon.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        started = time.perf_counter()
+        count = refresh_forecasts(
+            salon_ids,
+            salons_per_query=options['salons_per_query'],
+            history_days=options['history_days'],
+            half_life_days=options['half_life_days'],
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'forecast {count} salons in {elapsed:.2f}s'))
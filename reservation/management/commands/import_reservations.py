@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.transfer import TransferError, import_rows, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = 'Stream reservations with their services from a CSV or JSONL file using bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="input file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--skip-invalid', action='store_true', help='skip rows that cannot be resolved instead of aborting')
+
+    def handle(self, *args, **options):
+        reader = read_csv if options['format'] == 'csv' else read_jsonl
+
+        def report(line, error):
+            self.stderr.write(f'skipped row {line}: {error}')
+
+        try:
+            if options['input'] == '-':
+                imported, skipped = import_rows(
+                    reader(sys.stdin), options['batch_size'], options['skip_invalid'], report)
+            else:
+                with open(options['input'], encoding='utf-8', newline='') as stream:
+                    imported, skipped = import_rows(
+                        reader(stream), options['batch_size'], options['skip_invalid'], report)
+        except TransferError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'imported {imported} reservations, skipped {skipped}'))
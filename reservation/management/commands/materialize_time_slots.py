@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation.slots import materialize_time_slots
+
+
+class Command(BaseCommand):
+    help = 'Generate missing time slots from stylist schedules for the coming days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14)
+        parser.add_argument('--slot-minutes', type=int, help='slot length in minutes (default: TIME_SLOT_MINUTES)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='stylists processed per round')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = materialize_time_slots(
+            days=options['days'],
+            slot_minutes=options['slot_minutes'],
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'created {created} time slots in {elapsed:.2f}s'))
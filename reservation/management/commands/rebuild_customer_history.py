@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation.history import project
+from reservation.models import Reservation
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the customer history read model from reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                Reservation.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            total += project(ids, batch_size)
+            last_pk = ids[-1]
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'projected {total} reservations in {elapsed:.2f}s'))
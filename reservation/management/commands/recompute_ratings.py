@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reservation.reviews import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute salon and stylist rating aggregates from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salon', type=int, action='append', dest='salons', help='only this salon id (repeatable)')
+
+    def handle(self, *args, **options):
+        salons, stylists = recompute_ratings(options['salons'])
+        self.stdout.write(self.style.SUCCESS(f'recomputed {salons} salons and {stylists} stylists'))
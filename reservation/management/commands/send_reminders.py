@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation.reminders import dispatch_due
+
+
+class Command(BaseCommand):
+    help = 'Send due reservation reminders; safe to run in several processes at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8, help='threads sending each batch')
+        parser.add_argument('--loop', action='store_true', help='keep polling instead of exiting when nothing is due')
+        parser.add_argument('--interval', type=float, default=5, help='seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = 0
+        started = time.perf_counter()
+        while True:
+            claimed, sent = dispatch_due(options['batch_size'], options['workers'])
+            total_sent += sent
+            if claimed:
+                self.stdout.write(f'sent {sent}/{claimed} reminders')
+            # اگر هیچ ارسالی موفق نبود پشتیبان در دسترس نیست؛ منتظر اجرای بعدی می‌مانیم
+            if sent:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'sent {total_sent} reminders in {elapsed:.2f}s'))
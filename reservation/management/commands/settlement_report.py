@@ -0,0 +1,35 @@
+import csv
+import sys
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from reservation.settlement import cancellation_fees, settlement_report
+from salon_reservation.timezones import salon_today_range
+
+
+class Command(BaseCommand):
+    help = 'Compute cancellation fees for a period in the database and print a settlement report'
+
+    def add_arguments(self, parser):
+        # آخرین روزی که در همه مناطق زمانی سالن‌ها تمام شده است
+        yesterday = (salon_today_range()[0] - timedelta(days=1)).isoformat()
+        parser.add_argument('--from', dest='start', default=yesterday, help='first cancellation date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', default=yesterday, help='last cancellation date (YYYY-MM-DD)')
+        parser.add_argument('--detail', action='store_true', help='one row per cancellation instead of per salon')
+
+    def handle(self, *args, **options):
+        start = date.fromisoformat(options['start'])
+        end = date.fromisoformat(options['end'])
+        if options['detail']:
+            rows = cancellation_fees(start, end)
+            fields = ['reservation_number', 'salon_id', 'customer_id', 'date', 'start_time',
+                      'cancelled_at', 'final_price', 'hours_before', 'cancellation_fee']
+        else:
+            rows = settlement_report(start, end)
+            fields = ['salon_id', 'salon__name', 'cancellations', 'total_fees']
+
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows.iterator():
+            writer.writerow(row)
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation.sweeper import sweep
+
+
+class Command(BaseCommand):
+    help = 'Mark ended confirmed reservations completed; safe to run on several nodes at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None, help='stop after this many batches')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        completed = sweep(options['batch_size'], options['max_batches'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{completed} completed in {elapsed:.2f}s'))
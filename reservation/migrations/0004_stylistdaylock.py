@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import DatabaseError, migrations, models, transaction
+
+
+# محافظ سطح پایگاه داده برای جلوگیری از هم‌پوشانی رزروهای فعال یک آرایشگر
+# پایان 00:00 یعنی نیمه‌شب پایان همان روز، نه ابتدای آن
+EXCLUSION_SQL = (
+    "ALTER TABLE reservation_reservation ADD CONSTRAINT reservation_no_overlap "
+    "EXCLUDE USING gist (stylist_id WITH =, "
+    "tsrange(date + start_time, date + end_time + (end_time = '00:00')::int * interval '1 day') WITH &&) "
+    "WHERE (status IN ('pending', 'confirmed'));"
+)
+
+
+def ensure_btree_gist(schema_editor):
+    """
+    The constraint needs the btree_gist extension. Creating it needs a
+    superuser (or, on PostgreSQL 13+, a trusted-extension owner), so a less
+    privileged migration user gets a clear error instead of a half-applied
+    migration.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")
+        if cursor.fetchone():
+            return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist;')
+    except DatabaseError as exc:
+        raise RuntimeError(
+            'The btree_gist extension is missing and this database user cannot create it. '
+            'Run "CREATE EXTENSION btree_gist;" once as a superuser, then migrate again.'
+        ) from exc
+
+
+def add_overlap_guard(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        ensure_btree_gist(schema_editor)
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def remove_overlap_guard(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE reservation_reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_stylistprofile_salon'),
+        ('reservation', '0003_reservationpolicy_reservationreminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StylistDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('locked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='locked at')),
+                ('stylist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.stylistprofile')),
+            ],
+            options={
+                'verbose_name': 'stylist day lock',
+                'verbose_name_plural': 'stylist day locks',
+                'constraints': [models.UniqueConstraint(fields=('stylist', 'date'), name='unique_stylist_day_lock')],
+            },
+        ),
+        migrations.RunPython(add_overlap_guard, remove_overlap_guard),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0004_stylistdaylock'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='reservation_number',
+            field=models.CharField(max_length=20, unique=True, verbose_name='reservation number'),
+        ),
+    ]
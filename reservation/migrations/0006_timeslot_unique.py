@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0005_alter_reservation_number'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='timeslot',
+            constraint=models.UniqueConstraint(fields=('stylist', 'date', 'start_time'), name='unique_time_slot'),
+        ),
+    ]
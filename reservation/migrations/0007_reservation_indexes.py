@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0006_timeslot_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['stylist', 'date', 'start_time'], name='res_stylist_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'status', 'date'], name='res_customer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['salon', 'status', 'date'], name='res_salon_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=['stylist', 'date'], name='res_active_stylist_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status', 'confirmed')), fields=['date', 'end_time'], name='res_confirmed_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservationreminder',
+            index=models.Index(condition=models.Q(('is_sent', False)), fields=['schedule_time'], name='reminder_due_idx'),
+        ),
+    ]
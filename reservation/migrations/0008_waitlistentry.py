@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_stylistprofile_salon'),
+        ('reservation', '0007_reservation_indexes'),
+        ('salon', '0006_salonspecialday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('earliest_time', models.TimeField(blank=True, null=True, verbose_name='earliest time')),
+                ('latest_time', models.TimeField(blank=True, null=True, verbose_name='latest time')),
+                ('duration', models.PositiveIntegerField(help_text='Needed time in minutes', verbose_name='duration')),
+                ('priority', models.SmallIntegerField(default=0, help_text='Higher priority is offered first', verbose_name='priority')),
+                ('status', models.CharField(choices=[('waiting', 'waiting'), ('offered', 'offered'), ('booked', 'booked'), ('expired', 'expired')], default='waiting', max_length=10, verbose_name='status')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('offered_at', models.DateTimeField(blank=True, null=True, verbose_name='offered at')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.customerprofile')),
+                ('offered_reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_offers', to='reservation.reservation', verbose_name='offered reservation')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='salon.salon')),
+                ('stylist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.stylistprofile')),
+            ],
+            options={
+                'verbose_name': 'waitlist entry',
+                'verbose_name_plural': 'waitlist entries',
+                'ordering': ['-priority', 'created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'waiting')), fields=['stylist', 'date', 'created_at'], name='waitlist_waiting_idx')],
+            },
+        ),
+    ]
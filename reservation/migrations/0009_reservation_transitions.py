@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_bogus_timestamps(apps, schema_editor):
+    # این فیلدها قبلاً auto_now بودند و در هر ذخیره بازنویسی می‌شدند
+    Reservation = apps.get_model('reservation', 'Reservation')
+    Reservation.objects.exclude(status='cancelled').update(cancelled_at=None)
+    Reservation.objects.filter(status__in=['pending', 'rejected']).update(confirmed_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0008_waitlistentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='cancelled at'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='confirmed at'),
+        ),
+        migrations.CreateModel(
+            name='ReservationStatusLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed')], max_length=10, verbose_name='from status')),
+                ('to_status', models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed')], max_length=10, verbose_name='to status')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='changed by')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_logs', to='reservation.reservation')),
+            ],
+            options={
+                'verbose_name': 'reservation status log',
+                'verbose_name_plural': 'reservation status logs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(clear_bogus_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0009_reservation_transitions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed'), ('no_show', 'no_show')], default='pending', max_length=10, verbose_name='status'),
+        ),
+        migrations.AlterField(
+            model_name='reservationstatuslog',
+            name='from_status',
+            field=models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed'), ('no_show', 'no_show')], max_length=10, verbose_name='from status'),
+        ),
+        migrations.AlterField(
+            model_name='reservationstatuslog',
+            name='to_status',
+            field=models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed'), ('no_show', 'no_show')], max_length=10, verbose_name='to status'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_stylistprofile_salon'),
+        ('reservation', '0010_reservation_no_show'),
+        ('salon', '0008_pricingrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerHistoryEntry',
+            fields=[
+                ('reservation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='history_entry', serialize=False, to='reservation.reservation')),
+                ('reservation_number', models.CharField(max_length=20, verbose_name='reservation number')),
+                ('date', models.DateField(verbose_name='date')),
+                ('start_time', models.TimeField(verbose_name='start time')),
+                ('end_time', models.TimeField(verbose_name='end time')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('confirmed', 'confirmed'), ('cancelled', 'cancelled'), ('rejected', 'rejected'), ('completed', 'completed'), ('no_show', 'no_show')], max_length=10, verbose_name='status')),
+                ('salon_name', models.CharField(blank=True, max_length=100, verbose_name='salon name')),
+                ('stylist_name', models.CharField(blank=True, max_length=300, verbose_name='stylist name')),
+                ('service_names', models.TextField(blank=True, verbose_name='service names')),
+                ('final_price', models.DecimalField(decimal_places=0, default=0, max_digits=10, verbose_name='final price')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='updated at')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history_entries', to='account.customerprofile', verbose_name='customer')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='salon.salon', verbose_name='salon')),
+                ('stylist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='account.stylistprofile', verbose_name='stylist')),
+            ],
+            options={
+                'verbose_name': 'customer history entry',
+                'verbose_name_plural': 'customer history entries',
+                'ordering': ['-date', '-start_time', '-reservation'],
+                'indexes': [models.Index(fields=['customer', '-date', '-start_time', '-reservation'], name='history_customer_keyset_idx')],
+            },
+        ),
+    ]
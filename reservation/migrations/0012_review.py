@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_stylistprofile_rating_sum'),
+        ('reservation', '0011_customerhistoryentry'),
+        ('salon', '0010_salon_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='rating')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='comment')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='account.customerprofile', verbose_name='customer')),
+                ('reservation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review', to='reservation.reservation', verbose_name='reservation')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='salon.salon', verbose_name='salon')),
+                ('stylist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='account.stylistprofile', verbose_name='stylist')),
+            ],
+            options={
+                'verbose_name': 'review',
+                'verbose_name_plural': 'reviews',
+                'ordering': ['-created_at'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('rating__gte', 1), ('rating__lte', 5)), name='review_rating_range')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+# نسخه قبلی 0004 پایان 00:00 را ابتدای همان روز می‌گرفت و بازه نامعتبر می‌ساخت
+EXCLUSION_SQL = (
+    "ALTER TABLE reservation_reservation DROP CONSTRAINT IF EXISTS reservation_no_overlap;"
+    "ALTER TABLE reservation_reservation ADD CONSTRAINT reservation_no_overlap "
+    "EXCLUDE USING gist (stylist_id WITH =, "
+    "tsrange(date + start_time, date + end_time + (end_time = '00:00')::int * interval '1 day') WITH &&) "
+    "WHERE (status IN ('pending', 'confirmed'));"
+)
+
+
+def replace_overlap_guard(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")
+        if not cursor.fetchone():
+            # 0004 بدون این افزونه اجرا نمی‌شود؛ این حالت یعنی قید عمدا حذف شده است
+            return
+    schema_editor.execute(EXCLUSION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0012_review'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_overlap_guard, migrations.RunPython.noop),
+    ]
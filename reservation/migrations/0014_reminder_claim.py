@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0013_reservation_overlap_midnight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservationreminder',
+            name='claim_token',
+            field=models.UUIDField(blank=True, null=True, verbose_name='claim_token'),
+        ),
+        migrations.AddField(
+            model_name='reservationreminder',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='claimed_at'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0014_reminder_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='res_active_stylist_day_idx',
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import F, IntegerField, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def backfill_rating_sums(apps, schema_editor):
+    # rating_sum با مقدار 0 اضافه شد؛ بدون پر کردن آن، اولین نظر جدید میانگین‌های قبلی را خراب می‌کند.
+    # میانگین و تعداد قبلی حفظ می‌شوند و مجموع از آن‌ها ساخته می‌شود
+    count = Coalesce(F('rating_count'), 0)
+    fields = {
+        'rating_sum': Cast(Round(Coalesce(F('rating_average'), Value(0)) * count), IntegerField()),
+        'rating_count': count,
+    }
+    apps.get_model('salon', 'Salon').objects.update(**fields)
+    apps.get_model('account', 'StylistProfile').objects.update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_stylistprofile_rating_sum'),
+        ('reservation', '0015_remove_active_stylist_day_idx'),
+        ('salon', '0010_salon_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_sums, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0016_backfill_rating_sums'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(condition=models.Q(('status', 'offered')), fields=['offered_at'], name='waitlist_offered_idx'),
+        ),
+    ]
@@ -1,11 +1,46 @@
-from django.db import models
-from django.core.validators import MinValueValidator
+from datetime import datetime, timedelta
+
+from django.db import models, transaction
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models import TimeField
 from django.utils import timezone
 from account.models import User,CustomerProfile,StylistProfile
 from salon.models import Salon,Service
+from salon_reservation.reference_numbers import generate_reference
+from salon_reservation.timezones import default_time_zone, get_zone
+
+
+class SlotDateTimeMixin:
+    """
+    Aware ``start_datetime``/``end_datetime`` in the salon's local time zone.
+
+    Values are memoized per instance, keyed by date and time so edits to the
+    fields are picked up. Select the salon (``select_related``) when checking
+    many rows.
+    """
+
+    @property
+    def slot_timezone(self):
+        raise NotImplementedError
+
+    def _slot_datetime(self, time):
+        cache = self.__dict__.setdefault('_slot_datetimes', {})
+        key = (self.date, time)
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = datetime.combine(self.date, time, tzinfo=self.slot_timezone)
+        return value
+
+    @property
+    def start_datetime(self):
+        return self._slot_datetime(self.start_time)
+
+    @property
+    def end_datetime(self):
+        return self._slot_datetime(self.end_time)
+
 
-class TimeSlot(models.Model):
+class TimeSlot(SlotDateTimeMixin, models.Model):
     stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE)
     date = models.DateField(default=timezone.now)
     start_time: TimeField = models.TimeField(default=timezone.now)
@@ -17,28 +52,68 @@ class TimeSlot(models.Model):
         ordering = ['-date']
         verbose_name = 'time slot'
         verbose_name_plural = 'time slots'
+        constraints = [
+            models.UniqueConstraint(fields=['stylist', 'date', 'start_time'], name='unique_time_slot'),
+        ]
 
     def __str__(self):
         return f'{self.stylist} - {self.date}'
 
+    @property
+    def slot_timezone(self):
+        salon = self.stylist.salon if self.stylist.salon_id else None
+        return salon.tzinfo if salon else get_zone(default_time_zone())
+
     def is_past(self):
         """بررسی گذشته بودن زمان"""
-        from datetime import datetime
-        slot_datetime = datetime.combine(self.date, self.start_time)
-        return timezone.now() > timezone.make_aware(slot_datetime)
+        return timezone.now() > self.start_datetime
+
+class InvalidTransition(Exception):
+    """A reservation cannot move from its current status to the requested one."""
+
 
-class Reservation(models.Model):
+class ReservationQuerySet(models.QuerySet):
+
+    def transition(self, status, changed_by=None):
+        """
+        Move every reservation in the queryset that may legally reach ``status``.
+
+        Runs one ``UPDATE`` (setting the transition's timestamp), one bulk
+        insert of ``ReservationStatusLog`` rows and one ``UPDATE`` of their
+        ``CustomerHistoryEntry`` rows; reservations whose current status has
+        no edge to ``status`` are left untouched. Returns the number of
+        reservations moved.
+        """
+        sources = Reservation.sources_of(status)
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(self.filter(status__in=sources).select_for_update().values_list('pk', 'status'))
+            if not rows:
+                return 0
+            moved = Reservation.objects.filter(pk__in=[pk for pk, _ in rows], status__in=sources).update(
+                **Reservation.transition_fields(status, now))
+            ReservationStatusLog.objects.bulk_create(
+                ReservationStatusLog(reservation_id=pk, from_status=previous, to_status=status,
+                                     changed_by=changed_by, created_at=now)
+                for pk, previous in rows
+            )
+            CustomerHistoryEntry.objects.filter(reservation_id__in=[pk for pk, _ in rows]).update(
+                status=status, updated_at=now)
+        return moved
+
+
+class Reservation(SlotDateTimeMixin, models.Model):
 
-    objects = None
     STATUS_CHOICES = [
         ('pending' , 'pending'),
         ('confirmed' , 'confirmed'),
         ('cancelled' , 'cancelled'),
         ('rejected' , 'rejected'),
         ('completed' , 'completed'),
+        ('no_show' , 'no_show'),
     ]
 
-    reservation_number = models.CharField(max_length=10, unique=True , verbose_name='reservation number')
+    reservation_number = models.CharField(max_length=20, unique=True , verbose_name='reservation number')
     customer = models.ForeignKey(CustomerProfile,on_delete=models.CASCADE)
     salon = models.ForeignKey(Salon,on_delete=models.CASCADE)
     stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE)
@@ -61,13 +136,31 @@ class Reservation(models.Model):
     #date
     created_at = models.DateTimeField(auto_now_add=True , verbose_name='created at')
     updated_at = models.DateTimeField(auto_now=True , verbose_name='updated at')
-    confirmed_at = models.DateTimeField(auto_now=True , verbose_name='confirmed at')
-    cancelled_at = models.DateTimeField(auto_now=True , verbose_name='cancelled at')
+    confirmed_at = models.DateTimeField(null=True, blank=True , verbose_name='confirmed at')
+    cancelled_at = models.DateTimeField(null=True, blank=True , verbose_name='cancelled at')
+
+    # انتقال‌های مجاز وضعیت و زمانی که هر انتقال ثبت می‌کند
+    TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled', 'rejected'),
+        'confirmed': ('completed', 'cancelled', 'no_show'),
+    }
+    TRANSITION_TIMESTAMPS = {
+        'confirmed': 'confirmed_at',
+        'cancelled': 'cancelled_at',
+    }
+
+    objects = ReservationQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'reservation'
         verbose_name_plural = 'reservations'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['stylist', 'date', 'start_time'], name='res_stylist_day_idx'),
+            models.Index(fields=['customer', 'status', 'date'], name='res_customer_status_idx'),
+            models.Index(fields=['salon', 'status', 'date'], name='res_salon_status_idx'),
+            models.Index(fields=['date', 'end_time'], condition=models.Q(status='confirmed'), name='res_confirmed_end_idx'),
+        ]
 
     def __str__(self):
         return f'{self.salon} - {self.date}'
@@ -75,31 +168,139 @@ class Reservation(models.Model):
     def save(self, *args, **kwargs):
         # تولید شماره رزرو اگر وجود نداشته باشد
         if not self.reservation_number:
-            import random
-            import string
-            while True:
-                number = 'RES' + ''.join(random.choices(string.digits, k=10))
-                if not Reservation.objects.filter(reservation_number=number).exists():
-                    self.reservation_number = number
-                    break
+            self.reservation_number = generate_reference('RES')
 
         # محاسبه قیمت نهایی
         self.final_price = self.total_price - self.discount_amount
 
         super().save(*args, **kwargs)
 
+    @classmethod
+    def sources_of(cls, status):
+        """Statuses that have an edge to ``status``."""
+        return [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+
+    @classmethod
+    def transition_fields(cls, status, now):
+        fields = {'status': status, 'updated_at': now}
+        if status in cls.TRANSITION_TIMESTAMPS:
+            fields[cls.TRANSITION_TIMESTAMPS[status]] = now
+        return fields
+
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+
+    def transition_to(self, status, changed_by=None):
+        """
+        Move this reservation to ``status`` and record it in the audit trail.
+
+        Raises ``InvalidTransition`` for an illegal edge, or when the stored
+        status changed under us.
+        """
+        if not self.can_transition_to(status):
+            raise InvalidTransition(f'{self.reservation_number}: {self.status} -> {status}')
+        now = timezone.now()
+        fields = self.transition_fields(status, now)
+        with transaction.atomic():
+            if not Reservation.objects.filter(pk=self.pk, status=self.status).update(**fields):
+                raise InvalidTransition(f'{self.reservation_number}: status changed concurrently')
+            ReservationStatusLog.objects.create(
+                reservation=self, from_status=self.status, to_status=status, changed_by=changed_by, created_at=now)
+            CustomerHistoryEntry.objects.filter(reservation_id=self.pk).update(status=status, updated_at=now)
+        for name, value in fields.items():
+            setattr(self, name, value)
+        return self
+
+    @property
+    def slot_timezone(self):
+        return self.salon.tzinfo
+
     def can_cancel(self):
         """بررسی امکان لغو رزرو (حداقل 24 ساعت قبل)"""
-        from datetime import datetime, timedelta
-        reservation_datetime = datetime.combine(self.date, self.start_time)
-        now = timezone.now()
-        return now < timezone.make_aware(reservation_datetime) - timedelta(hours=24)
+        return timezone.now() < self.start_datetime - timedelta(hours=24)
 
     def is_past(self):
         """بررسی گذشته بودن زمان رزرو"""
-        from datetime import datetime
-        reservation_datetime = datetime.combine(self.date, self.end_time)
-        return timezone.now() > timezone.make_aware(reservation_datetime)
+        return timezone.now() > self.end_datetime
+
+class ReservationStatusLog(models.Model):
+    """تاریخچه تغییر وضعیت رزرو"""
+
+    reservation = models.ForeignKey(Reservation,on_delete=models.CASCADE , related_name='status_logs')
+    from_status = models.CharField(max_length=10, choices=Reservation.STATUS_CHOICES , verbose_name='from status')
+    to_status = models.CharField(max_length=10, choices=Reservation.STATUS_CHOICES , verbose_name='to status')
+    changed_by = models.ForeignKey(User,on_delete=models.SET_NULL , null=True, blank=True , verbose_name='changed by')
+    created_at = models.DateTimeField(default=timezone.now , verbose_name='created at')
+
+    class Meta:
+        verbose_name = 'reservation status log'
+        verbose_name_plural = 'reservation status logs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.reservation_id}: {self.from_status} -> {self.to_status}'
+
+class StylistDayLock(models.Model):
+    """ردیف قفل برای هر روز کاری آرایشگر؛ رزروهای هم‌زمان روی آن صف می‌شوند"""
+
+    stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE)
+    date = models.DateField(verbose_name='date')
+    locked_at = models.DateTimeField(default=timezone.now , verbose_name='locked at')
+
+    class Meta:
+        verbose_name = 'stylist day lock'
+        verbose_name_plural = 'stylist day locks'
+        constraints = [
+            models.UniqueConstraint(fields=['stylist', 'date'], name='unique_stylist_day_lock'),
+        ]
+
+    def __str__(self):
+        return f'{self.stylist_id} - {self.date}'
+
+class WaitlistEntry(models.Model):
+    """مشتری در انتظار آزاد شدن نوبت یک آرایشگر در یک روز"""
+
+    STATUS_CHOICES = [
+        ('waiting' , 'waiting'),
+        ('offered' , 'offered'),
+        ('booked' , 'booked'),
+        ('expired' , 'expired'),
+    ]
+
+    customer = models.ForeignKey(CustomerProfile,on_delete=models.CASCADE)
+    salon = models.ForeignKey(Salon,on_delete=models.CASCADE)
+    stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE)
+    date = models.DateField(verbose_name='date')
+    earliest_time = models.TimeField(null=True, blank=True , verbose_name='earliest time')
+    latest_time = models.TimeField(null=True, blank=True , verbose_name='latest time')
+    duration = models.PositiveIntegerField(verbose_name='duration' , help_text='Needed time in minutes')
+    priority = models.SmallIntegerField(default=0 , verbose_name='priority' , help_text='Higher priority is offered first')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting' , verbose_name='status')
+    offered_reservation = models.ForeignKey(Reservation,on_delete=models.SET_NULL , null=True, blank=True , related_name='waitlist_offers' , verbose_name='offered reservation')
+
+    created_at = models.DateTimeField(auto_now_add=True , verbose_name='created at')
+    offered_at = models.DateTimeField(null=True, blank=True , verbose_name='offered at')
+
+    class Meta:
+        verbose_name = 'waitlist entry'
+        verbose_name_plural = 'waitlist entries'
+        ordering = ['-priority', 'created_at']
+        indexes = [
+            models.Index(fields=['stylist', 'date', 'created_at'], condition=models.Q(status='waiting'), name='waitlist_waiting_idx'),
+            models.Index(fields=['offered_at'], condition=models.Q(status='offered'), name='waitlist_offered_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.customer_id} - {self.stylist_id} - {self.date}'
+
+    def fits(self, start_time, end_time):
+        """آیا بازه آزاد شده برای این درخواست کافی است"""
+        start = max(start_time, self.earliest_time) if self.earliest_time else start_time
+        end = min(end_time, self.latest_time) if self.latest_time else end_time
+        if end <= start:
+            return False
+        minutes = (datetime.combine(self.date, end) - datetime.combine(self.date, start)).seconds // 60
+        return minutes >= self.duration
 
 class ReservationPolicy(models.Model):
 
@@ -141,13 +342,77 @@ class ReservationReminder(models.Model):
     schedule_time = models.DateTimeField(default=timezone.now , verbose_name='schedule_time')
     is_sent = models.BooleanField(default=False)
     sent_at = models.DateTimeField(default=timezone.now , verbose_name='sent_at')
+    claim_token = models.UUIDField(null=True, blank=True , verbose_name='claim_token')
+    claimed_at = models.DateTimeField(null=True, blank=True , verbose_name='claimed_at')
 
     class Meta:
         verbose_name = 'reminder'
         verbose_name_plural = 'reminders'
+        indexes = [
+            models.Index(fields=['schedule_time'], condition=models.Q(is_sent=False), name='reminder_due_idx'),
+        ]
 
 
     def __str__(self):
         return f'{self.reservation} - {self.reminder_type}'
 
 
+
+
+class CustomerHistoryEntry(models.Model):
+    """نسخه تخت رزرو برای صفحه «رزروهای من»؛ توسط reservation/history.py به‌روز می‌شود"""
+
+    reservation = models.OneToOneField(Reservation,on_delete=models.CASCADE , primary_key=True , related_name='history_entry')
+    customer = models.ForeignKey(CustomerProfile,on_delete=models.CASCADE , related_name='history_entries' , verbose_name='customer')
+    reservation_number = models.CharField(max_length=20 , verbose_name='reservation number')
+
+    date = models.DateField(verbose_name='date')
+    start_time = models.TimeField(verbose_name='start time')
+    end_time = models.TimeField(verbose_name='end time')
+    status = models.CharField(max_length=10, choices=Reservation.STATUS_CHOICES , verbose_name='status')
+
+    salon = models.ForeignKey(Salon,on_delete=models.CASCADE , related_name='+' , verbose_name='salon')
+    salon_name = models.CharField(max_length=100 , blank=True , verbose_name='salon name')
+    stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE , related_name='+' , verbose_name='stylist')
+    stylist_name = models.CharField(max_length=300 , blank=True , verbose_name='stylist name')
+    service_names = models.TextField(blank=True , verbose_name='service names')
+    final_price = models.DecimalField(max_digits=10 , decimal_places=0 , default=0 , verbose_name='final price')
+
+    updated_at = models.DateTimeField(default=timezone.now , verbose_name='updated at')
+
+    class Meta:
+        verbose_name = 'customer history entry'
+        verbose_name_plural = 'customer history entries'
+        ordering = ['-date', '-start_time', '-reservation']
+        indexes = [
+            models.Index(fields=['customer', '-date', '-start_time', '-reservation'], name='history_customer_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.customer_id} - {self.reservation_number}'
+
+
+class Review(models.Model):
+    """نظر و امتیاز مشتری برای یک رزرو انجام شده؛ از طریق reservation/reviews.py ثبت می‌شود"""
+
+    reservation = models.OneToOneField(Reservation,on_delete=models.CASCADE , related_name='review' , verbose_name='reservation')
+    customer = models.ForeignKey(CustomerProfile,on_delete=models.CASCADE , related_name='reviews' , verbose_name='customer')
+    salon = models.ForeignKey(Salon,on_delete=models.CASCADE , related_name='reviews' , verbose_name='salon')
+    stylist = models.ForeignKey(StylistProfile,on_delete=models.CASCADE , related_name='reviews' , verbose_name='stylist')
+
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)] , verbose_name='rating')
+    comment = models.TextField(verbose_name='comment' , null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True , verbose_name='created at')
+    updated_at = models.DateTimeField(auto_now=True , verbose_name='updated at')
+
+    class Meta:
+        verbose_name = 'review'
+        verbose_name_plural = 'reviews'
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(rating__gte=1, rating__lte=5), name='review_rating_range'),
+        ]
+
+    def __str__(self):
+        return f'{self.reservation} - {self.rating}'
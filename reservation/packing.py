@@ -0,0 +1,126 @@
+"""
+Multi-service appointment packing.
+
+Given a basket of services (booked back to back, in the given order), find the
+best itineraries across a salon's stylists: one stylist for the whole basket
+when possible, otherwise as few stylist hand-overs as possible, earliest first.
+
+Each stylist-day is a ``DayCalendar`` bitmap. For service ``i`` with offset
+``o_i`` from the start of the appointment, ``fit_mask`` gives every tick where
+some stylist can start it; shifting those masks by ``o_i`` and AND-ing them
+sweeps the whole day at once and leaves exactly the feasible start ticks. Only
+those starts are expanded into itineraries.
+"""
+import heapq
+from collections import namedtuple
+from datetime import timedelta
+
+from .availability import AvailabilityEngine
+from .bitmap import DayCalendar, TICK_MINUTES, TICKS_PER_DAY, ticks, tick_time
+
+Leg = namedtuple('Leg', ['service', 'stylist_id', 'start_time', 'end_time'])
+Itinerary = namedtuple('Itinerary', ['date', 'start_time', 'end_time', 'switches', 'legs'])
+
+
+def _grid_mask(step):
+    every = max(ticks(step), 1)
+    mask = 0
+    for tick in range(0, TICKS_PER_DAY, every):
+        mask |= 1 << tick
+    return mask
+
+
+def _assign(candidates):
+    """
+    Stylist per service with the fewest hand-overs.
+
+    ``candidates[i]`` is the set of stylists free for service ``i``. Greedily
+    keeping the stylist that covers the longest run of consecutive services is
+    optimal for this interval-cover problem.
+    """
+    assignment = []
+    i = 0
+    while i < len(candidates):
+        best, best_run = None, 0
+        for stylist_id in sorted(candidates[i]):
+            run = 1
+            while i + run < len(candidates) and stylist_id in candidates[i + run]:
+                run += 1
+            if run > best_run:
+                best, best_run = stylist_id, run
+        assignment.extend([best] * best_run)
+        i += best_run
+    return assignment
+
+
+def pack_day(calendars, services, step=15):
+    """
+    Feasible itineraries on one day as ``(switches, start_tick, legs)``.
+
+    ``calendars`` maps stylist id to ``DayCalendar``; ``services`` have a
+    ``duration`` in minutes.
+    """
+    lengths = [ticks(service.duration or 0) for service in services]
+    offsets = [sum(lengths[:i]) for i in range(len(lengths))]
+    fits = [
+        {stylist_id: calendar.fit_mask(length * TICK_MINUTES) for stylist_id, calendar in calendars.items()}
+        for length in lengths
+    ]
+
+    starts = _grid_mask(step)
+    for i, offset in enumerate(offsets):
+        any_fit = 0
+        for mask in fits[i].values():
+            any_fit |= mask
+        starts &= any_fit >> offset
+        if not starts:
+            return []
+
+    results = []
+    while starts:
+        start = (starts & -starts).bit_length() - 1
+        starts &= starts - 1
+        candidates = [
+            {stylist_id for stylist_id, mask in fits[i].items() if mask >> (start + offsets[i]) & 1}
+            for i in range(len(services))
+        ]
+        assignment = _assign(candidates)
+        switches = sum(1 for a, b in zip(assignment, assignment[1:]) if a != b)
+        legs = [
+            Leg(service, stylist_id, tick_time(start + offset), tick_time(start + offset + length))
+            for service, stylist_id, offset, length in zip(services, assignment, offsets, lengths)
+        ]
+        results.append((switches, start, legs))
+    return results
+
+
+def pack_services(salon, services, start_date, days=14, limit=5, step=15, stylists=None):
+    """
+    The ``limit`` best itineraries for ``services`` at ``salon`` from ``start_date``.
+
+    Itineraries are ranked by number of stylist hand-overs, then date, then
+    start time. ``stylists`` defaults to every stylist of the salon.
+    """
+    services = list(services)
+    if not services:
+        return []
+    if stylists is None:
+        stylists = salon.stylists.values_list('pk', flat=True)
+    end_date = start_date + timedelta(days=days - 1)
+    engine = AvailabilityEngine(list(stylists), start_date, end_date)
+
+    ranked = []
+    day = start_date
+    while day <= end_date:
+        calendars = {
+            stylist_id: DayCalendar.from_intervals(engine.intervals(stylist_id, day))
+            for stylist_id in engine.stylist_ids
+        }
+        for switches, start, legs in pack_day(calendars, services, step):
+            ranked.append(((switches, day, start), legs))
+        day += timedelta(days=1)
+
+    return [
+        Itinerary(day, legs[0].start_time, legs[-1].end_time, switches, legs)
+        for (switches, day, _), legs in heapq.nsmallest(limit, ranked, key=lambda item: item[0])
+    ]
@@ -0,0 +1,193 @@
+"""
+Reservation reminder scheduling and delivery.
+
+``schedule_reminders`` plans the reminders of confirmed reservations in one
+``bulk_create``.
+
+Due reminders are claimed in batches by a conditional ``UPDATE`` that stamps
+a fresh ``claim_token`` only on rows no one else holds, so several dispatcher
+processes (on any database, SQLite included) never pick up the same rows.
+The claim is a single statement, i.e. a short transaction of its own; the
+batch is then sent through a thread pool with no transaction or lock open,
+and marked sent with one ``UPDATE``. Failed sends release their claim but
+keep ``claimed_at``, so they are retried only after
+``RESERVATION_REMINDER_RETRY_DELAY`` and a down backend is not hammered; a
+claim older than ``RESERVATION_REMINDER_CLAIM_TIMEOUT`` (a crashed
+dispatcher) is taken over. Delivery goes through a backend per reminder type,
+configured with ``RESERVATION_REMINDER_BACKENDS`` (dotted paths keyed by
+``sms``/``email``/``notify``).
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ReservationReminder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'reservation.reminders.ConsoleBackend'
+DEFAULT_REMINDER_HOURS = (24,)
+DEFAULT_CLAIM_TIMEOUT = timedelta(minutes=10)
+DEFAULT_RETRY_DELAY = timedelta(minutes=1)
+
+
+class BaseReminderBackend:
+    """
+    Delivers messages to customers; ``deliver`` returns ``True`` when it went out.
+
+    ``send`` delivers a reminder to its reservation's customer.
+    """
+
+    def deliver(self, customer, message):
+        raise NotImplementedError
+
+    def send(self, reminder, message):
+        return self.deliver(reminder.reservation.customer, message)
+
+
+class ConsoleBackend(BaseReminderBackend):
+    """Writes messages to the log instead of delivering them."""
+
+    def deliver(self, customer, message):
+        logger.info('message for customer %s: %s', customer.pk, message)
+        return True
+
+
+class LocmemBackend(BaseReminderBackend):
+    """Keeps sent messages in memory; for tests and load runs."""
+
+    def __init__(self):
+        self.outbox = []
+
+    def deliver(self, customer, message):
+        self.outbox.append((customer.pk, message))
+        return True
+
+
+@lru_cache(maxsize=None)
+def get_backend(reminder_type):
+    backends = getattr(settings, 'RESERVATION_REMINDER_BACKENDS', {})
+    return import_string(backends.get(reminder_type, DEFAULT_BACKEND))()
+
+
+def build_message(reminder):
+    reservation = reminder.reservation
+    return (
+        f'یادآوری نوبت {reservation.reservation_number}: '
+        f'{reservation.salon.name or ""} {reservation.date:%Y-%m-%d} {reservation.start_time:%H:%M}'
+    )
+
+
+def _deliver(reminder):
+    try:
+        return get_backend(reminder.reminder_type).send(reminder, build_message(reminder))
+    except Exception:
+        logger.exception('sending reminder %s failed', reminder.pk)
+        return False
+
+
+def allowed_types(customer):
+    """Reminder types the customer's notification preferences allow."""
+    types = ['notify']
+    if customer.phone_notification:
+        types.append('sms')
+    if customer.email_notification:
+        types.append('email')
+    return types
+
+
+def schedule_reminders(reservations, now=None):
+    """
+    Create every allowed reminder for confirmed ``reservations`` in one ``bulk_create``.
+
+    One reminder is planned per allowed type and per ``RESERVATION_REMINDER_HOURS``
+    entry (hours before the start). Reminders whose time has already passed, or
+    that already exist, are skipped. Pass reservations with ``customer`` and
+    ``salon`` selected to avoid queries per reservation.
+    """
+    now = now or timezone.now()
+    hours = getattr(settings, 'RESERVATION_REMINDER_HOURS', DEFAULT_REMINDER_HOURS)
+    reservations = list(reservations)
+    if not reservations:
+        return []
+    existing = set(
+        ReservationReminder.objects.filter(reservation__in=reservations)
+        .values_list('reservation_id', 'reminder_type', 'hour_before')
+    )
+    reminders = []
+    for reservation in reservations:
+        start = reservation.start_datetime
+        for reminder_type in allowed_types(reservation.customer):
+            for hour_before in hours:
+                schedule_time = start - timedelta(hours=hour_before)
+                if schedule_time <= now or (reservation.pk, reminder_type, hour_before) in existing:
+                    continue
+                reminders.append(ReservationReminder(
+                    reservation=reservation,
+                    reminder_type=reminder_type,
+                    hour_before=hour_before,
+                    schedule_time=schedule_time,
+                ))
+    return ReservationReminder.objects.bulk_create(reminders)
+
+
+def claim_due(batch_size=500, now=None):
+    """
+    Claim up to ``batch_size`` due reminders for this caller and return them.
+
+    The ids are read and then stamped with a new token by an ``UPDATE`` that
+    repeats the "unclaimed" condition, so a row another dispatcher claimed in
+    between is not taken twice. The returned reminders have their reservation,
+    salon and customer selected.
+    """
+    now = now or timezone.now()
+    claimed_at = timezone.now()
+    timeout = getattr(settings, 'RESERVATION_REMINDER_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)
+    retry_delay = getattr(settings, 'RESERVATION_REMINDER_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+    claimable = ReservationReminder.objects.filter(is_sent=False, schedule_time__lte=now).filter(
+        Q(claimed_at=None)
+        | Q(claim_token=None, claimed_at__lt=claimed_at - retry_delay)
+        | Q(claimed_at__lt=claimed_at - timeout))
+    token = uuid.uuid4()
+    ids = list(claimable.order_by('schedule_time').values_list('pk', flat=True)[:batch_size])
+    # خود UPDATE یک تراکنش کوتاه است و شرط آزاد بودن را دوباره بررسی می‌کند
+    if not ids or not claimable.filter(pk__in=ids).update(claim_token=token, claimed_at=claimed_at):
+        return []
+    return list(
+        ReservationReminder.objects
+        .select_related('reservation__salon', 'reservation__customer__user')
+        .filter(claim_token=token)
+        .order_by('schedule_time')
+    )
+
+
+def dispatch_due(batch_size=500, workers=8, now=None):
+    """
+    Claim up to ``batch_size`` due reminders, send them and mark them sent.
+
+    Sending happens after the claim has committed, so no lock is held during
+    network I/O. Failed sends release their claim and are retried once
+    ``RESERVATION_REMINDER_RETRY_DELAY`` has passed. Returns ``(claimed, sent)``.
+    """
+    reminders = claim_due(batch_size, now)
+    if not reminders:
+        return 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_deliver, reminders))
+    token = reminders[0].claim_token
+    sent_ids = [reminder.pk for reminder, ok in zip(reminders, results) if ok]
+    failed_ids = [reminder.pk for reminder, ok in zip(reminders, results) if not ok]
+    mine = ReservationReminder.objects.filter(claim_token=token)
+    if sent_ids:
+        mine.filter(pk__in=sent_ids).update(is_sent=True, sent_at=timezone.now())
+    if failed_ids:
+        # claimed_at می‌ماند تا تلاش دوباره بعد از RETRY_DELAY باشد
+        mine.filter(pk__in=failed_ids).update(claim_token=None)
+    return len(reminders), len(sent_ids)
@@ -0,0 +1,128 @@
+"""
+Reviews of completed reservations and the rating aggregates they feed.
+
+``Salon`` and ``StylistProfile`` keep ``rating_sum``, ``rating_count`` and
+``rating_average``. Adding, changing or deleting a review applies its delta
+with one ``UPDATE`` per row using ``F()`` expressions. The database computes
+the new average from the stored sum and count in the same statement, so
+concurrent reviews never lose updates and nothing is re-averaged.
+``recompute_ratings`` rebuilds all three fields from the reviews table to
+repair drift, e.g. after reviews were edited outside these functions.
+Rows that predate ``rating_sum`` got it from their average and count in
+migration ``reservation.0016``, so their earlier ratings are kept.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Case, Count, DecimalField, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
+
+from account.models import StylistProfile
+from salon.models import Salon
+from salon.profile import bump_on_commit
+from .models import Review
+
+AVERAGE_FIELD = DecimalField(max_digits=3, decimal_places=2)
+
+
+class ReviewNotAllowed(Exception):
+    """The reservation cannot be reviewed (not completed, not the customer's, or already reviewed)."""
+
+
+def _deltas(sum_delta, count_delta):
+    # rating_count در ردیف‌های قدیمی می‌تواند NULL باشد
+    new_count = Coalesce(F('rating_count'), 0) + count_delta
+    new_sum = F('rating_sum') + sum_delta
+    return {
+        'rating_sum': new_sum,
+        'rating_count': new_count,
+        'rating_average': Case(
+            When(GreaterThan(new_count, 0), then=Cast(Cast(new_sum, FloatField()) / new_count, AVERAGE_FIELD)),
+            default=Value(0),
+            output_field=AVERAGE_FIELD,
+        ),
+    }
+
+
+def _apply(review, sum_delta, count_delta):
+    fields = _deltas(sum_delta, count_delta)
+    Salon.objects.filter(pk=review.salon_id).update(**fields)
+    StylistProfile.objects.filter(pk=review.stylist_id).update(**fields)
+    bump_on_commit(review.salon_id)
+
+
+def submit_review(reservation, rating, comment='', customer=None):
+    """
+    Review a completed ``reservation``; ``customer`` defaults to its own customer.
+
+    Raises ``ReviewNotAllowed`` if it is not completed, belongs to someone
+    else or was already reviewed.
+    """
+    if reservation.status != 'completed':
+        raise ReviewNotAllowed(f'{reservation.reservation_number} is not completed')
+    if customer is not None and customer.pk != reservation.customer_id:
+        raise ReviewNotAllowed(f'{reservation.reservation_number} belongs to another customer')
+    review = Review(
+        reservation=reservation,
+        customer_id=reservation.customer_id,
+        salon_id=reservation.salon_id,
+        stylist_id=reservation.stylist_id,
+        rating=rating,
+        comment=comment,
+    )
+    review.full_clean(exclude=['reservation'])
+    try:
+        with transaction.atomic():
+            review.save()
+            _apply(review, rating, 1)
+    except IntegrityError as exc:
+        raise ReviewNotAllowed(f'{reservation.reservation_number} was already reviewed') from exc
+    return review
+
+
+def change_rating(review, rating, comment=None):
+    """Change a review's rating (and optionally its comment)."""
+    with transaction.atomic():
+        previous = Review.objects.select_for_update().values_list('rating', flat=True).get(pk=review.pk)
+        review.rating = rating
+        if comment is not None:
+            review.comment = comment
+        review.full_clean(exclude=['reservation'])
+        review.save(update_fields=['rating', 'comment', 'updated_at'])
+        if rating != previous:
+            _apply(review, rating - previous, 0)
+    return review
+
+
+def delete_review(review):
+    with transaction.atomic():
+        rating = Review.objects.select_for_update().values_list('rating', flat=True).get(pk=review.pk)
+        review.delete()
+        _apply(review, -rating, -1)
+
+
+def _recompute_fields(field):
+    reviews = Review.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return {
+        'rating_sum': Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        'rating_count': Coalesce(Subquery(reviews.annotate(count=Count('pk')).values('count')), 0),
+        'rating_average': Coalesce(
+            Cast(Subquery(reviews.annotate(average=Avg('rating')).values('average')), AVERAGE_FIELD),
+            Value(0), output_field=AVERAGE_FIELD),
+    }
+
+
+def recompute_ratings(salon_ids=None):
+    """Rebuild the aggregates of salons (and their stylists) from the reviews; returns ``(salons, stylists)``."""
+    salons = Salon.objects.all()
+    stylists = StylistProfile.objects.all()
+    if salon_ids is not None:
+        salons = salons.filter(pk__in=salon_ids)
+        stylists = stylists.filter(salon_id__in=salon_ids)
+    with transaction.atomic():
+        counts = (
+            salons.update(**_recompute_fields('salon')),
+            stylists.update(**_recompute_fields('stylist')),
+        )
+        for salon_id in salons.values_list('pk', flat=True):
+            bump_on_commit(salon_id)
+    return counts
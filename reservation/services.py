@@ -0,0 +1,103 @@
+"""
+Booking services for reservations.
+
+``book()`` serializes bookings per stylist-day on a ``StylistDayLock`` row
+inside a transaction, so the overlap check and the insert cannot interleave
+with a concurrent booking of the same chair. On PostgreSQL an exclusion
+constraint (see migrations 0004 and 0013) backs this up at the database level.
+It needs the ``btree_gist`` extension; if the migration user may not create
+extensions, a superuser has to run ``CREATE EXTENSION btree_gist`` once first.
+"""
+from datetime import time
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import ACTIVE_STATUSES
+from .models import Reservation, StylistDayLock
+from .waitlist import backfill, mark_booked
+
+MIDNIGHT = time(0)
+
+
+class SlotUnavailable(Exception):
+    """The requested time overlaps an active reservation of the stylist."""
+
+
+def overlapping(stylist, date, start_time, end_time):
+    """
+    Active reservations of ``stylist`` on ``date`` that overlap the given times.
+
+    An end time of 00:00 is midnight at the end of the day, on both sides.
+    """
+    # پایان 00:00 بعد از همه شروع‌های همان روز است
+    ends_after_start = Q(end_time__gt=start_time) | Q(end_time=MIDNIGHT)
+    starts_before_end = Q() if end_time == MIDNIGHT else Q(start_time__lt=end_time)
+    return Reservation.objects.filter(
+        ends_after_start,
+        starts_before_end,
+        stylist=stylist,
+        date=date,
+        status__in=ACTIVE_STATUSES,
+    )
+
+
+def lock_stylist_day(stylist, date):
+    """
+    Take an exclusive lock on the stylist's day for the current transaction.
+
+    Backends with row locks use ``select_for_update``. On SQLite, which ignores
+    ``FOR UPDATE``, writing to the lock row first takes the database write lock,
+    which likewise holds off other bookings until commit.
+    """
+    if connection.features.has_select_for_update:
+        lock, _ = StylistDayLock.objects.get_or_create(stylist=stylist, date=date)
+        return StylistDayLock.objects.select_for_update().get(pk=lock.pk)
+
+    if not StylistDayLock.objects.filter(stylist=stylist, date=date).update(locked_at=timezone.now()):
+        return StylistDayLock.objects.create(stylist=stylist, date=date)
+    return StylistDayLock.objects.get(stylist=stylist, date=date)
+
+
+def book(customer, salon, stylist, date, start_time, end_time, services=(), discount_amount=0, status='pending'):
+    """
+    Create a reservation if the stylist is free, atomically.
+
+    Raises ``SlotUnavailable`` when the time overlaps an active reservation.
+    """
+    services = list(services)
+    try:
+        with transaction.atomic():
+            lock_stylist_day(stylist, date)
+            if overlapping(stylist, date, start_time, end_time).exists():
+                raise SlotUnavailable(f'{stylist} is not available on {date} {start_time}-{end_time}')
+
+            reservation = Reservation(
+                customer=customer,
+                salon=salon,
+                stylist=stylist,
+                date=date,
+                start_time=start_time,
+                end_time=end_time,
+                total_price=sum((service.get_final_price() or 0) for service in services),
+                discount_amount=discount_amount,
+                status=status,
+            )
+            reservation.save()
+            if services:
+                reservation.service.set(services)
+            mark_booked(customer, stylist, date)
+    except IntegrityError as exc:
+        # قید انحصاری PostgreSQL هم‌پوشانی را رد کرده است
+        if 'reservation_no_overlap' not in str(exc):
+            raise
+        raise SlotUnavailable(str(exc)) from exc
+    return reservation
+
+
+def cancel(reservation, changed_by=None):
+    """Cancel a reservation and, once committed, offer its time to the waitlist."""
+    reservation.transition_to('cancelled', changed_by=changed_by)
+    transaction.on_commit(lambda: backfill(reservation))
+    return reservation
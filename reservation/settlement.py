@@ -0,0 +1,121 @@
+"""
+Nightly cancellation settlement.
+
+Cancellation fees for every cancelled reservation in a period are computed in
+the database, with the same rule as ``ReservationPolicy.calculate_canceling_fee``:
+no fee if the reservation was cancelled more than ``free_canceling_hours`` before
+its start, otherwise ``canceling_free_percentage`` of the final price. The start
+is the reservation's date and time in its salon's time zone, and the fee is
+computed as a decimal. Period dates are salon-local too: a salon's day runs
+from its own midnight to the next. Rows come back as dicts; no model instances
+are created.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import NotSupportedError
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, FloatField, Func, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from salon_reservation.timezones import default_time_zone, get_zone, salon_zones
+from .models import Reservation, ReservationPolicy
+
+FEE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+ZERO_FEE = Value(Decimal('0.00'), output_field=FEE_FIELD)
+
+
+class HoursBeforeStart(Func):
+    """
+    Hours between ``cancelled_at`` and the reservation's ``date`` + ``start_time``.
+
+    The start is local to the zone in ``timezone`` (the salon's by default).
+    SQLite converts it with the ``salon_local_to_utc`` function registered in
+    ``salon_reservation.timezones``.
+    """
+
+    output_field = FloatField()
+    templates = {
+        'sqlite': "(ROUND((julianday(salon_local_to_utc({date}, {start}, {tz})) - julianday({cancelled})) * 86400) / 3600.0)",
+        'postgresql': "(EXTRACT(EPOCH FROM (({date} + {start}) AT TIME ZONE {tz} - {cancelled})) / 3600)",
+        'mysql': "(TIMESTAMPDIFF(SECOND, {cancelled}, CONVERT_TZ(TIMESTAMP({date}, {start}), {tz}, 'UTC')) / 3600)",
+    }
+
+    def __init__(self, date='date', start_time='start_time', cancelled_at='cancelled_at', timezone='salon__timezone'):
+        super().__init__(F(date), F(start_time), F(cancelled_at), Coalesce(F(timezone), Value(default_time_zone())))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        template = self.templates.get(connection.vendor)
+        if template is None:
+            raise NotSupportedError(f'HoursBeforeStart is not implemented for {connection.vendor}')
+        parts = {}
+        for name, expression in zip(('date', 'start', 'cancelled', 'tz'), self.get_source_expressions()):
+            sql, params = compiler.compile(expression)
+            parts[name] = (sql, list(params))
+        # پارامترها به ترتیب ظاهر شدن در قالب
+        order = sorted((name for name in parts if '{%s}' % name in template), key=lambda name: template.index('{%s}' % name))
+        sql = template.format(**{name: part[0] for name, part in parts.items()})
+        return sql, [param for name in order for param in parts[name][1]]
+
+
+def _policy(field):
+    return Subquery(
+        ReservationPolicy.objects.filter(salon=OuterRef('salon'), is_active=True)
+        .order_by('-pk').values(field)[:1]
+    )
+
+
+def with_cancellation_fees(queryset):
+    """Annotate reservations with ``hours_before``, policy fields and ``cancellation_fee``."""
+    return queryset.annotate(
+        free_canceling_hours=_policy('free_canceling_hours'),
+        canceling_fee_percentage=_policy('canceling_free_percentage'),
+        hours_before=HoursBeforeStart(),
+    ).annotate(
+        cancellation_fee=Cast(
+            Case(
+                When(canceling_fee_percentage__isnull=True, then=ZERO_FEE),
+                When(hours_before__gt=F('free_canceling_hours'), then=ZERO_FEE),
+                # ضرب در 0.01 به جای تقسیم بر 100 تا SQLite تقسیم صحیح انجام ندهد
+                default=ExpressionWrapper(
+                    F('final_price') * F('canceling_fee_percentage') * Value(Decimal('0.01')), output_field=FEE_FIELD),
+                output_field=FEE_FIELD,
+            ),
+            FEE_FIELD,
+        ),
+    )
+
+
+def cancellations(start, end):
+    """Reservations cancelled between the ``start`` and ``end`` dates (inclusive) in their salon's local time."""
+    period = Q()
+    for zone_name in salon_zones():
+        zone = get_zone(zone_name)
+        period |= Q(
+            salon__timezone=zone_name,
+            cancelled_at__gte=datetime.combine(start, time(0), tzinfo=zone),
+            cancelled_at__lt=datetime.combine(end + timedelta(days=1), time(0), tzinfo=zone),
+        )
+    if not period:
+        return Reservation.objects.none()
+    return Reservation.objects.filter(period, status='cancelled')
+
+
+def cancellation_fees(start, end):
+    """One dict per cancellation in the period with its computed fee."""
+    return with_cancellation_fees(cancellations(start, end)).order_by('salon_id', 'pk').values(
+        'pk', 'reservation_number', 'salon_id', 'customer_id', 'date', 'start_time',
+        'cancelled_at', 'final_price', 'hours_before', 'cancellation_fee',
+    )
+
+
+def settlement_report(start, end):
+    """Cancellation count and total fees per salon for the period."""
+    return (
+        with_cancellation_fees(cancellations(start, end))
+        .order_by()
+        .values('salon_id', 'salon__name')
+        .annotate(cancellations=Count('pk'), total_fees=Sum('cancellation_fee'))
+        .order_by('salon_id')
+    )
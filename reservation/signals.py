@@ -0,0 +1,81 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_init, post_save
+from django.dispatch import receiver
+
+from account.models import StylistProfile, User
+from salon.models import Salon, Service
+from salon_reservation.timezones import register_sqlite_functions
+from .history import project_on_commit, rename_salon, rename_stylist
+from .models import Reservation
+
+connection_created.connect(register_sqlite_functions, dispatch_uid='salon_local_to_utc')
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        project_on_commit(instance.pk)
+
+
+@receiver(m2m_changed, sender=Reservation.service.through)
+def reservation_services_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        project_on_commit(instance.pk)
+    elif pk_set:
+        # از سمت خدمت: همه رزروهای مرتبط
+        project_on_commit(*Reservation.objects.filter(service__in=pk_set).values_list('pk', flat=True).distinct())
+
+
+@receiver(post_save, sender=Salon)
+def salon_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        rename_salon(instance)
+
+
+@receiver(post_init, sender=Service)
+def service_loaded(sender, instance, **kwargs):
+    instance._saved_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    if instance.name == getattr(instance, '_saved_name', None):
+        return
+    instance._saved_name = instance.name
+    project_on_commit(*Reservation.objects.filter(service=instance).values_list('pk', flat=True))
+
+
+# فیلدهایی که نام نمایشی آرایشگر از آن‌ها ساخته می‌شود
+NAME_FIELDS = ('first_name', 'last_name', 'username')
+
+
+def _names(user):
+    # از __dict__ تا فیلدهای deferred باعث query نشوند
+    return tuple(user.__dict__.get(field) for field in NAME_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._saved_names = _names(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    # مثلا ذخیره last_login هنگام ورود
+    if update_fields is not None and not set(NAME_FIELDS) & set(update_fields):
+        return
+    names = _names(instance)
+    if names == getattr(instance, '_saved_names', None):
+        return
+    instance._saved_names = names
+    stylist_id = StylistProfile.objects.filter(user_id=instance.pk).values_list('pk', flat=True).first()
+    if stylist_id is not None:
+        rename_stylist(stylist_id, instance)
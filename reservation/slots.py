@@ -0,0 +1,84 @@
+"""
+Rolling-window ``TimeSlot`` materialization.
+
+Every stylist's weekly ``StylistSchedule``, clipped to the salon's
+``WorkingHours`` and ``SalonSpecialDay`` rows, is cut into slots of
+``TIME_SLOT_MINUTES`` for the next N days. Only stylist-days that have no
+slots yet are generated, and rows are written with
+``bulk_create(ignore_conflicts=True)`` against the ``unique_time_slot``
+constraint, so the job can be re-run at any time.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+
+from account.models import StylistProfile
+from salon_reservation.timezones import salon_today_range
+from .availability import AvailabilityEngine, to_time
+from .models import TimeSlot
+
+DEFAULT_SLOT_MINUTES = 30
+
+
+def _chunked_ids(queryset, size):
+    chunk = []
+    for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=size):
+        chunk.append(pk)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def materialize_time_slots(days=14, start_date=None, slot_minutes=None, stylists=None, chunk_size=500):
+    """
+    Create the missing ``TimeSlot`` rows for ``days`` days from ``start_date``.
+
+    ``stylists`` limits the run to a queryset of ``StylistProfile`` (all by
+    default). Without ``start_date`` the window starts at the earliest
+    salon-local today and runs ``days`` days past the latest one; days already
+    over in a stylist's own zone are skipped. Today is generated whole, so its
+    slots stay on the same grid as every other day. Stylists are processed
+    ``chunk_size`` at a time with a fixed number of queries per chunk. Returns
+    the number of slots inserted; rows dropped as conflicts (e.g. written by a
+    concurrent run) are not counted.
+    """
+    if start_date is None:
+        start_date, latest = salon_today_range()
+    else:
+        latest = start_date
+    end_date = latest + timedelta(days=days - 1)
+    slot_minutes = slot_minutes or getattr(settings, 'TIME_SLOT_MINUTES', DEFAULT_SLOT_MINUTES)
+    if stylists is None:
+        stylists = StylistProfile.objects.all()
+
+    created = 0
+    for stylist_ids in _chunked_ids(stylists, chunk_size):
+        # بریدن امروز در دقیقه جاری اسلات‌ها را از شبکه خارج می‌کرد
+        engine = AvailabilityEngine(stylist_ids, start_date, end_date, subtract_busy=False, clip_today=False)
+        # روزهایی که قبلاً ساخته شده‌اند دوباره ساخته نمی‌شوند
+        in_window = TimeSlot.objects.filter(stylist_id__in=stylist_ids, date__range=(start_date, end_date))
+        existing = set(in_window.values_list('stylist_id', 'date').distinct())
+        slots = []
+        for stylist_id in engine.stylist_ids:
+            day = start_date
+            while day <= end_date:
+                if (stylist_id, day) not in existing:
+                    for start, end in engine.intervals(stylist_id, day):
+                        for minute in range(start, end - slot_minutes + 1, slot_minutes):
+                            slots.append(TimeSlot(
+                                stylist_id=stylist_id,
+                                date=day,
+                                start_time=to_time(minute),
+                                end_time=to_time(minute + slot_minutes),
+                                is_available=True,
+                            ))
+                day += timedelta(days=1)
+        if not slots:
+            continue
+        # ignore_conflicts شناسه یا تعداد ردیف‌های درج شده را برنمی‌گرداند
+        before = in_window.count()
+        TimeSlot.objects.bulk_create(slots, batch_size=1000, ignore_conflicts=True)
+        created += in_window.count() - before
+    return created
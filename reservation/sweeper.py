@@ -0,0 +1,102 @@
+"""
+Sweeper for confirmed reservations whose end time has passed.
+
+Reservation dates and times are local to their salon, so "ended" is decided
+per salon time zone: salons are grouped by zone and each group is compared
+with that zone's local now. Due reservations are found through the partial
+``res_confirmed_end_idx`` index on ``(date, end_time)``.
+
+Batches are claimed with ``select_for_update(skip_locked=True)`` where the
+database supports it, so several nodes sweep disjoint rows at once. SQLite
+ignores ``FOR UPDATE``; there each batch starts with a write, which takes the
+database write lock and serializes the sweepers instead. Each batch is one
+transaction, so memory is bounded by the batch size.
+
+Ended reservations become ``completed``: a visit paid at the salon or
+confirmed by hand has no ``Payment`` row, so the lack of one says nothing
+about attendance. ``no_show`` is left to the salon staff, who get
+``RESERVATION_NO_SHOW_GRACE`` after the end time to record it before the
+sweeper completes the reservation. Only the reservations with a successful
+online payment are credited to the salon owners' wallets, since the platform
+collected nothing for the rest.
+"""
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from salon.models import Salon
+from salon_reservation.timezones import get_zone, salon_zones
+from .models import Reservation
+
+MIDNIGHT = time(0)
+DEFAULT_NO_SHOW_GRACE = timedelta(hours=2)
+
+
+def due_reservations(now=None):
+    """Confirmed reservations that ended before ``now`` in their salon's local time."""
+    now = now or timezone.now()
+    local_nows = {
+        zone_name: now.astimezone(get_zone(zone_name))
+        for zone_name in salon_zones()
+    }
+    if not local_nows:
+        return Reservation.objects.none()
+    # روزهای قبل از زودترین «امروز» در همه مناطق تمام شده‌اند؛ فقط روزهای مرزی به منطقه سالن بستگی دارند
+    earliest = min(local.date() for local in local_nows.values())
+    ended = Q(date__lt=earliest)
+    for zone_name, local in local_nows.items():
+        today = local.date()
+        # پایان 00:00 یعنی نیمه‌شب پایان همان روز
+        ended_here = Q(date=today, end_time__lte=local.time(), end_time__gt=MIDNIGHT)
+        if today > earliest:
+            ended_here |= Q(date__gte=earliest, date__lt=today)
+        ended |= Q(salon_id__in=Salon.objects.filter(timezone=zone_name).values('pk')) & ended_here
+    return Reservation.objects.filter(ended, status='confirmed')
+
+
+def _claim(queryset, batch_size):
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+    else:
+        # نوشتن در ابتدای تراکنش قفل نوشتن SQLite را می‌گیرد
+        Reservation.objects.filter(pk=0).update(status='confirmed')
+    return list(queryset.order_by('date', 'end_time').values_list('pk', flat=True)[:batch_size])
+
+
+def sweep_batch(batch_size=1000, now=None):
+    """Complete one batch of reservations that ended before ``now``; returns ``(claimed, completed)``."""
+    from payment.wallets import credit_completed_reservations
+
+    with transaction.atomic():
+        ids = _claim(due_reservations(now), batch_size)
+        if not ids:
+            return 0, 0
+        completed = Reservation.objects.filter(pk__in=ids).transition('completed')
+        paid_ids = list(set(
+            Reservation.objects.filter(pk__in=ids, payments__status='success').values_list('pk', flat=True)))
+        if paid_ids:
+            credit_completed_reservations(paid_ids)
+    return len(ids), completed
+
+
+def sweep(batch_size=1000, max_batches=None, now=None):
+    """
+    Complete reservations that ended more than the no-show grace ago; returns the number completed.
+
+    Stops when nothing is due or after ``max_batches`` batches.
+    """
+    now = now or timezone.now()
+    # فرصت ثبت no_show توسط سالن
+    cutoff = now - getattr(settings, 'RESERVATION_NO_SHOW_GRACE', DEFAULT_NO_SHOW_GRACE)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed, completed = sweep_batch(batch_size, cutoff)
+        if not claimed:
+            break
+        total += completed
+        batches += 1
+    return total
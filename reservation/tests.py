@@ -1,3 +1,957 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+import tempfile
+import time as clock
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import User, CustomerProfile, StylistProfile, SalonOwnerProfile
+from payment.models import Payment, Wallet
+from salon.models import Salon, Service, StylistSchedule, WorkingHours, SalonSpecialDay
+from .availability import AvailabilityEngine
+from .bitmap import DayCalendar, OccupancyCalendar
+from .dayview import DAY_VIEW_QUERIES, get_salon_day, serialize_salon_day
+from .forecast import booked_minutes, get_forecast_cache, refresh_forecasts, salon_forecast
+from . import history
+from .ical import feed_url
+from .packing import _assign, pack_day, pack_services
+from .models import CustomerHistoryEntry, Review, InvalidTransition, Reservation, ReservationPolicy, ReservationReminder, TimeSlot, WaitlistEntry
+from .reminders import claim_due, dispatch_due, get_backend, schedule_reminders
+from .reviews import change_rating, delete_review, recompute_ratings, submit_review
+from .services import SlotUnavailable, book
+from .settlement import cancellation_fees
+from .slots import materialize_time_slots
+from .sweeper import due_reservations, sweep
+from .transfer import TransferError, export_rows, import_rows
+from .waitlist import StylistDayQueue, WaitlistMatcher, backfill, expire_offers, matcher
+
+
+@skipUnless(connection.vendor == 'sqlite', 'query plans are checked against SQLite')
+class ReservationQueryPlanTests(TestCase):
+    """Hot reservation queries must be answered from an index, not a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        day = date(2026, 1, 1)
+        statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+        Reservation.objects.bulk_create(
+            Reservation(
+                reservation_number=f'RES{i:010d}',
+                customer=cls.customer,
+                salon=cls.salon,
+                stylist=cls.stylist,
+                date=day + timedelta(days=i % 60),
+                start_time=time(9 + i % 8),
+                end_time=time(10 + i % 8),
+                status=statuses[i % len(statuses)],
+            )
+            for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan, plan)
+
+    def test_stylist_day(self):
+        queryset = Reservation.objects.filter(stylist=self.stylist, date=date(2026, 1, 5)).order_by('start_time')
+        self.assertUsesIndex(queryset, 'res_stylist_day_idx')
+
+    def test_active_stylist_day(self):
+        queryset = Reservation.objects.filter(
+            stylist=self.stylist, date=date(2026, 1, 5), status__in=['pending', 'confirmed'])
+        self.assertUsesIndex(queryset, 'res_stylist_day_idx')
+
+    def test_customer_upcoming(self):
+        queryset = Reservation.objects.filter(
+            customer=self.customer, status='confirmed', date__gte=date(2026, 1, 10)).order_by('date')
+        self.assertUsesIndex(queryset, 'res_customer_status_idx')
+
+    def test_salon_pending(self):
+        queryset = Reservation.objects.filter(salon=self.salon, status='pending').order_by('date')
+        self.assertUsesIndex(queryset, 'res_salon_status_idx')
+
+    def test_due_reservations(self):
+        queryset = due_reservations(datetime(2026, 1, 20, 12, tzinfo=dt_timezone.utc))
+        self.assertUsesIndex(queryset, 'res_confirmed_end_idx')
+
+    def test_due_reminders(self):
+        queryset = ReservationReminder.objects.filter(is_sent=False, schedule_time__lte=timezone.now())
+        self.assertUsesIndex(queryset, 'reminder_due_idx')
+
+
+class SalonDayViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner_user = User.objects.create(username='owner', email='owner@example.com', mobile='09000000000')
+        cls.salon = Salon.objects.create(owner=SalonOwnerProfile.objects.create(user=cls.owner_user), name='salon', slug='salon')
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000001'))
+        cls.day = date(2026, 1, 5)
+        WorkingHours.objects.create(salon=cls.salon, weekday=cls.day.weekday(), opening_time=time(9), closing_time=time(18))
+        SalonSpecialDay.objects.create(salon=cls.salon, date=cls.day, opening_time=time(10), closing_time=time(14))
+        cls.services = [
+            Service.objects.create(salon=cls.salon, name=name, price=100, duration=30)
+            for name in ('cut', 'color')
+        ]
+
+    def add_stylist(self, index):
+        stylist = StylistProfile.objects.create(
+            user=User.objects.create(username=f'stylist{index}', email=f'stylist{index}@example.com', mobile=f'0910000000{index}'),
+            salon=self.salon)
+        for hour in (10, 11):
+            TimeSlot.objects.create(stylist=stylist, date=self.day, start_time=time(hour), end_time=time(hour + 1))
+            reservation = Reservation.objects.create(
+                customer=self.customer, salon=self.salon, stylist=stylist,
+                date=self.day, start_time=time(hour), end_time=time(hour + 1))
+            reservation.service.set(self.services)
+        return stylist
+
+    def test_query_count_does_not_grow_with_stylists(self):
+        for count in (1, 4):
+            while self.salon.stylists.count() < count:
+                self.add_stylist(self.salon.stylists.count())
+            with self.assertNumQueries(DAY_VIEW_QUERIES):
+                data = serialize_salon_day(get_salon_day(self.salon.pk, self.day), self.day)
+            self.assertEqual(len(data['stylists']), count)
+            self.assertEqual(len(data['stylists'][0]['reservations']), 2)
+            self.assertEqual(data['stylists'][0]['reservations'][0]['services'], ['color', 'cut'])
+            self.assertEqual(data['special_day']['opening_time'], '10:00')
+
+    def test_view_is_limited_to_owner(self):
+        self.add_stylist(0)
+        url = reverse('reservation:salon_day', args=[self.salon.pk])
+
+        self.client.force_login(self.owner_user)
+        response = self.client.get(url, {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['date'], '2026-01-05')
+
+        # بدون تاریخ: امروز به وقت تهران، نه UTC
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 1, 4, 21, tzinfo=dt_timezone.utc)):
+            self.assertEqual(self.client.get(url).json()['date'], '2026-01-05')
+
+        self.client.force_login(self.customer.user)
+        self.assertEqual(self.client.get(url, {'date': self.day.isoformat()}).status_code, 403)
+
+
+class DayCalendarTests(SimpleTestCase):
+
+    def test_free_time_covers_whole_ticks_and_busy_time_every_touched_tick(self):
+        calendar = DayCalendar()
+        calendar.mark_free(time(9, 2), time(10, 58))
+        self.assertEqual(calendar.windows(), [(time(9, 5), time(10, 55))])
+        calendar.mark_busy(time(9, 31), time(9, 44))
+        self.assertEqual(calendar.windows(), [(time(9, 5), time(9, 30)), (time(9, 45), time(10, 55))])
+
+    def test_fit_mask(self):
+        calendar = DayCalendar.from_times([(time(9), time(9, 30)), (time(10), time(10, 15))])
+        starts = calendar.fit_mask(20)
+        self.assertEqual(DayCalendar(starts).windows(), [(time(9), time(9, 15))])
+        self.assertEqual(calendar.fit_mask(0), calendar.bits)
+        self.assertEqual(DayCalendar(calendar.fit_mask(15)).windows(),
+                         [(time(9), time(9, 20)), (time(10), time(10, 5))])
+        self.assertEqual(calendar.fit_mask(45), 0)
+
+    def test_first_fit_never_starts_before_not_before(self):
+        calendar = DayCalendar.from_times([(time(9), time(12))])
+        self.assertEqual(calendar.first_fit(30), time(9))
+        self.assertEqual(calendar.first_fit(30, not_before=time(9, 3)), time(9, 5))
+        self.assertEqual(calendar.first_fit(30, not_before=time(11, 31)), None)
+        self.assertTrue(calendar.fits(time(11, 30), 30))
+        self.assertFalse(calendar.fits(time(11, 33), 30))
+
+    def test_midnight_end(self):
+        calendar = DayCalendar.from_times([(time(22), time(0))])
+        self.assertEqual(calendar.windows(), [(time(22), time(0))])
+        self.assertEqual(calendar.free_minutes(), 120)
+        self.assertTrue(calendar.fits(time(23), 60))
+        self.assertFalse(calendar.fits(time(23, 30), 60))
+        calendar.mark_busy(time(23, 30), time(0))
+        self.assertEqual(calendar.windows(), [(time(22), time(23, 30))])
+
+
+class AvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon', timezone='Asia/Tehran')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.day = date(2026, 1, 5)
+        for offset in (-1, 0, 1):
+            StylistSchedule.objects.create(
+                stylist=cls.stylist, weekday=(cls.day + timedelta(days=offset)).weekday(),
+                start_time=time(9), end_time=time(17))
+
+    def test_past_times_are_clipped_in_salon_time(self):
+        # 08:00 UTC is 11:30 in Tehran
+        now = datetime(2026, 1, 5, 8, 0, 20, tzinfo=dt_timezone.utc)
+        engine = AvailabilityEngine([self.stylist], self.day - timedelta(days=1), self.day + timedelta(days=1), now=now)
+        self.assertEqual(engine.free_windows(self.stylist.pk, self.day - timedelta(days=1)), [])
+        self.assertEqual(engine.free_windows(self.stylist.pk, self.day), [(time(11, 31), time(17))])
+        self.assertEqual(engine.free_windows(self.stylist.pk, self.day + timedelta(days=1)), [(time(9), time(17))])
+        self.assertEqual(engine.available_starts(self.stylist.pk, 60, step=30)[0], (self.day, time(12), time(13)))
+
+    def test_materialize_counts_inserted_slots(self):
+        day = self.day + timedelta(weeks=52 * 5)
+        intervals = AvailabilityEngine.intervals
+
+        def racing_intervals(engine, stylist_id, on_day):
+            # پروسه دیگری هم‌زمان اولین اسلات همین روز را می‌سازد
+            TimeSlot.objects.get_or_create(stylist_id=stylist_id, date=on_day, start_time=time(9), end_time=time(9, 30))
+            return intervals(engine, stylist_id, on_day)
+
+        with mock.patch.object(AvailabilityEngine, 'intervals', racing_intervals):
+            created = materialize_time_slots(days=2, start_date=day, slot_minutes=30)
+        self.assertEqual(TimeSlot.objects.count(), 32)
+        self.assertEqual(created, 30)
+        self.assertEqual(materialize_time_slots(days=2, start_date=day, slot_minutes=30), 0)
+
+    def test_occupancy_calendar(self):
+        day = self.day + timedelta(weeks=52 * 5)
+        materialize_time_slots(days=1, start_date=day, slot_minutes=30)
+        TimeSlot.objects.filter(date=day, start_time=time(9)).update(is_available=False)
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        for start, status in ((time(10), 'confirmed'), (time(12), 'cancelled')):
+            Reservation.objects.create(customer=customer, salon=self.salon, stylist=self.stylist, date=day,
+                                       start_time=start, end_time=time(start.hour + 1), status=status)
+
+        with self.assertNumQueries(2):
+            calendar = OccupancyCalendar([self.stylist], day, day)
+        self.assertEqual(calendar.day(self.stylist.pk, day).windows(), [(time(9, 30), time(10)), (time(11), time(17))])
+        self.assertEqual(calendar.first_fit(self.stylist.pk, 45), (day, time(11)))
+        self.assertEqual(calendar.count_free(), (30 + 360) // 5)
+        self.assertEqual(calendar.common([], day), DayCalendar())
+
+    def test_materialize_keeps_today_on_the_grid(self):
+        # 08:07 UTC is 11:37 in Tehran
+        now = datetime(2026, 1, 5, 8, 7, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            materialize_time_slots(days=1, slot_minutes=30)
+        starts = list(TimeSlot.objects.filter(date=self.day).order_by('start_time').values_list('start_time', flat=True))
+        self.assertEqual(len(starts), 16)
+        self.assertEqual((starts[0], starts[-1]), (time(9), time(16, 30)))
+        self.assertFalse(TimeSlot.objects.exclude(date=self.day).exists())
+
+
+class TransferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=cls.owner, name='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        cls.service = Service.objects.create(salon=cls.salon, name='cut', price=100, duration=30)
+        reservation = Reservation.objects.create(
+            customer=cls.customer, salon=cls.salon, stylist=cls.stylist,
+            date=date(2026, 1, 5), start_time=time(10), end_time=time(10, 30), total_price=100)
+        reservation.service.set([cls.service])
+
+    def test_reimport_reports_existing_numbers(self):
+        rows = list(export_rows())
+        with self.assertRaisesMessage(TransferError, 'already exists'):
+            import_rows(rows)
+
+        errors = []
+        self.assertEqual(import_rows(rows, skip_invalid=True, on_error=lambda line, exc: errors.append(line)), (0, 1))
+        self.assertEqual(errors, [1])
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_ambiguous_keys_are_rejected(self):
+        row = next(export_rows())
+        row['reservation_number'] = ''
+        Service.objects.create(salon=self.salon, name='cut', price=120, duration=45)
+        with self.assertRaisesMessage(TransferError, 'ambiguous service'):
+            import_rows([row])
+
+        # سالن دوم همان مالک همان slug را می‌گیرد
+        Salon.objects.create(owner=self.owner, name='other')
+        with self.assertRaisesMessage(TransferError, 'ambiguous salon'):
+            import_rows([row])
+
+
+@override_settings(RESERVATION_REMINDER_BACKENDS={'sms': 'reservation.reminders.LocmemBackend'})
+class ReminderDispatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=salon)
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        cls.now = timezone.now()
+        for hour in (10, 11, 12):
+            reservation = Reservation.objects.create(
+                customer=customer, salon=salon, stylist=stylist,
+                date=date(2026, 1, 5), start_time=time(hour), end_time=time(hour, 30))
+            ReservationReminder.objects.create(
+                reservation=reservation, reminder_type='sms', schedule_time=cls.now - timedelta(minutes=hour))
+
+    def setUp(self):
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+
+    def test_claimed_reminders_are_not_sent_twice(self):
+        claimed = claim_due(batch_size=2, now=self.now)
+        self.assertEqual(len(claimed), 2)
+        # یک پروسه دیگر فقط ردیف آزاد باقی‌مانده را برمی‌دارد
+        self.assertEqual(dispatch_due(now=self.now), (1, 1))
+        self.assertEqual(dispatch_due(now=self.now), (0, 0))
+        self.assertEqual(len(get_backend('sms').outbox), 1)
+
+        # ادعای یک پروسه از کار افتاده پس از مهلت آزاد می‌شود
+        ReservationReminder.objects.filter(is_sent=False).update(claimed_at=self.now - timedelta(hours=1))
+        self.assertEqual(dispatch_due(now=self.now), (2, 2))
+        self.assertFalse(ReservationReminder.objects.filter(is_sent=False).exists())
+        self.assertEqual(len(get_backend('sms').outbox), 3)
+
+    def test_failed_sends_release_their_claim(self):
+        backend = get_backend('sms')
+        backend.deliver = lambda customer, message: False
+        self.assertEqual(dispatch_due(now=self.now), (3, 0))
+        self.assertFalse(ReservationReminder.objects.exclude(claim_token=None).exists())
+        # تلاش دوباره فقط بعد از RETRY_DELAY
+        self.assertEqual(dispatch_due(now=self.now), (0, 0))
+        ReservationReminder.objects.update(claimed_at=self.now - timedelta(minutes=2))
+        self.assertEqual(len(claim_due(now=self.now)), 3)
+
+    def test_command_stops_when_the_backend_is_down(self):
+        get_backend('sms').deliver = lambda customer, message: False
+        out = StringIO()
+        call_command('send_reminders', stdout=out)
+        self.assertIn('sent 0/3 reminders', out.getvalue())
+        self.assertEqual(ReservationReminder.objects.filter(is_sent=False).count(), 3)
+
+    def test_outbox_is_per_backend(self):
+        get_backend('sms').outbox.append('x')
+        get_backend.cache_clear()
+        self.assertEqual(get_backend('sms').outbox, [])
+
+
+class ReminderScheduleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon', timezone='Asia/Tehran')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.sms_only = CustomerProfile.objects.create(
+            user=User.objects.create(username='sms', email='sms@example.com', mobile='09000000002'),
+            phone_notification=True)
+        cls.no_channels = CustomerProfile.objects.create(
+            user=User.objects.create(username='none', email='none@example.com', mobile='09000000003'))
+
+    def reservation(self, customer, day, hour):
+        return Reservation.objects.create(
+            customer=customer, salon=self.salon, stylist=self.stylist, date=day,
+            start_time=time(hour), end_time=time(hour + 1), status='confirmed')
+
+    @override_settings(RESERVATION_REMINDER_HOURS=(24, 48))
+    def test_plans_allowed_reminders_in_one_insert(self):
+        # 06:30 UTC on Jan 3 is 10:00 in Tehran
+        now = datetime(2026, 1, 3, 6, 30, tzinfo=dt_timezone.utc)
+        soon = self.reservation(self.sms_only, date(2026, 1, 4), 12)
+        later = self.reservation(self.no_channels, date(2026, 1, 6), 10)
+        # خواندن رزروها، یادآوری‌های موجود و یک bulk_create
+        with self.assertNumQueries(3):
+            created = schedule_reminders(
+                Reservation.objects.filter(pk__in=[soon.pk, later.pk]).select_related('customer', 'salon'), now=now)
+        planned = {(r.reservation_id, r.reminder_type, r.hour_before): r.schedule_time for r in created}
+        # 48 ساعت قبل از نوبت فردا گذشته است
+        self.assertEqual(planned, {
+            (soon.pk, 'notify', 24): datetime(2026, 1, 3, 8, 30, tzinfo=dt_timezone.utc),
+            (soon.pk, 'sms', 24): datetime(2026, 1, 3, 8, 30, tzinfo=dt_timezone.utc),
+            (later.pk, 'notify', 24): datetime(2026, 1, 5, 6, 30, tzinfo=dt_timezone.utc),
+            (later.pk, 'notify', 48): datetime(2026, 1, 4, 6, 30, tzinfo=dt_timezone.utc),
+        })
+
+        # اجرای دوباره یادآوری تکراری نمی‌سازد
+        self.assertEqual(schedule_reminders(Reservation.objects.filter(pk=soon.pk), now=now), [])
+        self.assertEqual(ReservationReminder.objects.count(), 4)
+        self.assertEqual(schedule_reminders([], now=now), [])
+
+
+class WaitlistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customers = [
+            CustomerProfile.objects.create(user=User.objects.create(
+                username=f'customer{i}', email=f'customer{i}@example.com', mobile=f'0912000000{i}'))
+            for i in range(4)
+        ]
+        cls.day = timezone.localdate() + timedelta(days=30)
+
+    def entry(self, customer, duration, priority=0, earliest_time=None, latest_time=None):
+        return WaitlistEntry.objects.create(
+            customer=customer, salon=self.salon, stylist=self.stylist, date=self.day, duration=duration,
+            priority=priority, earliest_time=earliest_time, latest_time=latest_time)
+
+    def test_pop_match_takes_the_best_fitting_entry(self):
+        long_vip = self.entry(self.customers[0], 120, priority=5)
+        afternoon = self.entry(self.customers[1], 30, priority=3, earliest_time=time(14))
+        first = self.entry(self.customers[2], 30)
+        second = self.entry(self.customers[3], 60)
+        queue = StylistDayQueue(self.stylist.pk, self.day)
+        queue.sync()
+
+        self.assertEqual(queue.pop_match(time(10), time(11)), first)
+        self.assertEqual(queue.pop_match(time(10), time(11)), second)
+        self.assertIsNone(queue.pop_match(time(10), time(11)))
+        self.assertEqual(queue.pop_match(time(13), time(16)), long_vip)
+        self.assertEqual(queue.pop_match(time(13), time(16)), afternoon)
+        self.assertEqual(len(queue), 0)
+
+    def test_past_days_are_pruned(self):
+        registry = WaitlistMatcher()
+        registry.queue(self.stylist.pk, self.day)
+        registry.queue(self.stylist.pk, date(2020, 1, 1))
+        registry._pruned_on = None
+        registry.queue(self.stylist.pk, self.day)
+        self.assertEqual(list(registry._queues), [(self.stylist.pk, self.day)])
+
+    def test_join_and_cancel_views_offer_the_freed_time(self):
+        matcher.prune(date.max)
+        self.client.force_login(self.customers[1].user)
+        response = self.client.post(reverse('reservation:join_waitlist'), {
+            'stylist': self.stylist.pk, 'date': self.day.isoformat(), 'duration': 30})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post(reverse('reservation:join_waitlist'), {
+            'stylist': self.stylist.pk, 'date': '2020-01-01', 'duration': 30}).status_code, 400)
+
+        reservation = Reservation.objects.create(
+            customer=self.customers[0], salon=self.salon, stylist=self.stylist,
+            date=self.day, start_time=time(10), end_time=time(10, 30), status='confirmed')
+        url = reverse('reservation:cancel', args=[reservation.pk])
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+        self.client.force_login(self.customers[0].user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertEqual(response.json()['status'], 'cancelled')
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual((entry.status, entry.offered_reservation_id), ('offered', reservation.pk))
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+    def test_unanswered_offers_expire_and_go_to_the_next_in_line(self):
+        matcher.prune(date.max)
+        first = self.entry(self.customers[1], 30)
+        second = self.entry(self.customers[2], 30)
+        third = self.entry(self.customers[3], 30)
+        reservation = Reservation.objects.create(
+            customer=self.customers[0], salon=self.salon, stylist=self.stylist,
+            date=self.day, start_time=time(10), end_time=time(10, 30), status='cancelled')
+        self.assertEqual(backfill(reservation), first)
+
+        now = timezone.now()
+        self.assertEqual(expire_offers(now), (0, 0))
+        with override_settings(WAITLIST_OFFER_TIMEOUT=timedelta(minutes=30)):
+            self.assertEqual(expire_offers(now + timedelta(minutes=31)), (1, 1))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('expired', 'offered'))
+
+        # نفر دوم همان زمان را رزرو می‌کند؛ پیشنهاد بسته می‌شود و دیگر به کسی پیشنهاد نمی‌شود
+        book(self.customers[2], self.salon, self.stylist, self.day, time(10), time(10, 30))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'booked')
+        self.assertEqual(expire_offers(now + timedelta(hours=2)), (0, 0))
+        third.refresh_from_db()
+        self.assertEqual(third.status, 'waiting')
+
+
+class SettlementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon', timezone='Asia/Tehran')
+        ReservationPolicy.objects.create(salon=cls.salon, free_canceling_hours=4, canceling_free_percentage=25)
+        stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        # 12:00 تهران برابر 08:30 UTC است
+        for hour in (6, 2):
+            Reservation.objects.create(
+                customer=customer, salon=cls.salon, stylist=stylist, date=date(2026, 1, 5),
+                start_time=time(12), end_time=time(13), total_price=150, status='cancelled',
+                cancelled_at=datetime(2026, 1, 5, 8, 30, tzinfo=dt_timezone.utc) - timedelta(hours=hour))
+
+    def test_fees_use_the_salon_time_zone(self):
+        rows = list(cancellation_fees(date(2026, 1, 5), date(2026, 1, 5)))
+        self.assertEqual([row['hours_before'] for row in rows], [6.0, 2.0])
+        self.assertEqual([row['cancellation_fee'] for row in rows], [Decimal('0.00'), Decimal('37.50')])
+
+    def test_period_is_salon_local(self):
+        # 21:00 UTC روز 4 ژانویه در تهران 00:30 روز 5 است
+        reservation = Reservation.objects.filter(salon=self.salon).first()
+        Reservation.objects.filter(pk=reservation.pk).update(cancelled_at=datetime(2026, 1, 4, 21, tzinfo=dt_timezone.utc))
+        self.assertEqual(len(cancellation_fees(date(2026, 1, 5), date(2026, 1, 5))), 2)
+        self.assertEqual(len(cancellation_fees(date(2026, 1, 4), date(2026, 1, 4))), 0)
+
+
+class ReservationStateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+
+    def reservation(self, status='pending', hour=10):
+        return Reservation.objects.create(
+            customer=self.customer, salon=self.salon, stylist=self.stylist, date=date(2030, 1, 5),
+            start_time=time(hour), end_time=time(hour + 1), status=status)
+
+    def test_transition_records_log_and_timestamp(self):
+        reservation = self.reservation()
+        reservation.transition_to('confirmed', changed_by=self.customer.user)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'confirmed')
+        self.assertIsNotNone(reservation.confirmed_at)
+        log = reservation.status_logs.get()
+        self.assertEqual((log.from_status, log.to_status, log.changed_by), ('pending', 'confirmed', self.customer.user))
+
+    def test_illegal_and_stale_transitions_are_rejected(self):
+        reservation = self.reservation('completed')
+        with self.assertRaises(InvalidTransition):
+            reservation.transition_to('cancelled')
+
+        reservation = self.reservation()
+        Reservation.objects.filter(pk=reservation.pk).update(status='rejected')
+        with self.assertRaises(InvalidTransition):
+            reservation.transition_to('confirmed')
+        self.assertFalse(reservation.status_logs.exists())
+
+    def test_queryset_transition_moves_only_legal_sources(self):
+        for hour, status in enumerate(['pending', 'confirmed', 'completed', 'cancelled'], start=9):
+            self.reservation(status, hour)
+        self.assertEqual(Reservation.objects.transition('cancelled'), 2)
+        self.assertEqual(
+            sorted(Reservation.objects.values_list('status', flat=True)),
+            ['cancelled', 'cancelled', 'cancelled', 'completed'])
+        self.assertEqual(Reservation.objects.exclude(cancelled_at=None).count(), 2)
+
+
+class BookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+
+    def book(self, start_time, end_time):
+        return book(self.customer, self.salon, self.stylist, date(2030, 1, 5), start_time, end_time)
+
+    def test_overlaps_are_rejected(self):
+        self.book(time(10), time(11))
+        with self.assertRaises(SlotUnavailable):
+            self.book(time(10, 30), time(11, 30))
+        # بازه‌های پشت سر هم تداخل ندارند
+        self.book(time(11), time(12))
+        self.book(time(9), time(10))
+        self.assertEqual(Reservation.objects.count(), 3)
+
+        Reservation.objects.filter(start_time=time(10)).update(status='cancelled')
+        self.book(time(10, 15), time(10, 45))
+
+    def test_midnight_end_is_end_of_day(self):
+        self.book(time(23), time(0))
+        with self.assertRaises(SlotUnavailable):
+            self.book(time(23, 30), time(23, 45))
+        with self.assertRaises(SlotUnavailable):
+            self.book(time(22, 30), time(0))
+        self.book(time(22), time(23))
+        self.assertEqual(Reservation.objects.count(), 2)
+
+
+class SweeperTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        cls.reservations = {}
+        for index, zone in enumerate(['Asia/Tehran', 'America/New_York']):
+            salon = Salon.objects.create(owner=owner, name=zone, slug=f'salon{index}', timezone=zone)
+            stylist = StylistProfile.objects.create(
+                user=User.objects.create(username=f'stylist{index}', email=f'stylist{index}@example.com',
+                                         mobile=f'0910000000{index}'),
+                salon=salon)
+            for day, start, end in [(5, 10, 11), (5, 8, 9), (4, 23, 0), (5, 23, 0)]:
+                cls.reservations[zone, day, start] = Reservation.objects.create(
+                    customer=customer, salon=salon, stylist=stylist, date=date(2026, 1, day),
+                    start_time=time(start), end_time=time(end), status='confirmed').pk
+
+    def test_due_in_salon_local_time(self):
+        # 09:00 UTC: ساعت 12:30 در تهران و 04:00 در نیویورک
+        now = datetime(2026, 1, 5, 9, tzinfo=dt_timezone.utc)
+        due = set(due_reservations(now).values_list('pk', flat=True))
+        expected = {
+            self.reservations[key] for key in [
+                ('Asia/Tehran', 5, 10), ('Asia/Tehran', 5, 8), ('Asia/Tehran', 4, 23), ('America/New_York', 4, 23)]
+        }
+        self.assertEqual(due, expected)
+
+        with override_settings(RESERVATION_NO_SHOW_GRACE=timedelta(0)):
+            self.assertEqual(sweep(batch_size=1, now=now), 4)
+        self.assertEqual(set(Reservation.objects.filter(status='completed').values_list('pk', flat=True)), expected)
+        self.assertEqual(Reservation.objects.filter(status='confirmed').count(), 4)
+
+    def test_completes_after_the_grace_and_credits_only_paid_visits(self):
+        now = datetime(2026, 1, 5, 9, tzinfo=dt_timezone.utc)
+        paid = Reservation.objects.get(pk=self.reservations['Asia/Tehran', 5, 8])
+        Reservation.objects.filter(pk=paid.pk).update(final_price=500)
+        Reservation.objects.filter(pk=self.reservations['America/New_York', 4, 23]).update(final_price=700)
+        Payment.objects.create(
+            user=paid.customer.user, payment_type='reservation', reservation=paid, amount=500, status='success')
+        # سالن غیبت مشتری را ثبت کرده است
+        Reservation.objects.get(pk=self.reservations['Asia/Tehran', 4, 23]).transition_to('no_show')
+
+        with override_settings(RESERVATION_NO_SHOW_GRACE=timedelta(hours=2)):
+            # 07:00 UTC: 10:30 در تهران؛ رزرو 10 تا 11 هنوز در مهلت است
+            self.assertEqual(sweep(now=now), 2)
+        self.assertEqual(Reservation.objects.get(pk=self.reservations['Asia/Tehran', 5, 10]).status, 'confirmed')
+        self.assertEqual(Reservation.objects.get(pk=self.reservations['Asia/Tehran', 4, 23]).status, 'no_show')
+        wallet = Wallet.objects.get(user=paid.salon.owner.user)
+        self.assertEqual(wallet.balance, 500)
+
+
+class CalendarFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon', address='old street')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002',
+                                     first_name='Sara'))
+        Reservation.objects.create(
+            customer=cls.customer, salon=cls.salon, stylist=cls.stylist, date=timezone.localdate() + timedelta(days=3),
+            start_time=time(10), end_time=time(11), status='confirmed')
+
+    def test_etag_changes_with_rendered_details(self):
+        url = feed_url('stylist', self.stylist.pk)
+        response = self.client.get(url)
+        self.assertIn('SUMMARY:Sara', b''.join(response.streaming_content).decode())
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        seen = {etag}
+        for change in (
+            lambda: Salon.objects.filter(pk=self.salon.pk).update(address='new street'),
+            lambda: User.objects.filter(pk=self.customer.pk).update(first_name='Sarah'),
+            lambda: User.objects.filter(pk=self.stylist.user_id).update(last_name='Rahimi'),
+        ):
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn(response['ETag'], seen)
+            seen.add(response['ETag'])
+            etag = response['ETag']
+
+
+class ForecastTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        for weekday in (0, 9):
+            StylistSchedule.objects.create(stylist=stylist, weekday=weekday, start_time=time(9), end_time=time(17))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches_setting = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'forecasts': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        }
+        override = override_settings(CACHES=caches_setting, CAPACITY_FORECAST_CACHE='forecasts')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_refresh_fills_the_shared_cache(self):
+        self.assertEqual(refresh_forecasts([self.salon.pk]), 1)
+        self.assertEqual(len(get_forecast_cache()._list_cache_files()), 1)
+        # فقط منطقه زمانی سالن خوانده می‌شود؛ پیش‌بینی از کش مشترک می‌آید
+        with self.assertNumQueries(1):
+            forecast = salon_forecast(self.salon.pk)
+        self.assertEqual([block.weekday for block in forecast['blocks']], [0])
+
+    def test_midnight_end_counts_to_the_end_of_the_day(self):
+        stylist = StylistProfile.objects.get()
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        Reservation.objects.create(customer=customer, salon=self.salon, stylist=stylist, date=date(2026, 1, 5),
+                                   start_time=time(22, 30), end_time=time(0), status='completed')
+        minutes = booked_minutes([self.salon.pk], [stylist.pk], today=date(2026, 1, 6), history_days=7,
+                                 half_life_days=1e9)
+        self.assertEqual(minutes[0, 0, 21:].round(6).tolist(), [0, 30, 60])
+
+
+class HistoryProjectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+        cls.service = Service.objects.create(salon=cls.salon, name='cut', price=100, duration=30)
+
+    def test_book_projects_once(self):
+        with mock.patch.object(history, 'project', wraps=history.project) as projected:
+            with self.captureOnCommitCallbacks(execute=True):
+                reservation = book(self.customer, self.salon, self.stylist, date(2030, 1, 5), time(10), time(11),
+                                   services=[self.service])
+        projected.assert_called_once()
+        self.assertIn(reservation.pk, projected.call_args.args[0])
+        self.assertEqual(CustomerHistoryEntry.objects.get().service_names, 'cut')
+        self.assertEqual(CustomerHistoryEntry.objects.get().reservation_id, reservation.pk)
+
+    def test_only_name_changes_rename_the_stylist(self):
+        user = User.objects.get(pk=self.stylist.user_id)
+        with self.assertNumQueries(1):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            user.email = 'new@example.com'
+            user.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = book(self.customer, self.salon, self.stylist, date(2030, 1, 5), time(10), time(11))
+        user.first_name = 'Neda'
+        user.save()
+        self.assertEqual(CustomerHistoryEntry.objects.get(reservation=reservation).stylist_name, 'Neda')
+
+
+    def test_rolled_back_transaction_does_not_lose_later_projections(self):
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            book(self.customer, self.salon, self.stylist, date(2030, 1, 5), time(9), time(10))
+            1 / 0
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = book(self.customer, self.salon, self.stylist, date(2030, 1, 5), time(10), time(11))
+        self.assertEqual(list(CustomerHistoryEntry.objects.values_list('reservation_id', flat=True)), [reservation.pk])
+
+    def test_service_rename_is_projected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = book(self.customer, self.salon, self.stylist, date(2030, 1, 5), time(10), time(11),
+                               services=[self.service])
+        service = Service.objects.get(pk=self.service.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            service.price = 200
+            service.save()
+        # تغییر قیمت نام را عوض نمی‌کند
+        self.assertFalse(any(isinstance(callback, history._Projection) for callback in callbacks))
+        with self.captureOnCommitCallbacks(execute=True):
+            service.name = 'color'
+            service.save()
+        self.assertEqual(CustomerHistoryEntry.objects.get(reservation=reservation).service_names, 'color')
+
+class ReviewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.stylist = StylistProfile.objects.create(
+            user=User.objects.create(username='stylist', email='stylist@example.com', mobile='09000000001'),
+            salon=cls.salon)
+        cls.customer = CustomerProfile.objects.create(
+            user=User.objects.create(username='customer', email='customer@example.com', mobile='09000000002'))
+
+    def reservation(self, hour):
+        return Reservation.objects.create(
+            customer=self.customer, salon=self.salon, stylist=self.stylist, date=date(2030, 1, 5),
+            start_time=time(hour), end_time=time(hour + 1), status='completed')
+
+    def assertRating(self, rating_sum, rating_count, rating_average):
+        for obj in (Salon.objects.get(pk=self.salon.pk), StylistProfile.objects.get(pk=self.stylist.pk)):
+            self.assertEqual((obj.rating_sum, obj.rating_count, obj.rating_average),
+                             (rating_sum, rating_count, Decimal(rating_average)))
+
+    def test_deltas_on_rows_with_null_count(self):
+        # ردیف‌های قدیمی
+        Salon.objects.filter(pk=self.salon.pk).update(rating_count=None, rating_average=None)
+        StylistProfile.objects.filter(pk=self.stylist.pk).update(rating_count=None, rating_average=None)
+
+        first = submit_review(self.reservation(9), 4)
+        self.assertRating(4, 1, '4.00')
+        second = submit_review(self.reservation(10), 5)
+        self.assertRating(9, 2, '4.50')
+        change_rating(first, 2)
+        self.assertRating(7, 2, '3.50')
+        delete_review(second)
+        self.assertRating(2, 1, '2.00')
+        delete_review(first)
+        self.assertRating(0, 0, '0')
+
+    def test_migration_keeps_legacy_ratings(self):
+        migration = import_module('reservation.migrations.0016_backfill_rating_sums')
+        Salon.objects.filter(pk=self.salon.pk).update(rating_sum=0, rating_count=3, rating_average=Decimal('4.33'))
+        StylistProfile.objects.filter(pk=self.stylist.pk).update(rating_sum=0, rating_count=None, rating_average=None)
+        migration.backfill_rating_sums(django_apps, None)
+        salon = Salon.objects.get(pk=self.salon.pk)
+        self.assertEqual((salon.rating_sum, salon.rating_count), (13, 3))
+        self.assertEqual(StylistProfile.objects.values_list('rating_sum', 'rating_count').get(pk=self.stylist.pk), (0, 0))
+
+        submit_review(self.reservation(9), 3)
+        self.assertEqual(Salon.objects.get(pk=self.salon.pk).rating_average, Decimal('4.00'))
+
+    def test_recompute_repairs_drift(self):
+        submit_review(self.reservation(9), 4)
+        submit_review(self.reservation(10), 3)
+        Review.objects.filter(rating=3).update(rating=5)
+        Salon.objects.filter(pk=self.salon.pk).update(rating_sum=0, rating_count=7, rating_average=1)
+
+        self.assertEqual(recompute_ratings(), (1, 1))
+        self.assertRating(9, 2, '4.50')
+
+
+class PackingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.cut = Service(name='cut', duration=30)
+        cls.color = Service(name='color', duration=60)
+        cls.dry = Service(name='dry', duration=20)
+
+    def add_stylists(self, count, start_time=time(9), end_time=time(17)):
+        stylists = []
+        for index in range(count):
+            stylist = StylistProfile.objects.create(
+                user=User.objects.create(username=f'stylist{index}', email=f'stylist{index}@example.com',
+                                         mobile=f'0910{index:07d}'),
+                salon=self.salon)
+            StylistSchedule.objects.bulk_create(
+                StylistSchedule(stylist=stylist, weekday=weekday, start_time=start_time, end_time=end_time)
+                for weekday in range(7))
+            stylists.append(stylist)
+        return stylists
+
+    def test_assign_keeps_the_longest_run(self):
+        self.assertEqual(_assign([{1, 2}, {2}, {2, 3}, {3}]), [2, 2, 2, 3])
+        self.assertEqual(_assign([{1}, {1, 2}, {2}, {2}]), [1, 1, 2, 2])
+
+    def test_single_stylist_is_preferred(self):
+        calendars = {
+            1: DayCalendar.from_times([(time(9), time(11))]),
+            2: DayCalendar.from_times([(time(10), time(12))]),
+        }
+        results = pack_day(calendars, [self.cut, self.color], step=30)
+        best = min(results, key=lambda result: result[:2])
+        self.assertEqual(best[0], 0)
+        self.assertEqual([(leg.stylist_id, leg.start_time, leg.end_time) for leg in best[2]],
+                         [(1, time(9), time(9, 30)), (1, time(9, 30), time(10, 30))])
+
+    def test_hand_over_when_no_stylist_fits_the_basket(self):
+        calendars = {
+            1: DayCalendar.from_times([(time(9), time(9, 30))]),
+            2: DayCalendar.from_times([(time(9, 30), time(11))]),
+        }
+        results = pack_day(calendars, [self.cut, self.color, self.dry], step=15)
+        self.assertEqual(len(results), 1)
+        switches, _, legs = results[0]
+        self.assertEqual(switches, 1)
+        self.assertEqual([(leg.stylist_id, leg.start_time, leg.end_time) for leg in legs],
+                         [(1, time(9), time(9, 30)), (2, time(9, 30), time(10, 30)), (2, time(10, 30), time(10, 50))])
+        self.assertEqual(pack_day(calendars, [self.color, self.color]), [])
+
+    def test_ranking_and_limit(self):
+        first, second = self.add_stylists(2)
+        StylistSchedule.objects.filter(stylist=second).update(start_time=time(12), end_time=time(13))
+        StylistSchedule.objects.filter(stylist=first).update(end_time=time(12, 30))
+        start_date = date(2030, 1, 5)
+        itineraries = pack_services(self.salon, [self.cut, self.color], start_date, days=2, limit=3, step=30)
+        self.assertEqual(len(itineraries), 3)
+        self.assertEqual([(it.date, it.start_time, it.switches) for it in itineraries],
+                         [(start_date, time(9), 0), (start_date, time(9, 30), 0), (start_date, time(10), 0)])
+        # دیرترین شروع ممکن با یک جابه‌جایی
+        late = pack_services(self.salon, [self.cut, self.color], start_date, days=1, limit=100, step=30)
+        self.assertEqual(late[-1].switches, 1)
+        self.assertEqual([leg.stylist_id for leg in late[-1].legs], [first.pk, second.pk])
+        self.assertEqual(pack_services(self.salon, [], start_date), [])
+
+    def test_twenty_stylists_over_fourteen_days_within_budget(self):
+        self.add_stylists(20)
+        services = [self.cut, self.color, self.dry]
+        pack_services(self.salon, services, date(2030, 1, 5))
+        started = clock.perf_counter()
+        itineraries = pack_services(self.salon, services, date(2030, 1, 5), days=14, limit=5)
+        elapsed = clock.perf_counter() - started
+        self.assertEqual(len(itineraries), 5)
+        self.assertLess(elapsed, 0.05)
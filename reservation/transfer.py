@@ -0,0 +1,243 @@
+"""
+Streaming CSV/JSONL import and export of reservations.
+
+A row identifies its related objects by natural keys: customer and stylist
+by username, salon by slug, services by name within the salon. Slugs and
+service names are not unique in the database; a row that uses a key shared by
+several salons (or services of one salon) is rejected as ambiguous instead of
+being attached to an arbitrary one. Export reads the table with
+``iterator(chunk_size=...)`` and fetches the ``service`` links once per chunk.
+Import resolves every foreign key from lookup maps built up front and writes
+with ``bulk_create`` one batch at a time, projecting each batch into the
+customer history read model. Memory stays bounded by the batch size no matter
+how large the file is. Rows whose ``reservation_number`` already exists (e.g.
+when a file is imported twice) are rejected like any other invalid row before
+their batch is written.
+"""
+import csv
+import json
+from datetime import date, time
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+
+from account.models import CustomerProfile, StylistProfile
+from salon.models import Salon, Service
+from salon_reservation.reference_numbers import generate_reference
+from .history import project
+from .models import Reservation
+
+FIELDS = [
+    'reservation_number', 'customer', 'salon', 'stylist', 'services',
+    'date', 'start_time', 'end_time', 'total_price', 'discount_amount', 'status',
+]
+
+EXPORT_COLUMNS = [
+    'id', 'reservation_number', 'customer__user__username', 'salon__slug', 'stylist__user__username',
+    'date', 'start_time', 'end_time', 'total_price', 'discount_amount', 'status',
+]
+
+# جداکننده خدمات در ستون CSV
+SERVICE_SEPARATOR = '|'
+
+
+class TransferError(Exception):
+    """A row cannot be imported."""
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Yield one dict per reservation in ``FIELDS`` order, streaming from the database."""
+    if queryset is None:
+        queryset = Reservation.objects.all()
+    rows = queryset.order_by('pk').values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    through = Reservation.service.through
+    for chunk in _chunks(rows, chunk_size):
+        services = {}
+        for reservation_id, name in through.objects.filter(
+                reservation_id__in=[row[0] for row in chunk]).values_list('reservation_id', 'service__name'):
+            services.setdefault(reservation_id, []).append(name or '')
+        for row in chunk:
+            yield {
+                'reservation_number': row[1],
+                'customer': row[2],
+                'salon': row[3],
+                'stylist': row[4],
+                'services': services.get(row[0], []),
+                'date': row[5].isoformat(),
+                'start_time': row[6].isoformat(),
+                'end_time': row[7].isoformat(),
+                'total_price': str(row[8]),
+                'discount_amount': str(row[9]),
+                'status': row[10],
+            }
+
+
+def write_csv(rows, stream):
+    writer = csv.DictWriter(stream, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        row['services'] = SERVICE_SEPARATOR.join(row['services'])
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, stream):
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        services = row.get('services') or ''
+        row['services'] = [name for name in services.split(SERVICE_SEPARATOR) if name]
+        yield row
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+# کلیدی که به بیش از یک ردیف اشاره می‌کند
+AMBIGUOUS = object()
+
+
+def _key_map(pairs):
+    mapping = {}
+    for key, pk in pairs:
+        mapping[key] = AMBIGUOUS if key in mapping else pk
+    return mapping
+
+
+class LookupMaps:
+    """Natural key -> primary key maps for every foreign key of a reservation."""
+
+    def __init__(self):
+        self.customers = dict(CustomerProfile.objects.values_list('user__username', 'pk'))
+        self.stylists = dict(StylistProfile.objects.values_list('user__username', 'pk'))
+        self.salons = _key_map(Salon.objects.exclude(slug=None).values_list('slug', 'pk'))
+        self.services = _key_map(
+            ((salon_id, name), pk) for pk, salon_id, name in Service.objects.values_list('pk', 'salon_id', 'name'))
+
+    def _get(self, mapping, key, label):
+        try:
+            value = mapping[key]
+        except KeyError:
+            raise TransferError(f'unknown {label} {key!r}') from None
+        if value is AMBIGUOUS:
+            raise TransferError(f'ambiguous {label} {key!r}: it matches several rows')
+        return value
+
+    def build(self, row):
+        """Unsaved ``Reservation`` and its service ids for one input row."""
+        salon_id = self._get(self.salons, row['salon'], 'salon')
+        service_ids = [self._get(self.services, (salon_id, name), 'service') for name in row.get('services') or []]
+        total_price = Decimal(row.get('total_price') or 0)
+        discount_amount = Decimal(row.get('discount_amount') or 0)
+        reservation = Reservation(
+            reservation_number=row.get('reservation_number') or generate_reference('RES'),
+            customer_id=self._get(self.customers, row['customer'], 'customer'),
+            salon_id=salon_id,
+            stylist_id=self._get(self.stylists, row['stylist'], 'stylist'),
+            date=date.fromisoformat(row['date']),
+            start_time=time.fromisoformat(row['start_time']),
+            end_time=time.fromisoformat(row['end_time']),
+            total_price=total_price,
+            discount_amount=discount_amount,
+            final_price=total_price - discount_amount,
+            status=row.get('status') or 'pending',
+        )
+        return reservation, service_ids
+
+
+def import_rows(rows, batch_size=1000, skip_invalid=False, on_error=None):
+    """
+    Insert reservations from ``rows`` in batches of ``batch_size``.
+
+    Returns ``(imported, skipped)``. An invalid row, including one whose
+    ``reservation_number`` already exists, raises ``TransferError`` unless
+    ``skip_invalid`` is set, in which case it is reported to
+    ``on_error(line, error)`` and skipped. Batches before the failing one stay
+    imported, so a failed import can be resumed with ``skip_invalid``.
+    """
+    lookups = LookupMaps()
+    through = Reservation.service.through
+    imported = skipped = 0
+    line = 0
+
+    def reject(line, exc):
+        nonlocal skipped
+        if not skip_invalid:
+            raise TransferError(f'row {line}: {exc}') from exc
+        skipped += 1
+        if on_error:
+            on_error(line, exc)
+
+    for chunk in _chunks(rows, batch_size):
+        built = []
+        for row in chunk:
+            line += 1
+            try:
+                built.append((line, *lookups.build(row)))
+            except (TransferError, KeyError, ValueError, ArithmeticError) as exc:
+                reject(line, exc)
+
+        # شماره‌های تکراری؛ چه در پایگاه داده چه در همین دسته
+        existing = set(Reservation.objects.filter(
+            reservation_number__in=[reservation.reservation_number for _, reservation, _ in built],
+        ).values_list('reservation_number', flat=True))
+        batch = []
+        for row_line, reservation, service_ids in built:
+            if reservation.reservation_number in existing:
+                reject(row_line, TransferError(f'reservation {reservation.reservation_number} already exists'))
+                continue
+            existing.add(reservation.reservation_number)
+            batch.append((reservation, service_ids))
+        if not batch:
+            continue
+
+        try:
+            with transaction.atomic():
+                imported += _insert_batch(batch, through, batch_size)
+        except IntegrityError as exc:
+            # ردیفی که هم‌زمان توسط پروسه دیگری وارد شده است
+            raise TransferError(f'rows up to {line}: {exc}') from exc
+    return imported, skipped
+
+
+def _insert_batch(batch, through, batch_size):
+    reservations = Reservation.objects.bulk_create([reservation for reservation, _ in batch], batch_size=batch_size)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        ids = dict(Reservation.objects.filter(
+            reservation_number__in=[r.reservation_number for r in reservations]).values_list('reservation_number', 'pk'))
+        for reservation in reservations:
+            reservation.pk = ids[reservation.reservation_number]
+    through.objects.bulk_create(
+        [
+            through(reservation_id=reservation.pk, service_id=service_id)
+            for reservation, (_, service_ids) in zip(reservations, batch)
+            for service_id in service_ids
+        ],
+        batch_size=batch_size,
+    )
+    project([reservation.pk for reservation in reservations], batch_size=batch_size)
+    return len(batch)
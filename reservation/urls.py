@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'reservation'
+urlpatterns = [
+    path('salon/<int:salon_id>/day/', views.salon_day_view, name='salon_day'),
+    path('history/', views.customer_history_view, name='customer_history'),
+    path('waitlist/', views.join_waitlist_view, name='join_waitlist'),
+    path('<int:reservation_id>/cancel/', views.cancel_reservation_view, name='cancel'),
+    path('calendar/<str:kind>/<int:pk>/<str:token>.ics', views.calendar_feed_view, name='calendar_feed'),
+]
@@ -1,3 +1,117 @@
-from django.shortcuts import render
+from datetime import date, time
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_POST
+
+from account.models import CustomerProfile, StylistProfile
+from salon.models import Salon
+from salon_reservation.timezones import local_today
+from .dayview import get_salon_day, serialize_salon_day
+from .history import history_page, serialize_entry
+from .ical import FEED_KINDS, check_feed_token, feed_reservations, feed_state, iter_calendar
+from .models import InvalidTransition, Reservation
+from .services import cancel
+from .waitlist import join_waitlist
+
 
 # Create your views here.
+
+@login_required
+@require_GET
+def salon_day_view(request, salon_id):
+    """نمای روزانه سالن برای داشبورد صاحب سالن"""
+    try:
+        day = date.fromisoformat(request.GET['date']) if 'date' in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest('invalid date')
+    if day is None:
+        # امروز به وقت محلی سالن
+        zone_name = Salon.objects.filter(pk=salon_id).values_list('timezone', flat=True).first()
+        if zone_name is None:
+            raise Http404
+        day = local_today(zone_name)
+
+    salon = get_salon_day(salon_id, day)
+    if not request.user.is_staff and salon.owner.user_id != request.user.pk:
+        return HttpResponseForbidden()
+    return JsonResponse(serialize_salon_day(salon, day))
+
+
+@require_GET
+def calendar_feed_view(request, kind, pk, token):
+    """فید تقویم (ics) رزروهای آرایشگر یا مشتری"""
+    if kind not in FEED_KINDS or not check_feed_token(kind, pk, token):
+        raise Http404
+    model = StylistProfile if kind == 'stylist' else CustomerProfile
+    profile = get_object_or_404(model.objects.select_related('user'), pk=pk)
+    name = profile.user.get_full_name()
+    reservations = feed_reservations(kind, pk)
+    etag, last_modified = feed_state(reservations, name)
+    last_modified = last_modified.timestamp() if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            iter_calendar(reservations, kind, name),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="{kind}-{pk}.ics"'
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_GET
+def customer_history_view(request):
+    """تاریخچه رزروهای مشتری با صفحه‌بندی cursor"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+        entries, next_cursor = history_page(request.user.pk, request.GET.get('cursor'), limit)
+    except ValueError:
+        return HttpResponseBadRequest('invalid cursor or limit')
+    return JsonResponse({'results': [serialize_entry(entry) for entry in entries], 'next': next_cursor})
+
+
+def _optional_time(value):
+    return time.fromisoformat(value) if value else None
+
+
+@login_required
+@require_POST
+def join_waitlist_view(request):
+    """ثبت مشتری در لیست انتظار یک آرایشگر در یک روز"""
+    customer = get_object_or_404(CustomerProfile, user=request.user)
+    try:
+        stylist = StylistProfile.objects.select_related('salon').get(pk=int(request.POST['stylist']), salon__isnull=False)
+        day = date.fromisoformat(request.POST['date'])
+        duration = int(request.POST['duration'])
+        earliest_time = _optional_time(request.POST.get('earliest_time'))
+        latest_time = _optional_time(request.POST.get('latest_time'))
+    except (KeyError, ValueError, StylistProfile.DoesNotExist):
+        return HttpResponseBadRequest('invalid stylist, date, duration or time')
+    if duration <= 0 or day < local_today(stylist.salon.timezone):
+        return HttpResponseBadRequest('invalid date or duration')
+    entry = join_waitlist(
+        customer, stylist.salon, stylist, day, duration, earliest_time=earliest_time, latest_time=latest_time)
+    return JsonResponse({'id': entry.pk, 'status': entry.status}, status=201)
+
+
+@login_required
+@require_POST
+def cancel_reservation_view(request, reservation_id):
+    """لغو رزرو توسط مشتری؛ زمان آزاد شده به لیست انتظار پیشنهاد می‌شود"""
+    reservation = get_object_or_404(
+        Reservation.objects.select_related('salon'), pk=reservation_id, customer__user=request.user)
+    if not reservation.can_cancel():
+        return HttpResponseBadRequest('reservation can no longer be cancelled')
+    try:
+        cancel(reservation, changed_by=request.user)
+    except InvalidTransition:
+        return HttpResponseBadRequest(f'a {reservation.status} reservation cannot be cancelled')
+    return JsonResponse({'reservation_number': reservation.reservation_number, 'status': reservation.status})
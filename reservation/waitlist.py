@@ -0,0 +1,221 @@
+"""
+Waitlist matching for cancelled reservations.
+
+The matcher keeps the waiting entries of each stylist-day in heaps ordered by
+priority (highest first) and then by age, one heap per request shape
+(duration and time range). Whether an entry fits a freed window depends only
+on its shape, so a match looks at the head of each fitting heap: O(shapes +
+log n) instead of popping through entries that do not fit. The first time a
+stylist-day is touched, it is loaded with one indexed query. Entries created
+later, by any process, are pulled in incrementally. Each stylist-day has its
+own lock, so loading one day never blocks matches on another; queues of past
+days are dropped once a day. A matched entry is claimed with a conditional
+UPDATE so two processes never offer the same entry. The customer is then
+notified through the reminder backends.
+
+An offer is held for ``WAITLIST_OFFER_TIMEOUT``. Booking that stylist-day marks
+the customer's entries ``booked`` (see ``reservation.services.book``).
+``expire_offers``, run by the ``expire_waitlist_offers`` command, marks
+unanswered offers ``expired`` and offers the time to the next entry in line,
+unless someone has booked it in the meantime.
+"""
+import heapq
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import WaitlistEntry
+from .reminders import allowed_types, get_backend
+
+# ردیف‌هایی که دیرتر از زمان ساختشان commit می‌شوند هم دیده شوند
+SYNC_LAG = timedelta(minutes=1)
+DEFAULT_OFFER_TIMEOUT = timedelta(minutes=30)
+
+
+class StylistDayQueue:
+    """Waiting entries for one stylist on one date, one heap per request shape."""
+
+    def __init__(self, stylist_id, date):
+        self.stylist_id = stylist_id
+        self.date = date
+        self.lock = threading.Lock()
+        self._heaps = {}
+        self._seen = set()
+        self._synced_until = None
+
+    def push(self, entry):
+        if entry.pk in self._seen:
+            return
+        self._seen.add(entry.pk)
+        shape = (entry.duration, entry.earliest_time, entry.latest_time)
+        heapq.heappush(self._heaps.setdefault(shape, []), (-entry.priority, entry.created_at, entry.pk, entry))
+
+    def sync(self):
+        """Pull in entries created since the last sync."""
+        queryset = WaitlistEntry.objects.filter(stylist_id=self.stylist_id, date=self.date, status='waiting')
+        if self._synced_until is not None:
+            queryset = queryset.filter(created_at__gte=self._synced_until - SYNC_LAG)
+        entries = list(queryset)
+        for entry in entries:
+            self.push(entry)
+        if entries:
+            self._synced_until = max(entry.created_at for entry in entries)
+        elif self._synced_until is None:
+            self._synced_until = timezone.now()
+
+    def pop_match(self, start_time, end_time):
+        """Remove and return the best entry that fits the window, or ``None``."""
+        best = None
+        for shape, heap in self._heaps.items():
+            # همه درخواست‌های یک شکل با هم جا می‌شوند یا نمی‌شوند
+            if heap[0][3].fits(start_time, end_time) and (best is None or heap[0] < self._heaps[best][0]):
+                best = shape
+        if best is None:
+            return None
+        heap = self._heaps[best]
+        entry = heapq.heappop(heap)[3]
+        if not heap:
+            del self._heaps[best]
+        self._seen.discard(entry.pk)
+        return entry
+
+    def __len__(self):
+        return sum(len(heap) for heap in self._heaps.values())
+
+
+class WaitlistMatcher:
+    """
+    Per-process registry of ``StylistDayQueue`` objects.
+
+    The registry lock only guards the dict; loading and matching hold the
+    lock of the stylist-day queue.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._pruned_on = None
+
+    def queue(self, stylist_id, date):
+        """The queue of a stylist-day, loaded or synced with entries created since."""
+        self._prune_daily()
+        with self._lock:
+            queue = self._queues.get((stylist_id, date))
+            if queue is None:
+                queue = self._queues[stylist_id, date] = StylistDayQueue(stylist_id, date)
+        with queue.lock:
+            queue.sync()
+        return queue
+
+    def add(self, entry):
+        """Register a new waitlist entry with an already loaded queue."""
+        with self._lock:
+            queue = self._queues.get((entry.stylist_id, entry.date))
+        if queue is not None:
+            with queue.lock:
+                queue.push(entry)
+
+    def prune(self, before):
+        """Drop queues of days before ``before``."""
+        with self._lock:
+            for key in [key for key in self._queues if key[1] < before]:
+                del self._queues[key]
+
+    def _prune_daily(self):
+        # تاریخ‌ها محلی سالن هستند؛ یک روز فاصله برای همه مناطق زمانی کافی است
+        today = timezone.now().date()
+        if self._pruned_on != today:
+            self._pruned_on = today
+            self.prune(today - timedelta(days=1))
+
+    def offer(self, reservation):
+        """
+        Offer the time freed by a cancelled ``reservation`` to the best waiting entry.
+
+        Returns the offered ``WaitlistEntry`` or ``None``.
+        """
+        queue = self.queue(reservation.stylist_id, reservation.date)
+        while True:
+            with queue.lock:
+                entry = queue.pop_match(reservation.start_time, reservation.end_time)
+            if entry is None:
+                return None
+            now = timezone.now()
+            # ممکن است پروسه دیگری این درخواست را زودتر پیشنهاد داده باشد
+            claimed = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(
+                status='offered', offered_reservation=reservation, offered_at=now)
+            if claimed:
+                entry.status = 'offered'
+                entry.offered_reservation = reservation
+                entry.offered_at = now
+                notify(entry, reservation)
+                return entry
+
+
+def notify(entry, reservation):
+    """Tell the customer about the freed time through every channel they allow."""
+    message = (
+        f'نوبت {reservation.date:%Y-%m-%d} ساعت {reservation.start_time:%H:%M} '
+        f'آزاد شد؛ برای رزرو آن اقدام کنید.'
+    )
+    customer = entry.customer
+    for reminder_type in allowed_types(customer):
+        get_backend(reminder_type).deliver(customer, message)
+
+
+matcher = WaitlistMatcher()
+
+
+def join_waitlist(customer, salon, stylist, date, duration, earliest_time=None, latest_time=None, priority=0):
+    """Add a customer to the waitlist of a stylist-day."""
+    entry = WaitlistEntry.objects.create(
+        customer=customer,
+        salon=salon,
+        stylist=stylist,
+        date=date,
+        duration=duration,
+        earliest_time=earliest_time,
+        latest_time=latest_time,
+        priority=priority,
+    )
+    matcher.add(entry)
+    return entry
+
+
+def backfill(reservation):
+    """Offer a cancelled reservation's time to the waitlist."""
+    return matcher.offer(reservation)
+
+
+def mark_booked(customer, stylist, date):
+    """Close the customer's waiting or offered entries for a stylist-day they booked."""
+    return WaitlistEntry.objects.filter(
+        customer=customer, stylist=stylist, date=date, status__in=('waiting', 'offered')).update(status='booked')
+
+
+def expire_offers(now=None):
+    """
+    Expire offers older than ``WAITLIST_OFFER_TIMEOUT`` and re-offer their time.
+
+    Returns ``(expired, reoffered)``.
+    """
+    from .services import overlapping
+
+    now = now or timezone.now()
+    timeout = getattr(settings, 'WAITLIST_OFFER_TIMEOUT', DEFAULT_OFFER_TIMEOUT)
+    stale = WaitlistEntry.objects.filter(status='offered', offered_at__lt=now - timeout)
+    expired = reoffered = 0
+    for entry in stale.select_related('offered_reservation'):
+        # ممکن است مشتری هم‌زمان رزرو کرده یا پروسه دیگری منقضی کرده باشد
+        if not WaitlistEntry.objects.filter(pk=entry.pk, status='offered').update(status='expired'):
+            continue
+        expired += 1
+        reservation = entry.offered_reservation
+        if reservation is None or overlapping(
+                reservation.stylist_id, reservation.date, reservation.start_time, reservation.end_time).exists():
+            continue
+        if matcher.offer(reservation) is not None:
+            reoffered += 1
+    return expired, reoffered
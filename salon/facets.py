@@ -0,0 +1,199 @@
+"""
+Facet counts for the salon listing.
+
+Every active salon gets a bit position, and every facet value (a city, a gender
+type, a facility, a service category, a price band) gets a bitset: a Python
+int with the bits of the salons that have it, as in ``reservation.bitmap``.
+Building the bitsets takes two ``values_list`` queries. After that, a filter
+click costs only in-memory ANDs and popcounts.
+
+Within a facet the selected values are OR-ed; across facets they are AND-ed.
+Each facet is counted against the filters of all *other* facets, so picking a
+city still shows how many salons every other city has. Those "all but one"
+masks come from prefix and suffix products, so they take a fixed number of
+ANDs per facet, however many facets are filtered.
+
+Bitsets are kept per process and rebuilt when the version counter in the
+database (see ``salon.versions``) is bumped. Salon and service changes bump it
+once their transaction commits (see ``salon.signals``). A rebuild reads the
+whole catalog, so it never runs inside a request that sees a new version: that
+request starts one background thread and keeps serving the previous bitsets
+until the thread swaps the new ones in. Rebuilds start at most once per
+``REBUILD_INTERVAL`` seconds, so counts may lag an edit by that long plus the
+build time. Only the first request of a process, with nothing to serve yet,
+builds in the request.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db import connection
+
+from .geo import FACILITIES
+from .models import Salon, Service
+from .versions import bump_version_on_commit, get_version
+
+FACETS = ('city', 'gender_type', 'facility', 'category', 'price_band')
+DEFAULT_PRICE_BANDS = (200000, 500000, 1000000)
+VERSION_KEY = 'salon-facets'
+REBUILD_INTERVAL = 10
+
+logger = logging.getLogger(__name__)
+
+
+def price_bands():
+    """Band labels from the ``SALON_PRICE_BANDS`` boundaries, e.g. ``'200000-500000'``."""
+    bounds = getattr(settings, 'SALON_PRICE_BANDS', DEFAULT_PRICE_BANDS)
+    edges = (0,) + tuple(bounds)
+    return [f'{low}-{high}' for low, high in zip(edges, edges[1:])] + [f'{edges[-1]}+']
+
+
+def _bitset(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class FacetIndex:
+    """Bitsets of every facet value over the active salons."""
+
+    def __init__(self, salon_ids, values, version=0):
+        self.salon_ids = salon_ids
+        self.version = version
+        self.built_at = time.monotonic()
+        self.all = (1 << len(salon_ids)) - 1
+        size = len(salon_ids)
+        self.bitsets = {
+            facet: {value: _bitset(positions, size) for value, positions in by_value.items()}
+            for facet, by_value in values.items()
+        }
+
+    @classmethod
+    def build(cls, version=0):
+        salons = Salon.objects.filter(is_active=True).order_by('pk').values_list(
+            'pk', 'city', 'gender_type', *FACILITIES)
+        position = {}
+        values = {facet: {} for facet in FACETS}
+        for pk, city, gender_type, *flags in salons.iterator(chunk_size=5000):
+            bit = position[pk] = len(position)
+            if city and city.strip():
+                values['city'].setdefault(city.strip(), []).append(bit)
+            values['gender_type'].setdefault(gender_type, []).append(bit)
+            for name, flag in zip(FACILITIES, flags):
+                if flag:
+                    values['facility'].setdefault(name, []).append(bit)
+
+        bounds = getattr(settings, 'SALON_PRICE_BANDS', DEFAULT_PRICE_BANDS)
+        bands = price_bands()
+        services = Service.objects.filter(is_active=True, salon__is_active=True).values_list('salon_id', 'category_id', 'price')
+        for salon_id, category_id, price in services.iterator(chunk_size=5000):
+            bit = position.get(salon_id)
+            if bit is None:
+                continue
+            if category_id is not None:
+                values['category'].setdefault(category_id, []).append(bit)
+            if price is not None:
+                values['price_band'].setdefault(bands[bisect_right(bounds, price)], []).append(bit)
+        return cls(list(position), values, version)
+
+    def _selection(self, facet, selected):
+        bitsets = self.bitsets[facet]
+        mask = 0
+        for value in selected:
+            mask |= bitsets.get(value, 0)
+        return mask
+
+    def counts(self, filters=None):
+        """
+        ``(matching_mask, total, counts)`` for ``filters`` (facet -> selected values).
+
+        ``counts[facet][value]`` is the number of salons with ``value`` among those
+        matching the filters of the other facets.
+        """
+        filters = {facet: values for facet, values in (filters or {}).items() if values}
+        masks = [self._selection(facet, filters[facet]) if facet in filters else self.all for facet in FACETS]
+        # prefix[i] = AND of masks[:i] ، suffix[i] = AND of masks[i:]
+        prefix = [self.all]
+        for mask in masks:
+            prefix.append(prefix[-1] & mask)
+        suffix = [self.all]
+        for mask in reversed(masks):
+            suffix.append(suffix[-1] & mask)
+        suffix.reverse()
+
+        counts = {}
+        for i, facet in enumerate(FACETS):
+            others = prefix[i] & suffix[i + 1]
+            counts[facet] = {
+                value: count for value, bits in self.bitsets[facet].items()
+                if (count := (bits & others).bit_count())
+            }
+        matching = prefix[-1]
+        return matching, matching.bit_count(), counts
+
+    def ids(self, mask, limit=None, offset=0):
+        """Salon ids of the set bits of ``mask``, in id order."""
+        result = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                byte ^= low
+                if offset:
+                    offset -= 1
+                    continue
+                result.append(self.salon_ids[byte_index * 8 + low.bit_length() - 1])
+                if limit is not None and len(result) >= limit:
+                    return result
+        return result
+
+
+_index = None
+_rebuilding = False
+_lock = threading.Lock()
+
+
+def rebuild_facet_index(version):
+    """Build the bitsets of ``version`` and make them the process's index."""
+    global _index, _rebuilding
+    try:
+        index = FacetIndex.build(version)
+        with _lock:
+            _index = index
+        return index
+    finally:
+        with _lock:
+            _rebuilding = False
+
+
+def _rebuild_in_background(version):
+    try:
+        rebuild_facet_index(version)
+    except Exception:
+        logger.exception('rebuilding the facet index failed')
+    finally:
+        # اتصال پایگاه داده این thread
+        connection.close()
+
+
+def get_facet_index():
+    """The process's ``FacetIndex``; a newer version is built in the background."""
+    global _rebuilding
+    version = get_version(VERSION_KEY)
+    index = _index
+    if index is None:
+        return rebuild_facet_index(version)
+    if index.version != version and time.monotonic() - index.built_at >= REBUILD_INTERVAL:
+        with _lock:
+            start, _rebuilding = not _rebuilding, True
+        if start:
+            threading.Thread(target=_rebuild_in_background, args=(version,), daemon=True).start()
+    return index
+
+
+def invalidate_facets():
+    """Make every process rebuild its bitsets once the current transaction commits."""
+    bump_version_on_commit(VERSION_KEY)
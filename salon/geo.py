@@ -0,0 +1,266 @@
+"""
+In-process spatial index of salons.
+
+Active salons with coordinates are bucketed into grids of increasing cell
+size (``GRID_DEGREES``; the finest is about a kilometre). A k-nearest query
+visits rings of cells around the query point and stops once no unvisited cell
+can hold anything closer than the k-th best match. If that takes more than
+``MAX_RINGS`` rings (sparse areas or selective filters), it moves on to the
+next coarser grid. A radius query visits only the cells overlapping the
+circle's bounding box, on the finest grid where that box stays small.
+Gender and facility filters are checked per candidate; facilities are stored
+as a bit mask, so each check is one AND.
+
+Each process loads the index on first use with one ``values_list`` query.
+After that it is kept up to date incrementally. Salon saves and deletes in this
+process update it once their transaction commits (see ``salon.signals``). Rows
+changed by other processes are pulled in by ``sync``, at most every
+``SYNC_INTERVAL``, through ``updated_at``. Deleted rows leave no ``updated_at``
+behind, so deleting a salon writes a ``SalonTombstone`` in the same
+transaction and ``sync`` reads the tombstones since its last run through the
+``deleted_at`` index. Tombstones are kept for ``TOMBSTONE_RETENTION``; a
+process that has not synced for that long reloads the whole index instead.
+Rows deleted with raw SQL bypass the tombstones.
+"""
+import heapq
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Salon, SalonTombstone
+
+# اندازه خانه‌های شبکه‌ها از ریز به درشت (درجه)
+GRID_DEGREES = (0.01, 0.05, 0.25)
+# حداکثر حلقه‌های هر شبکه پیش از رفتن سراغ شبکه درشت‌تر
+MAX_RINGS = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+FACILITIES = ('has_parking', 'has_wifi', 'has_food', 'has_kids_area')
+SYNC_INTERVAL = 30
+SYNC_LAG = timedelta(minutes=1)
+TOMBSTONE_RETENTION = timedelta(days=1)
+
+Point = namedtuple('Point', ['salon_id', 'latitude', 'longitude', 'gender_type', 'facilities'])
+
+
+def facility_mask(names):
+    """Bit mask of the given facility field names."""
+    mask = 0
+    for name in names:
+        mask |= 1 << FACILITIES.index(name)
+    return mask
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Grid:
+    """Salon points bucketed into square cells of ``size`` degrees."""
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = {}
+        self.bounds = None
+
+    def cell(self, latitude, longitude):
+        return math.floor(latitude / self.size), math.floor(longitude / self.size)
+
+    def add(self, point):
+        i, j = self.cell(point.latitude, point.longitude)
+        self.cells.setdefault((i, j), {})[point.salon_id] = point
+        # فقط بزرگ می‌شود؛ برای محدود کردن حلقه‌های جستجو کافی است
+        low_i, low_j, high_i, high_j = self.bounds or (i, j, i, j)
+        self.bounds = (min(low_i, i), min(low_j, j), max(high_i, i), max(high_j, j))
+
+    def discard(self, point):
+        cell = self.cell(point.latitude, point.longitude)
+        members = self.cells[cell]
+        members.pop(point.salon_id, None)
+        if not members:
+            del self.cells[cell]
+
+    def box(self, latitude, longitude, radius_km):
+        """Cells overlapping the bounding box of a circle."""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(latitude) + lat_span, 89.9))), 1e-6))
+        low_i, low_j = self.cell(latitude - lat_span, longitude - lon_span)
+        high_i, high_j = self.cell(latitude + lat_span, longitude + lon_span)
+        return low_i, low_j, high_i, high_j
+
+    def rings(self, latitude, longitude):
+        """
+        Yield ``(cells, reach_km)`` per ring of cells around the point.
+
+        Every point outside the rings yielded so far is at least ``reach_km``
+        away from the query point.
+        """
+        center_i, center_j = self.cell(latitude, longitude)
+        low_i, low_j, high_i, high_j = self.bounds
+        max_ring = max(abs(low_i - center_i), abs(high_i - center_i), abs(low_j - center_j), abs(high_j - center_j))
+        for ring in range(max_ring + 1):
+            if ring == 0:
+                cells = [(center_i, center_j)]
+            else:
+                cells = [(center_i - ring, j) for j in range(center_j - ring, center_j + ring + 1)]
+                cells += [(center_i + ring, j) for j in range(center_j - ring, center_j + ring + 1)]
+                cells += [(i, center_j - ring) for i in range(center_i - ring + 1, center_i + ring)]
+                cells += [(i, center_j + ring) for i in range(center_i - ring + 1, center_i + ring)]
+            reach = ring * self.size * KM_PER_DEGREE * math.cos(
+                math.radians(min(abs(latitude) + (ring + 1) * self.size, 89.9)))
+            yield cells, reach
+
+
+class SpatialIndex:
+    """Multi-level grid of salon points with radius and k-nearest queries."""
+
+    def __init__(self):
+        self._points = {}
+        self._grids = [Grid(size) for size in GRID_DEGREES]
+        self._lock = threading.RLock()
+        self._synced_until = None
+        self._synced_at = 0.0
+
+    def __len__(self):
+        return len(self._points)
+
+    @property
+    def loaded(self):
+        return self._synced_until is not None
+
+    def _point(self, row):
+        pk, latitude, longitude, gender_type, *flags = row
+        mask = 0
+        for bit, flag in enumerate(flags):
+            if flag:
+                mask |= 1 << bit
+        return Point(pk, float(latitude), float(longitude), gender_type, mask)
+
+    def put(self, point):
+        with self._lock:
+            self._discard(point.salon_id)
+            self._points[point.salon_id] = point
+            for grid in self._grids:
+                grid.add(point)
+
+    def remove(self, salon_id):
+        with self._lock:
+            self._discard(salon_id)
+
+    def _discard(self, salon_id):
+        point = self._points.pop(salon_id, None)
+        if point is not None:
+            for grid in self._grids:
+                grid.discard(point)
+
+    def update(self, salon):
+        """Index or drop one salon after it was saved."""
+        if salon.is_active and salon.latitude is not None and salon.longitude is not None:
+            self.put(self._point([salon.pk, salon.latitude, salon.longitude, salon.gender_type]
+                                 + [getattr(salon, name) for name in FACILITIES]))
+        else:
+            self.remove(salon.pk)
+
+    def sync(self, force=False):
+        """Load the index, or pull in salons changed since the last sync."""
+        if not force and self.loaded and time.monotonic() - self._synced_at < SYNC_INTERVAL:
+            return
+        now = timezone.now()
+        queryset = Salon.objects.all()
+        incremental = self.loaded and now - self._synced_until < TOMBSTONE_RETENTION - SYNC_LAG
+        if incremental:
+            since = self._synced_until - SYNC_LAG
+            queryset = queryset.filter(updated_at__gte=since)
+            # ردیف‌هایی که پروسه دیگری حذف کرده است
+            for salon_id in SalonTombstone.objects.filter(deleted_at__gte=since).values_list('salon_id', flat=True):
+                self.remove(salon_id)
+        seen = set()
+        columns = ('pk', 'latitude', 'longitude', 'gender_type') + FACILITIES + ('is_active',)
+        for row in queryset.order_by().values_list(*columns).iterator(chunk_size=5000):
+            *values, is_active = row
+            seen.add(values[0])
+            if is_active and values[1] is not None and values[2] is not None:
+                self.put(self._point(values))
+            else:
+                self.remove(values[0])
+        if not incremental:
+            # بارگذاری کامل؛ سنگ‌قبرهای قدیمی‌تر ممکن است پاک شده باشند
+            for salon_id in set(self._points) - seen:
+                self.remove(salon_id)
+        self._synced_until = now
+        self._synced_at = time.monotonic()
+
+    def _matches(self, point, gender_type, facilities):
+        return (gender_type is None or point.gender_type == gender_type) and point.facilities & facilities == facilities
+
+    def within(self, latitude, longitude, radius_km, gender_type=None, facilities=0, limit=None):
+        """``(distance_km, salon_id)`` pairs within ``radius_km``, nearest first."""
+        if limit:
+            # با محدودیت تعداد، همان k نزدیک‌ترین با سقف فاصله است
+            return self.nearest(latitude, longitude, limit, gender_type, facilities, max_km=radius_km)
+        found = []
+        with self._lock:
+            grid = next((grid for grid in self._grids if radius_km <= grid.size * KM_PER_DEGREE * MAX_RINGS), self._grids[-1])
+            low_i, low_j, high_i, high_j = grid.box(latitude, longitude, radius_km)
+            for i in range(low_i, high_i + 1):
+                for j in range(low_j, high_j + 1):
+                    for point in grid.cells.get((i, j), {}).values():
+                        if not self._matches(point, gender_type, facilities):
+                            continue
+                        distance = distance_km(latitude, longitude, point.latitude, point.longitude)
+                        if distance <= radius_km:
+                            found.append((distance, point.salon_id))
+        found.sort()
+        return found
+
+    def nearest(self, latitude, longitude, k=10, gender_type=None, facilities=0, max_km=None):
+        """The ``k`` nearest ``(distance_km, salon_id)`` pairs, nearest first."""
+        if k <= 0:
+            return []
+        with self._lock:
+            if not self._points:
+                return []
+            for level, grid in enumerate(self._grids):
+                last = level == len(self._grids) - 1
+                best = self._search(grid, latitude, longitude, k, gender_type, facilities, max_km, None if last else MAX_RINGS)
+                if best is not None:
+                    break
+        return sorted((-distance, salon_id) for distance, salon_id in best)
+
+    def _search(self, grid, latitude, longitude, k, gender_type, facilities, max_km, max_rings=None):
+        """Ring search on one grid; ``None`` if it gave up after ``max_rings`` rings."""
+        best = []  # max-heap of (-distance, salon_id)
+        for ring, (cells, reach) in enumerate(grid.rings(latitude, longitude)):
+            for cell in cells:
+                for point in grid.cells.get(cell, {}).values():
+                    if point.facilities & facilities != facilities or (gender_type is not None and point.gender_type != gender_type):
+                        continue
+                    distance = distance_km(latitude, longitude, point.latitude, point.longitude)
+                    if max_km is not None and distance > max_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, point.salon_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, point.salon_id))
+            if len(best) == k and reach >= -best[0][0]:
+                return best
+            if max_km is not None and reach > max_km:
+                return best
+            if max_rings is not None and ring >= max_rings:
+                return None
+        return best
+
+
+index = SpatialIndex()
+
+
+def get_index():
+    index.sync()
+    return index
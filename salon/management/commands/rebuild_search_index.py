@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from salon.search import get_index
+
+
+class Command(BaseCommand):
+    help = 'Create or rebuild the salon and service full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        index = get_index()
+        started = time.perf_counter()
+        count = index.rebuild(options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'indexed {count} documents into {index.path} in {elapsed:.2f}s'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:07
+
+import salon_reservation.timezones
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0006_salonspecialday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='timezone',
+            field=models.CharField(default=salon_reservation.timezones.default_time_zone, max_length=64, validators=[salon_reservation.timezones.validate_time_zone], verbose_name='timezone'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:12
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0007_salon_timezone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100, null=True, verbose_name='name')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Leave empty to apply to every day', null=True, verbose_name='weekday')),
+                ('start_hour', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(23)], verbose_name='start_hour')),
+                ('end_hour', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(24)], verbose_name='end_hour')),
+                ('adjustment_percentage', models.IntegerField(validators=[django.core.validators.MinValueValidator(-100)], verbose_name='adjustment_percentage')),
+                ('priority', models.IntegerField(default=0, help_text='Higher priority rules win where rules overlap', verbose_name='priority')),
+                ('is_active', models.BooleanField(default=True, verbose_name='is_active')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='salon.salon', verbose_name='salon')),
+                ('service', models.ForeignKey(blank=True, help_text='Leave empty to apply to every service of the salon', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='salon.service', verbose_name='service')),
+            ],
+            options={
+                'verbose_name': 'Pricing Rule',
+                'verbose_name_plural': 'Pricing Rule',
+                'ordering': ['salon', 'priority'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:15
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0008_pricingrule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name='latitude'),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name='longitude'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0009_salon_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='rating_sum'),
+        ),
+        migrations.AlterField(
+            model_name='salon',
+            name='rating_average',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=3, null=True, verbose_name='rating_average'),
+        ),
+    ]
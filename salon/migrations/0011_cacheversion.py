@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0010_salon_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='key')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='version')),
+            ],
+            options={
+                'verbose_name': 'cache version',
+                'verbose_name_plural': 'cache versions',
+            },
+        ),
+    ]
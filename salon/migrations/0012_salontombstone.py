@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0011_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalonTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('salon_id', models.BigIntegerField(verbose_name='salon_id')),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='deleted_at')),
+            ],
+            options={
+                'verbose_name': 'salon tombstone',
+                'verbose_name_plural': 'salon tombstones',
+            },
+        ),
+    ]
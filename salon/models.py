@@ -1,7 +1,10 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from django.utils.text import slugify
 from account.models import User , SalonOwnerProfile
+from salon_reservation.timezones import default_time_zone, get_zone, validate_time_zone
 
 # Create your models here.
 
@@ -26,6 +29,9 @@ class Salon (models.Model):
     province = models.TextField( max_length=100, verbose_name='province' , null=True, blank=True)
     country = models.TextField( max_length=100, verbose_name='country' , null=True, blank=True)
     postal_code = models.TextField( max_length=100, verbose_name='postal code' , null=True, blank=True)
+    timezone = models.CharField(max_length=64, default=default_time_zone , validators=[validate_time_zone] , verbose_name='timezone')
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name='latitude' , null=True, blank=True , validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name='longitude' , null=True, blank=True , validators=[MinValueValidator(-180), MaxValueValidator(180)])
 
     logo = models.ImageField(upload_to='images/' , verbose_name='logo' , null=True, blank=True)
 
@@ -36,8 +42,9 @@ class Salon (models.Model):
     has_kids_area = models.BooleanField(default=False , verbose_name='has_kids_area' , null=True, blank=True)
 
     #rate
-    rating_average = models.DecimalField(max_digits=2, decimal_places=2, default=0, verbose_name='rating_average' , null=True, blank=True)
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name='rating_average' , null=True, blank=True)
     rating_count = models.IntegerField(default=0 , verbose_name='rating_count' , null=True, blank=True)
+    rating_sum = models.PositiveIntegerField(default=0 , verbose_name='rating_sum')
 
     #staff
     is_active = models.BooleanField(default=True, verbose_name='is_active' , null=True, blank=True)
@@ -55,6 +62,11 @@ class Salon (models.Model):
     def __str__(self):
         return f'{self.owner} - {self.slug}'
 
+    @property
+    def tzinfo(self):
+        """منطقه زمانی محلی سالن"""
+        return get_zone(self.timezone)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(f'{self.owner}-{self.slug}')
@@ -140,6 +152,11 @@ class Service(models.Model):
             return self.discount_price
         return self.price
 
+    def get_price_at(self, day, start_time):
+        """قیمت خدمت در یک روز و ساعت با اعمال قوانین قیمت‌گذاری سالن"""
+        from .pricing import price_at
+        return price_at(self, day, start_time)
+
     def get_discount_percentage(self):
         if self.discount_price and self.discount_price <= self.price:
             return int(((self.price - self.discount_price) / self.price) * 100)
@@ -220,3 +237,69 @@ class SalonSpecialDay(models.Model):
 
     def __str__(self):
         return f'{self.salon} - {self.date}'
+
+
+class PricingRule(models.Model):
+    """قیمت‌گذاری ساعات اوج و کم‌کار؛ درصد مثبت افزایش و منفی تخفیف است"""
+
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE , related_name='pricing_rules' , verbose_name='salon')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE , related_name='pricing_rules' , verbose_name='service' , null=True, blank=True , help_text='Leave empty to apply to every service of the salon')
+    name = models.CharField(max_length=100 , verbose_name='name' , null=True, blank=True)
+
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES , verbose_name='weekday' , null=True, blank=True , help_text='Leave empty to apply to every day')
+    start_hour = models.PositiveSmallIntegerField(verbose_name='start_hour' , validators=[MaxValueValidator(23)])
+    end_hour = models.PositiveSmallIntegerField(verbose_name='end_hour' , validators=[MinValueValidator(1), MaxValueValidator(24)])
+
+    adjustment_percentage = models.IntegerField(verbose_name='adjustment_percentage' , validators=[MinValueValidator(-100)])
+    priority = models.IntegerField(default=0 , verbose_name='priority' , help_text='Higher priority rules win where rules overlap')
+    is_active = models.BooleanField(default=True, verbose_name='is_active')
+
+    class Meta:
+        verbose_name = 'Pricing Rule'
+        verbose_name_plural = 'Pricing Rule'
+        ordering = ['salon', 'priority']
+
+    def __str__(self):
+        return f'{self.salon} - {self.name} ({self.adjustment_percentage}%)'
+
+    def clean(self):
+        if self.start_hour is not None and self.end_hour is not None and self.end_hour <= self.start_hour:
+            raise ValidationError('end_hour must be after start_hour')
+
+
+class CacheVersion(models.Model):
+    """شمارنده نسخه مشترک بین پروسه‌ها برای کش‌های داخل حافظه؛ see salon/versions.py"""
+
+    key = models.CharField(max_length=100 , unique=True , verbose_name='key')
+    version = models.PositiveBigIntegerField(default=0 , verbose_name='version')
+
+    class Meta:
+        verbose_name = 'cache version'
+        verbose_name_plural = 'cache versions'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
+
+
+class SalonTombstone(models.Model):
+    """سالن حذف شده؛ ایندکس مکانی پروسه‌های دیگر از روی آن حذف‌ها را می‌خواند، see salon/geo.py"""
+
+    salon_id = models.BigIntegerField(verbose_name='salon_id')
+    deleted_at = models.DateTimeField(default=timezone.now , db_index=True , verbose_name='deleted_at')
+
+    class Meta:
+        verbose_name = 'salon tombstone'
+        verbose_name_plural = 'salon tombstones'
+
+    def __str__(self):
+        return f'{self.salon_id} @ {self.deleted_at}'
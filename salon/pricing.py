@@ -0,0 +1,101 @@
+"""
+Peak and off-peak pricing.
+
+A salon's active ``PricingRule`` rows are compiled once into a dense
+``PriceTable``. For every service it holds 7 × 24 prices, one per weekday
+(0 = Monday) and hour, so pricing a candidate slot is a list lookup. Rules are
+painted in ascending priority; where rules overlap, the higher priority wins,
+and at equal priority a service-specific rule beats a salon-wide one.
+
+Tables are kept per process. Each salon has a version counter in the
+database (see ``salon.versions``), read with one indexed query per lookup.
+Saving or deleting a rule or a service bumps only that salon's version once
+the transaction commits (see ``salon.signals``), so every process recompiles
+just that table on its next lookup.
+"""
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+
+from .models import PricingRule, Service
+from .versions import bump_version_on_commit, get_version
+
+HOURS = 24
+CELLS = 7 * HOURS
+
+
+def _version_key(salon_id):
+    return f'price-table:{salon_id}'
+
+
+class PriceTable:
+    """Dense ``service -> weekday × hour -> price`` table of one salon."""
+
+    def __init__(self, salon_id, prices, version=0):
+        self.salon_id = salon_id
+        self.version = version
+        self._prices = prices
+
+    @classmethod
+    def compile(cls, salon_id, version=0):
+        services = Service.objects.filter(salon_id=salon_id).values_list('pk', 'price', 'discount_price')
+        rules = sorted(
+            PricingRule.objects.filter(salon_id=salon_id, is_active=True)
+            .values_list('priority', 'service_id', 'pk', 'weekday', 'start_hour', 'end_hour', 'adjustment_percentage'),
+            key=lambda rule: (rule[0], rule[1] is not None, rule[2]),
+        )
+        prices = {}
+        for service_id, price, discount_price in services:
+            base = discount_price if discount_price and price and discount_price <= price else price
+            if base is None:
+                continue
+            adjustments = [0] * CELLS
+            for _, rule_service_id, _, weekday, start_hour, end_hour, percentage in rules:
+                if rule_service_id not in (None, service_id):
+                    continue
+                for day in (range(7) if weekday is None else (weekday,)):
+                    for hour in range(start_hour, min(end_hour, HOURS)):
+                        adjustments[day * HOURS + hour] = percentage
+            by_percentage = {
+                percentage: (base * (100 + percentage) / 100).quantize(Decimal(1), ROUND_HALF_UP)
+                for percentage in set(adjustments)
+            }
+            prices[service_id] = [by_percentage[percentage] for percentage in adjustments]
+        return cls(salon_id, prices, version)
+
+    def price(self, service_id, weekday, hour):
+        """Price of ``service_id`` at ``hour`` on ``weekday``, or ``None`` if it has no price."""
+        prices = self._prices.get(service_id)
+        return prices[weekday * HOURS + hour] if prices else None
+
+    def price_at(self, service_id, day, start_time):
+        return self.price(service_id, day.weekday(), start_time.hour)
+
+    def __contains__(self, service_id):
+        return service_id in self._prices
+
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def get_price_table(salon_id):
+    """The salon's compiled ``PriceTable``; recompiled only after an invalidation."""
+    version = get_version(_version_key(salon_id))
+    table = _tables.get(salon_id)
+    if table is None or table.version != version:
+        table = PriceTable.compile(salon_id, version)
+        with _lock:
+            _tables[salon_id] = table
+    return table
+
+
+def invalidate_price_table(salon_id):
+    """Make every process recompile the table of ``salon_id`` once the current transaction commits."""
+    bump_version_on_commit(_version_key(salon_id))
+
+
+def price_at(service, day, start_time):
+    """Price of ``service`` for a slot starting at ``start_time`` on ``day``."""
+    if service.salon_id is None:
+        return service.get_final_price()
+    return get_price_table(service.salon_id).price_at(service.pk, day, start_time)
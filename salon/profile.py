@@ -0,0 +1,175 @@
+"""
+Cached public salon profile.
+
+A profile combines a salon's details, its images, its active services grouped
+by category, its working hours and its upcoming special days. It is stored
+as one cache entry holding both the rendered HTML fragment and the JSON
+payload, so a page view costs one counter lookup and one cache read.
+
+Every salon has a version counter in the database (see ``salon.versions``),
+bumped atomically when a change to the salon or any of its images, services,
+working hours or special days commits (see ``salon.signals``). Review changes
+bump it too, since they change the rating. Entries are keyed by the version
+they were built from, so a build that raced a bump is stored under the old
+version and never served after it. Writes that bypass model signals
+(``QuerySet.update``) must call ``bump_profile_version`` themselves.
+
+The cache is the ``SALON_PROFILE_CACHE`` alias. Any Django backend works; the
+project uses a file-based cache so all worker processes share the entries.
+"""
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from salon_reservation.timezones import get_zone
+
+from .geo import FACILITIES
+from .models import Salon, WorkingHours
+from .versions import bump_version, bump_version_on_commit, get_version
+
+PROFILE_TIMEOUT = 24 * 60 * 60
+TEMPLATE_NAME = 'salon/profile.html'
+
+
+def get_profile_cache():
+    return caches[getattr(settings, 'SALON_PROFILE_CACHE', 'default')]
+
+
+def _version_key(salon_id):
+    return f'salon-profile:{salon_id}'
+
+
+def bump_profile_version(salon_id):
+    """Invalidate the cached profile of ``salon_id``."""
+    bump_version(_version_key(salon_id))
+
+
+def bump_on_commit(salon_id):
+    if salon_id is not None:
+        bump_version_on_commit(_version_key(salon_id))
+
+
+def _url(field):
+    return field.url if field else None
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else None
+
+
+def _price(value):
+    return int(value) if value is not None else None
+
+
+def build_profile(salon_id):
+    """The JSON payload of an active salon's profile, or ``None``."""
+    salon = Salon.objects.filter(pk=salon_id, is_active=True).first()
+    if salon is None:
+        return None
+    today = timezone.now().astimezone(salon.tzinfo).date()
+    services = (
+        salon.services.filter(is_active=True)
+        .select_related('category')
+        .order_by('category__name', 'category_id', 'name')
+    )
+    categories = []
+    for category, members in groupby(services, key=lambda service: service.category):
+        categories.append({
+            'id': category.pk if category else None,
+            'name': category.name if category else None,
+            'services': [
+                {
+                    'id': service.pk,
+                    'name': service.name,
+                    'description': service.description,
+                    'price': _price(service.price),
+                    'final_price': _price(service.get_final_price()),
+                    'discount_percentage': service.get_discount_percentage(),
+                    'duration': service.duration,
+                    'gender': service.gender,
+                    'image': _url(service.image),
+                }
+                for service in members
+            ],
+        })
+    day_names = dict(enumerate(name for name, _ in WorkingHours.WEEKDAY_CHOICES))
+    return {
+        'id': salon.pk,
+        'name': salon.name,
+        'slug': salon.slug,
+        'description': salon.description,
+        'gender_type': salon.gender_type,
+        'address': salon.address,
+        'city': salon.city,
+        'province': salon.province,
+        'latitude': float(salon.latitude) if salon.latitude is not None else None,
+        'longitude': float(salon.longitude) if salon.longitude is not None else None,
+        'timezone': salon.timezone,
+        'logo': _url(salon.logo),
+        'facilities': [name for name in FACILITIES if getattr(salon, name)],
+        'rating_average': float(salon.rating_average or 0),
+        'rating_count': salon.rating_count or 0,
+        'images': [
+            {'title': image.title, 'url': _url(image.image)}
+            for image in salon.salonimage_set.order_by('-created_at')
+        ],
+        'categories': categories,
+        'working_hours': [
+            {
+                'weekday': hours.weekday,
+                'day': day_names.get(hours.weekday),
+                'is_closed': bool(hours.is_closed),
+                'opening_time': _time(hours.opening_time),
+                'closing_time': _time(hours.closing_time),
+            }
+            for hours in salon.working_hours.order_by('weekday')
+        ],
+        'special_days': [
+            {
+                'date': day.date.isoformat(),
+                'is_closed': bool(day.is_closed),
+                'opening_time': _time(day.opening_time),
+                'closing_time': _time(day.closing_time),
+                'reason': day.reason,
+            }
+            for day in salon.special_days.filter(date__gte=today).order_by('date')
+        ],
+        'built_on': today.isoformat(),
+    }
+
+
+def _timeout(payload):
+    """Seconds until the salon's next local midnight (past special days drop off then), capped at ``PROFILE_TIMEOUT``."""
+    zone = get_zone(payload['timezone'])
+    tomorrow = date.fromisoformat(payload['built_on']) + timedelta(days=1)
+    midnight = datetime.combine(tomorrow, datetime.min.time(), tzinfo=zone)
+    return max(1, min(PROFILE_TIMEOUT, int((midnight - timezone.now()).total_seconds()) + 1))
+
+
+def get_profile(salon_id):
+    """
+    ``{'version', 'data', 'html'}`` of an active salon's profile, or ``None``.
+
+    One counter lookup and one cache read on a hit; on a miss the profile is
+    built and stored under the version it was read with.
+    """
+    cache = get_profile_cache()
+    version = get_version(_version_key(salon_id))
+    profile_key = f'salon-profile:{salon_id}:{version}'
+    profile = cache.get(profile_key)
+    if profile is not None:
+        return profile
+    data = build_profile(salon_id)
+    if data is None:
+        return None
+    profile = {
+        'version': version,
+        'data': data,
+        'html': render_to_string(TEMPLATE_NAME, {'profile': data}),
+    }
+    cache.set(profile_key, profile, _timeout(data))
+    return profile
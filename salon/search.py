@@ -0,0 +1,202 @@
+"""
+Full-text search over salons and services.
+
+Names and descriptions of active salons and of the active services of active
+salons are kept in an SQLite FTS5 table in a file of its own
+(``SEARCH_INDEX_PATH``), whatever database Django itself uses. Text is normalized the same way when it is indexed and
+when it is searched:
+
+- Arabic yeh and kaf are mapped to Persian ``ی`` and ``ک``
+- hamza forms and teh marbuta are folded
+- diacritics and tatweel are dropped
+- ZWNJ becomes a space
+- Persian and Arabic digits become ASCII
+
+Results are ranked with FTS5's BM25, with names weighted above descriptions.
+
+Each document's rowid is derived from its kind and primary key, so updates
+from ``post_save``/``post_delete`` (see ``salon.signals``) replace a single
+row by rowid. Deactivating a salon drops its services too, and reactivating
+it puts them back. Signals only write to an index that already exists; create
+or rebuild it with the ``rebuild_search_index`` command. Searches never build
+the index themselves.
+"""
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+from .models import Salon, Service
+
+KINDS = ('salon', 'service')
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SearchHit = namedtuple('SearchHit', ['kind', 'object_id', 'salon_id', 'score'])
+
+_TRANSLATION = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    '‌': ' ', '‏': None, '‎': None,
+    'ـ': None,
+    **{chr(code): None for code in range(0x064B, 0x0653)},  # اعراب
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+
+
+def normalize(text):
+    """Normalized form of ``text`` used for both indexing and querying."""
+    return (text or '').translate(_TRANSLATION).lower()
+
+
+def _rowid(kind, object_id):
+    return object_id * len(KINDS) + KINDS.index(kind)
+
+
+def match_expression(query):
+    """FTS5 query matching every word of ``query`` as a prefix; ``''`` if it has none."""
+    words = []
+    for word in normalize(query).split():
+        word = ''.join(char for char in word if char.isalnum())
+        if word:
+            words.append('"%s"*' % word)
+    return ' '.join(words)
+
+
+class SearchIndex:
+    """FTS5 index file with one connection per thread."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5('
+                'kind UNINDEXED, object_id UNINDEXED, salon_id UNINDEXED, name, description, '
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _row(self, kind, object_id, salon_id, name, description):
+        return _rowid(kind, object_id), kind, object_id, salon_id, normalize(name), normalize(description)
+
+    def put(self, kind, object_id, salon_id, name, description):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM documents WHERE rowid = ?', (_rowid(kind, object_id),))
+            connection.execute(
+                'INSERT INTO documents (rowid, kind, object_id, salon_id, name, description) VALUES (?, ?, ?, ?, ?, ?)',
+                self._row(kind, object_id, salon_id, name, description))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def remove(self, kind, object_id):
+        self.connection.execute('DELETE FROM documents WHERE rowid = ?', (_rowid(kind, object_id),))
+
+    def contains(self, kind, object_id):
+        return self.connection.execute(
+            'SELECT 1 FROM documents WHERE rowid = ?', (_rowid(kind, object_id),)).fetchone() is not None
+
+    def update(self, instance):
+        """Index or drop one saved ``Salon`` or ``Service``."""
+        if isinstance(instance, Salon):
+            self._update_salon(instance)
+        elif (instance.is_active and instance.salon_id is not None
+              and Salon.objects.filter(pk=instance.salon_id, is_active=True).exists()):
+            self.put('service', instance.pk, instance.salon_id, instance.name, instance.description)
+        else:
+            self.remove('service', instance.pk)
+
+    def _update_salon(self, salon):
+        if not salon.is_active:
+            self.remove('salon', salon.pk)
+            # salon_id ستون UNINDEXED است؛ غیرفعال کردن سالن کم پیش می‌آید
+            self.connection.execute("DELETE FROM documents WHERE kind = 'service' AND salon_id = ?", (salon.pk,))
+            return
+        reactivated = not self.contains('salon', salon.pk)
+        self.put('salon', salon.pk, salon.pk, salon.name, salon.description)
+        if reactivated:
+            services = Service.objects.filter(salon_id=salon.pk, is_active=True).values_list('pk', 'name', 'description')
+            for pk, name, description in services:
+                self.put('service', pk, salon.pk, name, description)
+
+    def rebuild(self, chunk_size=2000):
+        """Replace the whole index with the current salons and services; returns the count."""
+        sources = (
+            ('salon', Salon.objects.filter(is_active=True).values_list('pk', 'pk', 'name', 'description')),
+            ('service', Service.objects.filter(is_active=True, salon__is_active=True)
+             .values_list('pk', 'salon_id', 'name', 'description')),
+        )
+        connection = self.connection
+        count = 0
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM documents')
+            for kind, queryset in sources:
+                batch = []
+                for row in queryset.order_by().iterator(chunk_size=chunk_size):
+                    batch.append(self._row(kind, *row))
+                    if len(batch) >= chunk_size:
+                        count += self._insert(batch)
+                        batch = []
+                count += self._insert(batch)
+            connection.execute("INSERT INTO documents (documents) VALUES ('optimize')")
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return count
+
+    def _insert(self, rows):
+        self.connection.executemany(
+            'INSERT INTO documents (rowid, kind, object_id, salon_id, name, description) VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def search(self, query, kind=None, limit=20, offset=0):
+        """Best matches for ``query`` as ``SearchHit`` rows, best first."""
+        expression = match_expression(query)
+        if not expression:
+            return []
+        sql = ('SELECT kind, object_id, salon_id, bm25(documents, 0, 0, 0, ?, ?) AS score '
+               'FROM documents WHERE documents MATCH ?')
+        params = [NAME_WEIGHT, DESCRIPTION_WEIGHT, expression]
+        if kind is not None:
+            sql += ' AND kind = ?'
+            params.append(kind)
+        sql += ' ORDER BY score LIMIT ? OFFSET ?'
+        params += [limit, offset]
+        # در bm25 امتیاز کمتر یعنی مرتبط‌تر؛ برای خروجی قرینه می‌شود
+        return [SearchHit(kind, object_id, salon_id, -score)
+                for kind, object_id, salon_id, score in self.connection.execute(sql, params)]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    path = getattr(settings, 'SEARCH_INDEX_PATH', settings.BASE_DIR / 'search_index.sqlite3')
+    with _lock:
+        if _index is None or _index.path != str(path):
+            _index = SearchIndex(path)
+    return _index
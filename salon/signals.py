@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .facets import invalidate_facets
+from .geo import TOMBSTONE_RETENTION, index as spatial_index
+from .models import PricingRule, Salon, SalonImage, SalonTombstone, SalonSpecialDay, Service, ServiceCategory, WorkingHours
+from .pricing import invalidate_price_table
+from .profile import bump_on_commit
+from .search import get_index as get_search_index
+
+
+@receiver([post_save, post_delete], sender=PricingRule)
+@receiver([post_save, post_delete], sender=Service)
+def pricing_changed(sender, instance, **kwargs):
+    """جدول قیمت فقط برای همان سالن دوباره ساخته شود"""
+    if instance.salon_id is not None:
+        invalidate_price_table(instance.salon_id)
+
+
+@receiver(post_save, sender=Salon)
+def salon_saved(sender, instance, raw=False, **kwargs):
+    # اگر ایندکس هنوز بارگذاری نشده، اولین sync همه را می‌خواند
+    if spatial_index.loaded and not raw:
+        transaction.on_commit(lambda: spatial_index.update(instance))
+
+
+@receiver(post_delete, sender=Salon)
+def salon_deleted(sender, instance, **kwargs):
+    salon_id = instance.pk
+    # ایندکس مکانی پروسه‌های دیگر حذف را از روی سنگ‌قبر می‌فهمد
+    now = timezone.now()
+    SalonTombstone.objects.create(salon_id=salon_id, deleted_at=now)
+    SalonTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    transaction.on_commit(lambda: spatial_index.remove(salon_id))
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_save, sender=Service)
+def searchable_saved(sender, instance, raw=False, **kwargs):
+    # فقط ایندکسی که قبلا با rebuild_search_index ساخته شده به‌روز می‌شود
+    search_index = get_search_index()
+    if not raw and search_index.exists():
+        transaction.on_commit(lambda: search_index.update(instance))
+
+
+@receiver(post_delete, sender=Salon)
+@receiver(post_delete, sender=Service)
+def searchable_deleted(sender, instance, **kwargs):
+    search_index = get_search_index()
+    if search_index.exists():
+        kind = 'salon' if sender is Salon else 'service'
+        transaction.on_commit(lambda: search_index.remove(kind, instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Salon)
+@receiver([post_save, post_delete], sender=Service)
+def facets_changed(sender, instance, **kwargs):
+    invalidate_facets()
+
+
+@receiver([post_save, post_delete], sender=Salon)
+def salon_profile_changed(sender, instance, **kwargs):
+    bump_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=SalonImage)
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=WorkingHours)
+@receiver([post_save, post_delete], sender=SalonSpecialDay)
+def salon_part_changed(sender, instance, **kwargs):
+    bump_on_commit(instance.salon_id)
+
+
+@receiver([post_save, post_delete], sender=ServiceCategory)
+def category_changed(sender, instance, **kwargs):
+    """نام دسته در صفحه همه سالن‌هایی که خدمتی در آن دارند دیده می‌شود"""
+    for salon_id in Service.objects.filter(category_id=instance.pk).values_list('salon_id', flat=True).distinct():
+        bump_on_commit(salon_id)
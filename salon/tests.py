@@ -1,3 +1,233 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, time
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from account.models import User, SalonOwnerProfile
+from . import profile as salon_profile
+from . import facets
+from .facets import VERSION_KEY as FACETS_VERSION_KEY, get_facet_index
+from .geo import TOMBSTONE_RETENTION, SpatialIndex, index as spatial_index
+from .models import (
+    CacheVersion, PricingRule, Salon, SalonSpecialDay, SalonTombstone, Service, ServiceCategory, WorkingHours,
+)
+from .pricing import get_price_table
+from .profile import get_profile, get_profile_cache
+from .search import get_index as get_search_index, match_expression, normalize
+
+
+class PriceTableTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+        cls.service = Service.objects.create(salon=cls.salon, name='cut', price=1000, duration=30)
+
+    def test_rule_changes_bump_the_shared_version_on_commit(self):
+        monday = date(2026, 1, 5)
+        self.assertEqual(get_price_table(self.salon.pk).price_at(self.service.pk, monday, time(18)), 1000)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            PricingRule.objects.create(salon=self.salon, start_hour=17, end_hour=21, adjustment_percentage=20)
+            # تا commit نشده نسخه تغییر نمی‌کند
+            self.assertFalse(CacheVersion.objects.exists())
+        for callback in callbacks:
+            callback()
+
+        table = get_price_table(self.salon.pk)
+        self.assertEqual(table.version, CacheVersion.objects.get(key=f'price-table:{self.salon.pk}').version)
+        self.assertEqual(table.price_at(self.service.pk, monday, time(18)), 1200)
+        self.assertEqual(table.price_at(self.service.pk, monday, time(10)), 1000)
+
+
+class SpatialIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salons = [
+            Salon.objects.create(owner=cls.owner, name=f'salon{i}', slug=f'salon{i}',
+                                 latitude=35.7 + i / 100, longitude=51.4)
+            for i in range(3)
+        ]
+
+    def test_sync_drops_salons_deleted_elsewhere(self):
+        index = SpatialIndex()
+        index.sync()
+        self.assertEqual(len(index), 3)
+        # حذف در پروسه‌ای دیگر: سیگنال‌ها به این ایندکس نمی‌رسند
+        Salon.objects.filter(pk=self.salons[0].pk).delete()
+        with self.assertNumQueries(2):
+            index.sync(force=True)
+        self.assertEqual(sorted(salon_id for _, salon_id in index.nearest(35.7, 51.4, k=5)),
+                         [self.salons[1].pk, self.salons[2].pk])
+
+        # پروسه‌ای که بیش از نگه‌داری سنگ‌قبرها sync نکرده همه را دوباره می‌خواند
+        Salon.objects.filter(pk=self.salons[1].pk).delete()
+        SalonTombstone.objects.all().delete()
+        index._synced_until -= TOMBSTONE_RETENTION
+        index.sync(force=True)
+        self.assertEqual([salon_id for _, salon_id in index.nearest(35.7, 51.4, k=5)], [self.salons[2].pk])
+
+    def test_signals_update_the_index_on_commit(self):
+        spatial_index.sync(force=True)
+        for salon in self.salons:
+            self.addCleanup(spatial_index.remove, salon.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salons[0].delete()
+            salon = self.salons[1]
+            salon.is_active = False
+            salon.save()
+            # تا commit نشده ایندکس تغییر نمی‌کند
+            self.assertEqual(len(spatial_index), 3)
+        self.assertEqual([salon_id for _, salon_id in spatial_index.nearest(35.7, 51.4, k=5)], [self.salons[2].pk])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='Rose salon', slug='rose')
+        cls.closed = Salon.objects.create(owner=owner, name='Closed salon', slug='closed', is_active=False)
+        Service.objects.create(salon=cls.salon, name='haircut', price=100, duration=30)
+        Service.objects.create(salon=cls.closed, name='haircut deluxe', price=100, duration=30)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(SEARCH_INDEX_PATH=os.path.join(directory.name, 'search.sqlite3'))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def search(self, query):
+        return self.client.get(reverse('salon:search'), {'q': query})
+
+    def test_missing_index_is_not_built_by_a_request(self):
+        self.assertEqual(self.search('haircut').status_code, 503)
+        self.assertFalse(get_search_index().exists())
+
+    def test_services_of_inactive_salons_are_not_found(self):
+        get_search_index().rebuild()
+        self.assertEqual([hit['salon_id'] for hit in self.search('haircut').json()['results']], [self.salon.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salon.is_active = False
+            self.salon.save()
+        self.assertEqual(self.search('haircut').json()['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.closed.is_active = True
+            self.closed.save()
+        results = self.search('haircut').json()['results']
+        self.assertEqual([(hit['kind'], hit['salon_id']) for hit in results], [('service', self.closed.pk)])
+
+    def test_persian_normalization(self):
+        self.assertEqual(normalize('كوتاهي مو'), 'کوتاهی مو')
+        self.assertEqual(normalize('می\u200cخواهم'), 'می خواهم')
+        self.assertEqual(normalize('رنگ ۱۲ و ٣٤'), 'رنگ 12 و 34')
+        self.assertEqual(normalize('مُـــو'), 'مو')
+        self.assertEqual(match_expression('كراتين، ۲'), '"کراتین"* "2"*')
+
+        Service.objects.create(salon=self.salon, name='كراتينه موی بلند', description='پکیج ۳ مرحله\u200cای',
+                               price=100, duration=30)
+        get_search_index().rebuild()
+        for query in ('کراتینه', 'كراتينه', 'کرات', 'موی', 'پکیج 3', 'مرحله ای'):
+            results = self.search(query).json()['results']
+            self.assertEqual([hit['kind'] for hit in results], ['service'], query)
+
+
+class FacetIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        Salon.objects.create(owner=cls.owner, name='salon', slug='salon', city='Tehran')
+
+    def test_changes_bump_the_shared_version_on_commit(self):
+        facets._index = None
+        self.addCleanup(setattr, facets, '_index', None)
+        index = get_facet_index()
+        self.assertEqual(index.counts()[2]['city'], {'Tehran': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Salon.objects.create(owner=self.owner, name='other', slug='other', city='Shiraz')
+            self.assertFalse(CacheVersion.objects.filter(key=FACETS_VERSION_KEY).exists())
+        self.assertEqual(CacheVersion.objects.get(key=FACETS_VERSION_KEY).version, 1)
+
+        # بازسازی حداکثر یک بار در هر REBUILD_INTERVAL و هرگز داخل درخواست
+        with mock.patch.object(facets, 'threading') as threads:
+            self.assertIs(get_facet_index(), index)
+            threads.Thread.assert_not_called()
+            index.built_at -= facets.REBUILD_INTERVAL
+            self.assertIs(get_facet_index(), index)
+            self.assertIs(get_facet_index(), index)
+        threads.Thread.assert_called_once()
+        self.assertEqual(threads.Thread.call_args.kwargs['args'], (1,))
+
+        facets.rebuild_facet_index(1)
+        self.assertEqual(get_facet_index().counts()[2]['city'], {'Tehran': 1, 'Shiraz': 1})
+        self.assertFalse(facets._rebuilding)
+
+
+class SalonProfileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = SalonOwnerProfile.objects.create(
+            user=User.objects.create(username='owner', email='owner@example.com', mobile='09000000000'))
+        cls.salon = Salon.objects.create(owner=owner, name='salon', slug='salon')
+
+    def setUp(self):
+        get_profile_cache().clear()
+        self.addCleanup(get_profile_cache().clear)
+
+    def test_hit_is_one_query_and_one_cache_read(self):
+        response = self.client.get(reverse('salon:profile', args=[self.salon.pk]), {'format': 'json'})
+        self.assertEqual(response.json()['name'], 'salon')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_profile(self.salon.pk)['data']['name'], 'salon')
+
+    def test_related_changes_bump_on_commit(self):
+        category = ServiceCategory.objects.create(name='hair')
+        changes = [
+            lambda: Salon.objects.filter(pk=self.salon.pk).get().save(),
+            lambda: Service.objects.create(salon=self.salon, category=category, name='cut', price=100, duration=30),
+            lambda: WorkingHours.objects.create(salon=self.salon, weekday=0, opening_time=time(9), closing_time=time(17)),
+            lambda: SalonSpecialDay.objects.create(salon=self.salon, date=date(2030, 1, 1), is_closed=True),
+            lambda: ServiceCategory.objects.filter(pk=category.pk).get().save(),
+        ]
+        for change in changes:
+            version = get_profile(self.salon.pk)['version']
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+                # تا commit نشده همان نسخه از کش خوانده می‌شود
+                self.assertEqual(get_profile(self.salon.pk)['version'], version)
+            self.assertGreater(get_profile(self.salon.pk)['version'], version)
+        data = get_profile(self.salon.pk)['data']
+        self.assertEqual(data['categories'][0]['services'][0]['name'], 'cut')
+        self.assertEqual(data['working_hours'][0]['opening_time'], '09:00')
+
+    def test_build_racing_a_change_is_not_served_after_the_bump(self):
+        build = salon_profile.build_profile
+
+        def racing_build(salon_id):
+            data = build(salon_id)
+            # تغییر هم‌زمان در پروسه دیگری بعد از خواندن داده‌ها commit می‌شود
+            Salon.objects.filter(pk=salon_id).update(name='renamed')
+            salon_profile.bump_profile_version(salon_id)
+            salon_profile.bump_profile_version(salon_id)
+            return data
+
+        with mock.patch.object(salon_profile, 'build_profile', racing_build):
+            self.assertEqual(get_profile(self.salon.pk)['data']['name'], 'salon')
+        self.assertEqual(CacheVersion.objects.get(key=f'salon-profile:{self.salon.pk}').version, 2)
+        self.assertEqual(get_profile(self.salon.pk)['data']['name'], 'renamed')
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'salon'
+urlpatterns = [
+    path('', views.salon_listing_view, name='listing'),
+    path('nearby/', views.nearby_salons_view, name='nearby'),
+    path('search/', views.search_view, name='search'),
+    path('<int:pk>/', views.salon_profile_view, name='profile'),
+]
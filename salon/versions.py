@@ -0,0 +1,35 @@
+"""
+Version counters shared by every process.
+
+Per-process caches (compiled price tables, facet bitsets) remember the version
+they were built from and rebuild when the counter in the database moves on.
+The counter is a ``CacheVersion`` row, so all processes and hosts see the same
+value whatever cache backend is configured; reading it is one lookup on a
+unique index. Bumps are a single ``UPDATE ... SET version = version + 1`` and,
+through ``bump_version_on_commit``, run only once the change that caused them
+has committed, so no process can rebuild from data that is not visible yet.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+def get_version(key):
+    """Current version of ``key``; 0 until it is first bumped."""
+    return CacheVersion.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+
+def bump_version(key):
+    if CacheVersion.objects.filter(key=key).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        # پروسه دیگری هم‌زمان ردیف را ساخته است
+        CacheVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+def bump_version_on_commit(key):
+    transaction.on_commit(lambda: bump_version(key))
@@ -1,3 +1,128 @@
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from .facets import FACETS, get_facet_index
+from .geo import FACILITIES, facility_mask, get_index
+from .models import Salon, Service, ServiceCategory
+from .profile import get_profile
+from .search import KINDS, get_index as get_search_index
 
 # Create your views here.
+
+NEAREST_MAX_KM = 100
+MAX_RESULTS = 50
+
+
+@require_GET
+def nearby_salons_view(request):
+    """سالن‌های نزدیک: k نزدیک‌ترین یا همه در شعاع radius (کیلومتر)"""
+    try:
+        latitude = float(request.GET['lat'])
+        longitude = float(request.GET['lon'])
+        radius = float(request.GET['radius']) if 'radius' in request.GET else None
+        k = min(max(int(request.GET.get('k', 10)), 1), MAX_RESULTS)
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('lat and lon are required; radius and k must be numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (radius is not None and not 0 < radius <= NEAREST_MAX_KM):
+        return HttpResponseBadRequest('coordinates or radius out of range')
+
+    filters = {
+        'gender_type': request.GET.get('gender_type') or None,
+        'facilities': facility_mask(name for name in FACILITIES if request.GET.get(name) in ('1', 'true')),
+    }
+    index = get_index()
+    if radius is None:
+        matches = index.nearest(latitude, longitude, k, max_km=NEAREST_MAX_KM, **filters)
+    else:
+        matches = index.within(latitude, longitude, radius, limit=k, **filters)
+
+    salons = {
+        salon['pk']: salon for salon in Salon.objects.filter(pk__in=[pk for _, pk in matches], is_active=True)
+        .values('pk', 'name', 'slug', 'city', 'address', 'gender_type', 'rating_average', *FACILITIES)
+    }
+    results = []
+    for distance, pk in matches:
+        salon = salons.get(pk)
+        if salon is not None:
+            salon['distance_km'] = round(distance, 3)
+            salon['rating_average'] = float(salon['rating_average'] or 0)
+            results.append(salon)
+    return JsonResponse({'results': results})
+
+
+@require_GET
+def search_view(request):
+    """جستجوی متنی در سالن‌ها و خدمات"""
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind') or None
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), MAX_RESULTS)
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return HttpResponseBadRequest('limit and offset must be numbers')
+    if not query or (kind is not None and kind not in KINDS):
+        return HttpResponseBadRequest('q is required; kind must be salon or service')
+
+    index = get_search_index()
+    if not index.exists():
+        # ساخت ایندکس کار دستور rebuild_search_index است، نه درخواست کاربر
+        return HttpResponse('search index is not built yet', status=503)
+    hits = index.search(query, kind, limit, offset)
+
+    salons = Salon.objects.filter(pk__in=[hit.salon_id for hit in hits], is_active=True).in_bulk()
+    services = Service.objects.filter(
+        pk__in=[hit.object_id for hit in hits if hit.kind == 'service'], is_active=True).in_bulk()
+    results = []
+    for hit in hits:
+        salon = salons.get(hit.salon_id)
+        if salon is None:
+            continue
+        result = {'kind': hit.kind, 'score': hit.score, 'salon_id': salon.pk, 'salon_name': salon.name, 'salon_slug': salon.slug}
+        if hit.kind == 'service':
+            service = services.get(hit.object_id)
+            if service is None:
+                continue
+            result.update({'service_id': service.pk, 'service_name': service.name, 'price': int(service.get_final_price() or 0)})
+        results.append(result)
+    return JsonResponse({'results': results})
+
+
+@require_GET
+def salon_listing_view(request):
+    """فهرست سالن‌ها با شمارش هر مقدار فیلتر"""
+    try:
+        filters = {facet: request.GET.getlist(facet) for facet in FACETS}
+        filters['category'] = [int(value) for value in filters['category']]
+        limit = min(max(int(request.GET.get('limit', 20)), 1), MAX_RESULTS)
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return HttpResponseBadRequest('category, limit and offset must be numbers')
+
+    index = get_facet_index()
+    matching, total, counts = index.counts(filters)
+    ids = index.ids(matching, limit, offset)
+    salons = Salon.objects.in_bulk(ids)
+    categories = dict(ServiceCategory.objects.filter(pk__in=counts['category']).values_list('pk', 'name'))
+    counts['category'] = [
+        {'id': pk, 'name': categories.get(pk), 'count': count} for pk, count in counts['category'].items()
+    ]
+    return JsonResponse({
+        'total': total,
+        'facets': counts,
+        'results': [
+            {'id': salon.pk, 'name': salon.name, 'slug': salon.slug, 'city': salon.city, 'gender_type': salon.gender_type}
+            for salon in (salons[pk] for pk in ids if pk in salons)
+        ],
+    })
+
+
+@require_GET
+def salon_profile_view(request, pk):
+    """صفحه سالن از کش؛ با format=json همان داده به صورت JSON"""
+    profile = get_profile(pk)
+    if profile is None:
+        raise Http404('salon not found')
+    if request.GET.get('format') == 'json':
+        return JsonResponse(profile['data'])
+    return HttpResponse(profile['html'])
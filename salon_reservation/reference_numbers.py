@@ -0,0 +1,179 @@
+"""
+Reference numbers shared by reservations, orders, payments, refunds and
+transactions (RES/ORD/PAY/REF/TXN...).
+
+The default scheme never queries the database. Each number is a 63-bit
+time-ordered id: milliseconds since ``EPOCH``, then a 10-bit node id, then a
+12-bit per-process sequence. The id is written as 13 base-36 characters and
+followed by one check character, e.g. ``RES0K3F9Q2B7XA1MZ``.
+
+Numbers are unique as long as no two live processes share a node id. A
+process uses ``REFERENCE_NODE_ID`` (0-1023) if it is set. Otherwise it claims
+the first free id of ``REFERENCE_NODE_RANGE`` on its first number, by taking
+an exclusive ``flock`` on ``node-<id>.lock`` in ``REFERENCE_NODE_LOCK_DIR``.
+The lock lasts as long as the process, so a crashed worker's id becomes free
+again. Processes sharing a lock directory never share an id. Hosts that do not
+share the directory need disjoint ``REFERENCE_NODE_RANGE`` values. With neither
+setting, or once every id in the range is taken, generation raises
+``ImproperlyConfigured``; it never falls back to a guessed id.
+
+Another scheme can be plugged in with ``REFERENCE_NUMBER_GENERATOR``, a dotted
+path to a callable taking the prefix and returning the number.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+EPOCH_MS = 1735689600000  # 2025-01-01 00:00:00 UTC
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+BODY_LENGTH = 13
+
+
+def check_character(body):
+    """Luhn mod 36 check character of ``body``."""
+    factor = 2
+    total = 0
+    for char in reversed(body):
+        addend = factor * ALPHABET.index(char)
+        factor = 1 if factor == 2 else 2
+        total += addend // 36 + addend % 36
+    return ALPHABET[(36 - total % 36) % 36]
+
+
+def is_valid(reference, prefix=None):
+    """Whether ``reference`` carries a correct check character (and ``prefix``)."""
+    if prefix is not None and not reference.startswith(prefix):
+        return False
+    body = reference[len(prefix or reference[:3]):]
+    if len(body) != BODY_LENGTH + 1 or any(char not in ALPHABET for char in body):
+        return False
+    return check_character(body[:-1]) == body[-1]
+
+
+def _encode(value):
+    chars = []
+    for _ in range(BODY_LENGTH):
+        value, digit = divmod(value, 36)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def _check_node_id(node_id):
+    if not 0 <= node_id < 1 << NODE_BITS:
+        raise ImproperlyConfigured(f'reference node id {node_id} is outside 0-{(1 << NODE_BITS) - 1}')
+    return node_id
+
+
+def claim_node_id(lock_dir, node_range=None):
+    """
+    Claim the first free node id of ``node_range`` under ``lock_dir``.
+
+    Returns ``(node_id, handle)``; the id stays claimed while ``handle`` is open.
+    """
+    if fcntl is None:
+        raise ImproperlyConfigured('REFERENCE_NODE_LOCK_DIR needs fcntl; set REFERENCE_NODE_ID per worker instead')
+    low, high = node_range or (0, 1 << NODE_BITS)
+    os.makedirs(lock_dir, exist_ok=True)
+    for node_id in range(_check_node_id(low), high):
+        handle = open(os.path.join(lock_dir, f'node-{_check_node_id(node_id)}.lock'), 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        return node_id, handle
+    raise ImproperlyConfigured(f'every reference node id in {low}-{high - 1} is taken under {lock_dir}')
+
+
+class TimeOrderedGenerator:
+    """
+    Thread-safe generator of time-ordered, collision-free reference numbers.
+
+    ``node_id`` fixes the node id; otherwise it comes from the settings on the
+    first number (see the module docstring).
+    """
+
+    def __init__(self, node_id=None, lock_dir=None, node_range=None):
+        self._lock = threading.Lock()
+        self._fixed_node_id = node_id
+        self._lock_dir = lock_dir
+        self._node_range = node_range
+        self._handle = None
+        self._reset()
+
+    def _reset(self):
+        # بعد از fork قفل والد به ارث می‌رسد؛ فرزند شناسه خودش را می‌گیرد
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self.node_id = None
+        self._last_ms = 0
+        self._sequence = 0
+
+    def _claim(self):
+        if self._fixed_node_id is not None:
+            return _check_node_id(self._fixed_node_id)
+        node_id = getattr(settings, 'REFERENCE_NODE_ID', None)
+        if node_id is not None:
+            return _check_node_id(node_id)
+        lock_dir = self._lock_dir or getattr(settings, 'REFERENCE_NODE_LOCK_DIR', None)
+        if not lock_dir:
+            raise ImproperlyConfigured('set REFERENCE_NODE_ID or REFERENCE_NODE_LOCK_DIR to generate reference numbers')
+        node_id, self._handle = claim_node_id(
+            lock_dir, self._node_range or getattr(settings, 'REFERENCE_NODE_RANGE', None))
+        return node_id
+
+    def next_id(self):
+        with self._lock:
+            if self.node_id is None:
+                self.node_id = self._claim()
+            now = int(time.time() * 1000) - EPOCH_MS
+            # ساعت سیستم نباید باعث تکرار شود؛ هرگز به عقب نمی‌رویم
+            if now <= self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    self._last_ms += 1
+            else:
+                self._last_ms = now
+                self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+    def __call__(self, prefix):
+        body = _encode(self.next_id())
+        return f'{prefix}{body}{check_character(body)}'
+
+
+_default_generator = TimeOrderedGenerator()
+
+if hasattr(os, 'register_at_fork'):
+    # پروسه فرزند شناسه گره و شمارنده خودش را می‌گیرد
+    os.register_at_fork(after_in_child=_default_generator._reset)
+
+
+@lru_cache(maxsize=None)
+def _configured_generator(path):
+    return import_string(path)
+
+
+def get_generator():
+    path = getattr(settings, 'REFERENCE_NUMBER_GENERATOR', None)
+    if path:
+        return _configured_generator(path)
+    return _default_generator
+
+
+def generate_reference(prefix):
+    """New reference number for ``prefix`` (e.g. ``'RES'``) from the configured generator."""
+    return get_generator()(prefix)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -133,3 +134,66 @@ AUTH_USER_MODEL = 'account.User'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Reference numbers (RES/ORD/PAY/REF/TXN), see salon_reservation/reference_numbers.py
+# Every live process needs a distinct node id (0-1023): set REFERENCE_NODE_ID per
+# worker, or leave it unset and each process claims a free id of
+# REFERENCE_NODE_RANGE with a lock file in REFERENCE_NODE_LOCK_DIR. Hosts that
+# do not share the directory need disjoint ranges.
+REFERENCE_NODE_ID = int(os.environ['REFERENCE_NODE_ID']) if os.environ.get('REFERENCE_NODE_ID') else None
+REFERENCE_NODE_LOCK_DIR = os.environ.get('REFERENCE_NODE_LOCK_DIR') or BASE_DIR / 'run' / 'reference-nodes'
+REFERENCE_NODE_RANGE = (0, 1024)
+REFERENCE_NUMBER_GENERATOR = None
+
+# Reservation reminder delivery, see reservation/reminders.py
+RESERVATION_REMINDER_BACKENDS = {
+    'sms': 'reservation.reminders.ConsoleBackend',
+    'email': 'reservation.reminders.ConsoleBackend',
+    'notify': 'reservation.reminders.ConsoleBackend',
+}
+# Hours before the appointment at which reminders are sent (each at least 24)
+RESERVATION_REMINDER_HOURS = (24,)
+# A dispatcher's claim on a batch expires after this long (e.g. it crashed)
+RESERVATION_REMINDER_CLAIM_TIMEOUT = timedelta(minutes=10)
+# A reminder whose send failed is retried after this long
+RESERVATION_REMINDER_RETRY_DELAY = timedelta(minutes=1)
+# A freed time offered to a waitlist entry is held this long, see reservation/waitlist.py
+WAITLIST_OFFER_TIMEOUT = timedelta(minutes=30)
+# Staff can mark a reservation no-show for this long after it ends; then the
+# sweeper marks it completed, see reservation/sweeper.py
+RESERVATION_NO_SHOW_GRACE = timedelta(hours=2)
+
+# Length of materialized time slots in minutes, see reservation/slots.py
+TIME_SLOT_MINUTES = 30
+
+# Time zone of new salons (IANA name), see salon_reservation/timezones.py
+SALON_TIME_ZONE = 'Asia/Tehran'
+
+# Full-text search index file (SQLite FTS5), see salon/search.py
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index.sqlite3'
+
+# Upper bounds of the price bands of the salon listing facets, see salon/facets.py
+SALON_PRICE_BANDS = (200000, 500000, 1000000)
+
+# Caches. The salon profile cache (see salon/profile.py) must be shared by all
+# worker processes, so it is file based; point SALON_PROFILE_CACHE at 'default'
+# for a single-process setup.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'salon_profiles': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'salon_profiles',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'forecasts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'forecasts',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+SALON_PROFILE_CACHE = 'salon_profiles'
+# Capacity forecasts are written by forecast_capacity and read by web processes,
+# so they need a cache all processes share, see reservation/forecast.py
+CAPACITY_FORECAST_CACHE = 'forecasts'
@@ -0,0 +1,57 @@
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from .reference_numbers import TimeOrderedGenerator, is_valid
+
+
+class ReferenceNumberTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.lock_dir = directory.name
+
+    def generator(self, **kwargs):
+        generator = TimeOrderedGenerator(lock_dir=self.lock_dir, **kwargs)
+        self.addCleanup(generator._reset)
+        return generator
+
+    @override_settings(REFERENCE_NODE_ID=None)
+    def test_processes_sharing_a_lock_dir_get_distinct_node_ids(self):
+        generators = [self.generator() for _ in range(3)]
+        for generator in generators:
+            generator('RES')
+        self.assertEqual(sorted(generator.node_id for generator in generators), [0, 1, 2])
+
+        # شناسه آزاد شده دوباره قابل استفاده است
+        generators[1]._reset()
+        replacement = self.generator()
+        replacement('RES')
+        self.assertEqual(replacement.node_id, 1)
+
+    @override_settings(REFERENCE_NODE_ID=None)
+    def test_exhausted_range_fails_loudly(self):
+        self.generator(node_range=(5, 6))('RES')
+        with self.assertRaises(ImproperlyConfigured):
+            self.generator(node_range=(5, 6))('RES')
+
+    @override_settings(REFERENCE_NODE_ID=None, REFERENCE_NODE_LOCK_DIR=None)
+    def test_missing_configuration_fails_loudly(self):
+        with self.assertRaises(ImproperlyConfigured):
+            TimeOrderedGenerator()('RES')
+
+    @override_settings(REFERENCE_NODE_ID=7)
+    def test_configured_node_id(self):
+        generator = self.generator()
+        numbers = [generator('RES') for _ in range(5000)]
+        self.assertEqual(generator.node_id, 7)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(is_valid(number, 'RES') for number in numbers))
+
+    @override_settings(REFERENCE_NODE_ID=4096)
+    def test_out_of_range_node_id_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.generator()('RES')
@@ -0,0 +1,74 @@
+"""
+Salon-local time zones.
+
+Settings keep ``TIME_ZONE = 'UTC'`` for storage, but salons open, close and
+book in their own local time. Each salon stores an IANA zone name; ``get_zone``
+turns it into a ``ZoneInfo`` once per process. ``SALON_TIME_ZONE`` is the zone
+of new salons and of stylists without a salon. ``local_today`` and
+``salon_today_range`` give the current date of one zone or the range of
+current dates over all salons, for code that defaults to "today".
+
+SQLite has no time zone support, so ``register_sqlite_functions`` adds
+``salon_local_to_utc(date, time, zone)`` to every new SQLite connection for
+queries that turn salon-local times into absolute ones.
+"""
+from datetime import date, datetime, time, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+FALLBACK_TIME_ZONE = 'Asia/Tehran'
+
+
+def default_time_zone():
+    return getattr(settings, 'SALON_TIME_ZONE', FALLBACK_TIME_ZONE)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name)
+
+
+def validate_time_zone(value):
+    try:
+        get_zone(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'{value} is not a valid time zone')
+
+
+def local_today(zone_name=None, now=None):
+    """The current date in ``zone_name`` (the default salon zone if omitted)."""
+    return (now or timezone.now()).astimezone(get_zone(zone_name or default_time_zone())).date()
+
+
+def salon_zones():
+    """Names of the time zones salons are in."""
+    from salon.models import Salon
+    return list(Salon.objects.order_by().values_list('timezone', flat=True).distinct())
+
+
+def salon_today_range(now=None):
+    """``(earliest, latest)`` current date over all salon zones."""
+    now = now or timezone.now()
+    days = [local_today(zone_name, now) for zone_name in salon_zones()] or [local_today(now=now)]
+    return min(days), max(days)
+
+
+def local_to_utc(day, start, zone_name):
+    """``date`` and ``time`` strings in ``zone_name`` as a naive UTC ``'YYYY-MM-DD HH:MM:SS'`` string."""
+    if day is None or start is None:
+        return None
+    try:
+        zone = get_zone(zone_name or default_time_zone())
+        local = datetime.combine(date.fromisoformat(day), time.fromisoformat(start), tzinfo=zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+    return local.astimezone(dt_timezone.utc).replace(tzinfo=None).isoformat(' ')
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('salon_local_to_utc', 3, local_to_utc, deterministic=True)
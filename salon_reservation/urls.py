@@ -20,4 +20,6 @@ from django.urls import path , include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('account/', include('account.urls')),
+    path('salon/', include('salon.urls')),
+    path('reservation/', include('reservation.urls')),
 ]